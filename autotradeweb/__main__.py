@@ -6,6 +6,7 @@
 import argparse
 import logging
 import os
+import socket
 import sys
 from logging import getLogger
 from logging.handlers import TimedRotatingFileHandler
@@ -15,7 +16,30 @@ from cheroot.wsgi import Server as WSGIServer, PathInfoDispatcher
 from flask import url_for
 from flask_restx import Api
 
-from autotradeweb.server import APP, DEFAULT_SQLITE_PATH
+from autotradeweb.compression import (
+    DEFAULT_BROTLI_QUALITY,
+    DEFAULT_GZIP_LEVEL,
+    DEFAULT_MIN_SIZE,
+    CompressionMiddleware,
+)
+from autotradeweb.metrics import MetricsMiddleware, track_thread_pool
+from autotradeweb.migrations import upgrade
+from autotradeweb.pool import (
+    DEFAULT_MAX_OVERFLOW,
+    DEFAULT_POOL_RECYCLE,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_POOL_TIMEOUT,
+    get_engine_options,
+)
+from autotradeweb.prefork import PreforkServer, ReusePortWSGIServer
+from autotradeweb.routing import READ_BIND_KEY
+from autotradeweb.server import (
+    APP,
+    DEFAULT_FIGURE_CACHE_SIZE,
+    DEFAULT_SQLITE_PATH,
+    FIGURE_CACHE,
+    db,
+)
 
 __log__ = getLogger(__name__)
 
@@ -115,6 +139,12 @@ def get_parser() -> argparse.ArgumentParser:
         default=DEFAULT_SQLITE_PATH,
         help="Path to the SQLITE database to store messages",
     )
+    parser.add_argument(
+        "--read-database",
+        dest="read_database",
+        help="URI of a read replica of the database to send read-only market "
+        "data and reporting queries to",
+    )
     parser.add_argument(
         "--disable-https",
         default=False,
@@ -122,17 +152,298 @@ def get_parser() -> argparse.ArgumentParser:
         dest="disable_https",
         help="Disable HTTPS for swagger docs (useful for local debugging)",
     )
+    parser.add_argument(
+        "--figure-cache-size",
+        default=DEFAULT_FIGURE_CACHE_SIZE,
+        type=int,
+        dest="figure_cache_size",
+        help="Maximum number of cached dashboard stock timeline figures",
+    )
+    add_server_parser(parser)
+    add_compression_parser(parser)
     add_log_parser(parser)
+    add_pool_parser(parser)
+    add_db_parser(parser)
 
     return parser
 
 
+def positive_int(value: str) -> int:
+    """Argparse type function for a integer of at least one"""
+    value = int(value)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return value
+
+
+def add_server_parser(parser):
+    """Add cheroot server tuning options to the argument parser"""
+    group = parser.add_argument_group(title="Server")
+    group.add_argument(
+        "--threads",
+        default=10,
+        type=positive_int,
+        help="Number of request handling threads (per worker process)",
+    )
+    group.add_argument(
+        "--max-threads",
+        dest="max_threads",
+        default=-1,
+        type=int,
+        help="Maximum number of request handling threads (-1 for no limit)",
+    )
+    group.add_argument(
+        "--request-queue-size",
+        dest="request_queue_size",
+        default=5,
+        type=positive_int,
+        help="Size of the listening socket's accept queue",
+    )
+    group.add_argument(
+        "--socket-timeout",
+        dest="socket_timeout",
+        default=10,
+        type=int,
+        help="Seconds before a idle client connection is closed",
+    )
+    group.add_argument(
+        "--shutdown-timeout",
+        dest="shutdown_timeout",
+        default=5,
+        type=int,
+        help="Seconds in-flight requests get to finish when stopping",
+    )
+    group.add_argument(
+        "--max-request-header-size",
+        dest="max_request_header_size",
+        default=0,
+        type=int,
+        help="Maximum request header size in bytes (0 for no limit)",
+    )
+    group.add_argument(
+        "--max-request-body-size",
+        dest="max_request_body_size",
+        default=0,
+        type=int,
+        help="Maximum request body size in bytes (0 for no limit)",
+    )
+    group.add_argument(
+        "--workers",
+        default=1,
+        type=positive_int,
+        help="Number of pre-forked server processes sharing the port with "
+        "SO_REUSEPORT, SIGHUP gracefully restarts them",
+    )
+    group.add_argument(
+        "--asgi",
+        action="store_true",
+        help="Serve the trades, trades_sessions, user, auth and events API "
+        "namespaces asynchronously with uvicorn, requires a PostgreSQL database "
+        "and the asgi extra",
+    )
+
+
+def add_compression_parser(parser):
+    """Add response compression options to the argument parser"""
+    group = parser.add_argument_group(title="Response compression")
+    group.add_argument(
+        "--disable-compression",
+        action="store_true",
+        dest="disable_compression",
+        help="Disable response compression (e.g. when behind a compressing proxy)",
+    )
+    group.add_argument(
+        "--compression-min-size",
+        dest="compression_min_size",
+        default=DEFAULT_MIN_SIZE,
+        type=int,
+        help="Minimum size in bytes of a response to compress",
+    )
+    group.add_argument(
+        "--compression-level",
+        dest="compression_level",
+        default=DEFAULT_GZIP_LEVEL,
+        type=int,
+        choices=range(1, 10),
+        metavar="{1..9}",
+        help="gzip compression level",
+    )
+    group.add_argument(
+        "--brotli-quality",
+        dest="brotli_quality",
+        default=DEFAULT_BROTLI_QUALITY,
+        type=int,
+        choices=range(0, 12),
+        metavar="{0..11}",
+        help="brotli compression quality, if the brotli extra is installed",
+    )
+
+
+def add_pool_parser(parser):
+    """Add database connection pool options to the argument parser"""
+    group = parser.add_argument_group(
+        title="Database connection pool",
+        description="Ignored for SQLite databases",
+    )
+    group.add_argument(
+        "--pool-size",
+        dest="pool_size",
+        default=DEFAULT_POOL_SIZE,
+        type=int,
+        help="Number of database connections kept open",
+    )
+    group.add_argument(
+        "--max-overflow",
+        dest="max_overflow",
+        default=DEFAULT_MAX_OVERFLOW,
+        type=int,
+        help="Number of extra database connections opened during bursts",
+    )
+    group.add_argument(
+        "--pool-timeout",
+        dest="pool_timeout",
+        default=DEFAULT_POOL_TIMEOUT,
+        type=float,
+        help="Seconds to wait for a free database connection",
+    )
+    group.add_argument(
+        "--pool-recycle",
+        dest="pool_recycle",
+        default=DEFAULT_POOL_RECYCLE,
+        type=int,
+        help="Seconds after which a database connection is reopened (-1 disables)",
+    )
+    group.add_argument(
+        "--pool-pre-ping",
+        dest="pool_pre_ping",
+        action="store_true",
+        help="Test database connections for liveness upon each checkout",
+    )
+
+
+def add_db_parser(parser):
+    """Add the ``db`` database management subcommands to the argument parser"""
+    subparsers = parser.add_subparsers(dest="command", title="Commands")
+    db_parser = subparsers.add_parser(
+        "db",
+        help="Manage the autotradeweb database schema",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    db_subparsers = db_parser.add_subparsers(
+        dest="db_command", title="Database commands"
+    )
+    db_subparsers.required = True
+    db_subparsers.add_parser(
+        "upgrade", help="Create missing tables and apply pending schema migrations"
+    )
+
+
+def db_command(args) -> int:
+    """Run the ``db`` subcommand specified by the parsed arguments"""
+    if args.db_command == "upgrade":
+        db.create_all()
+        applied_migrations = upgrade(db.engine)
+        for migration_ in applied_migrations:
+            __log__.info(
+                f"applied schema migration {migration_.version}: {migration_.description}"
+            )
+        __log__.info(f"applied {len(applied_migrations)} schema migrations")
+    return 0
+
+
+def get_wsgi_app(args):
+    """Get the flask app wrapped in the request metrics and the response
+    compression configured by the parsed arguments"""
+    if args.disable_compression:
+        return MetricsMiddleware(APP)
+    return MetricsMiddleware(
+        CompressionMiddleware(
+            APP,
+            min_size=args.compression_min_size,
+            level=args.compression_level,
+            brotli_quality=args.brotli_quality,
+        )
+    )
+
+
+def make_server(args, server_class=WSGIServer) -> WSGIServer:
+    """Create the cheroot server of the flask app configured by the parsed
+    arguments"""
+    path_info_dispatcher = PathInfoDispatcher({"/": get_wsgi_app(args)})
+    # See SRS: S.8.R.4
+    server = server_class(
+        (args.host, args.port),
+        path_info_dispatcher,
+        numthreads=args.threads,
+        max=args.max_threads,
+        request_queue_size=args.request_queue_size,
+        timeout=args.socket_timeout,
+        shutdown_timeout=args.shutdown_timeout,
+    )
+    server.max_request_header_size = args.max_request_header_size
+    server.max_request_body_size = args.max_request_body_size
+    track_thread_pool(server.requests)
+    return server
+
+
+def dispose_engines():
+    """Dispose the engines of the primary database and of every bind, so that
+    a forked worker process never shares the pooled connections of its
+    master"""
+    db.get_engine(APP).dispose()
+    for bind in APP.config.get("SQLALCHEMY_BINDS") or {}:
+        db.get_engine(APP, bind=bind).dispose()
+
+
+def serve_asgi(args, parser) -> int:
+    """Serve the async API namespaces, and the flask app for every other
+    route, with uvicorn"""
+    try:
+        import uvicorn
+
+        from autotradeweb.asgi import create_app
+    except ImportError as e:
+        parser.error(
+            f"--asgi requires the asgi extra (pip install autotradeweb[asgi]): {e}"
+        )
+    try:
+        app = create_app(
+            args.database,
+            pool_size=args.pool_size,
+            max_overflow=args.max_overflow,
+            wsgi_app=get_wsgi_app(args),
+            pool_timeout=args.pool_timeout,
+            pool_recycle=args.pool_recycle,
+            read_database_uri=args.read_database,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    uvicorn.run(
+        app,
+        host=args.host,
+        port=args.port,
+        timeout_keep_alive=args.socket_timeout,
+        timeout_graceful_shutdown=args.shutdown_timeout,
+        log_config=None,
+        access_log=False,
+    )
+    return 0
+
+
 def main(argv=sys.argv[1:]) -> int:
     """main entry point for the autotradeweb server"""
     parser = get_parser()
     args = parser.parse_args(argv)
+    if args.workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        parser.error("--workers requires SO_REUSEPORT support")
+    if args.asgi and args.workers > 1:
+        parser.error("--asgi does not support --workers")
     init_logging(args, "autotradeweb.log")
 
+    if args.command == "db":
+        APP.config["SQLALCHEMY_DATABASE_URI"] = args.database
+        return db_command(args)
+
     # monkey patch courtesy of
     # https://github.com/noirbizarre/flask-restplus/issues/54
     # so that /swagger.json is served over https
@@ -147,12 +458,29 @@ def main(argv=sys.argv[1:]) -> int:
 
     __log__.info("starting server: host: {} port: {}".format(args.host, args.port))
     APP.config["SQLALCHEMY_DATABASE_URI"] = args.database
+    APP.config["SQLALCHEMY_ENGINE_OPTIONS"] = get_engine_options(
+        args.database,
+        pool_size=args.pool_size,
+        max_overflow=args.max_overflow,
+        pool_timeout=args.pool_timeout,
+        pool_recycle=args.pool_recycle,
+        pool_pre_ping=args.pool_pre_ping,
+    )
+    if args.read_database:
+        APP.config["SQLALCHEMY_BINDS"] = {READ_BIND_KEY: args.read_database}
+    FIGURE_CACHE.maxsize = args.figure_cache_size
+    if args.asgi:
+        return serve_asgi(args, parser)
     if args.debug:
         APP.run(host=args.host, port=args.port, debug=True)
     else:
-        path_info_dispatcher = PathInfoDispatcher({"/": APP})
-        # See SRS: S.8.R.4
-        server = WSGIServer((args.host, args.port), path_info_dispatcher)
+        if args.workers > 1:
+            return PreforkServer(
+                lambda: make_server(args, server_class=ReusePortWSGIServer),
+                args.workers,
+                on_worker_start=dispose_engines,
+            ).run()
+        server = make_server(args)
         try:
             server.start()
         except KeyboardInterrupt:
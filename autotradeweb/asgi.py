@@ -0,0 +1,675 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Async (ASGI) serving of the ``trades``, ``trades_sessions``, ``user``,
+``auth`` and ``events`` API namespaces
+
+The namespaces are served by Starlette on a asyncio event loop with the
+asyncpg PostgreSQL driver, so requests waiting on the database do not each
+hold a server thread. Their queries are the SQLAlchemy Core statements of the
+WSGI resources compiled for asyncpg, and their responses are marshalled with
+the same flask-restx models. Every other route (pages, the dashboard, the
+swagger docs and the remaining API namespaces) falls through to the Flask
+WSGI app.
+
+Requires the ``asgi`` extra::
+
+    pip install autotradeweb[asgi]
+"""
+
+import asyncio
+import base64
+import binascii
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from logging import getLogger
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+import asyncpg
+from flask_restx import marshal
+from sqlalchemy import and_, select, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine.url import make_url
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.http import is_resource_modified
+
+from autotradeweb.auth import (
+    API_TOKEN_MAX_AGE,
+    create_api_token,
+    get_bearer_token,
+    get_credential_key,
+    load_api_token,
+)
+from autotradeweb.events import (
+    BROKER,
+    EVENT_BUFFER_SIZE,
+    EVENT_KEEPALIVE,
+    KEEPALIVE_MESSAGE,
+    RETRY_MESSAGE,
+    format_event,
+    get_libpq_dsn,
+    get_notify_statement,
+    start_event_listener,
+)
+from autotradeweb.pagination import page_headers, parse_page_args, split_page
+from autotradeweb.pool import (
+    DEFAULT_MAX_OVERFLOW,
+    DEFAULT_POOL_RECYCLE,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_POOL_TIMEOUT,
+)
+from autotradeweb.server import (
+    API_TOKEN,
+    APP,
+    CREDENTIAL_CACHE,
+    CREDENTIAL_CACHE_TTL,
+    READ_YOUR_WRITES_WINDOW,
+    TRADE,
+    TRADING_SESSION,
+    USER,
+    User,
+    get_session_trade_totals_updates,
+    get_touch_user_statement,
+    get_user_validators,
+    parse_iso_datetime,
+    select_user_trades,
+    trade,
+    trading_session,
+    validate_trade,
+)
+
+__log__ = getLogger(__name__)
+
+SESSIONS = trading_session.__table__
+TRADES = trade.__table__
+USERS = User.__table__
+
+SESSION_KEY_COLUMNS = [SESSIONS.c.session_id]
+TRADE_KEY_COLUMNS = [TRADES.c.time_stamp, TRADES.c.trade_id]
+
+# statements are compiled with ``%s`` placeholders, which are renumbered into
+# the ``$n`` placeholders of asyncpg
+_DIALECT = postgresql.dialect(paramstyle="format")
+_PLACEHOLDER = re.compile(r"%%|%s")
+
+
+def compile_statement(statement) -> Tuple[str, list]:
+    """Compile a SQLAlchemy Core statement into asyncpg SQL and parameters
+
+    Python side column defaults of inserts and updates are filled in, as
+    there is no SQLAlchemy execution context to fill them in.
+    """
+    compiled = statement.compile(dialect=_DIALECT)
+    params = dict(compiled.params)
+    for column in compiled.insert_prefetch:
+        params[column.key] = get_default_value(column.default)
+    for column in compiled.update_prefetch:
+        params[column.key] = get_default_value(column.onupdate)
+    placeholders = iter(range(1, len(compiled.positiontup) + 1))
+    sql = _PLACEHOLDER.sub(
+        lambda match: "%" if match.group() == "%%" else f"${next(placeholders)}",
+        str(compiled),
+    )
+    return sql, [params[name] for name in compiled.positiontup]
+
+
+def get_default_value(default):
+    """Get the value of a scalar or Python callable column default"""
+    return default.arg if default.is_scalar else default.arg(None)
+
+
+def get_asyncpg_dsn(database_uri: str) -> str:
+    """Get the asyncpg DSN of a SQLAlchemy PostgreSQL database URI"""
+    url = make_url(database_uri)
+    if url.get_backend_name() != "postgresql":
+        raise ValueError(f"the ASGI server requires a PostgreSQL database: {url}")
+    return get_libpq_dsn(url)
+
+
+async def fetch(connection, statement) -> List[dict]:
+    """Fetch the rows of a statement as ``dict`` rows"""
+    sql, params = compile_statement(statement)
+    return [dict(record) for record in await connection.fetch(sql, *params)]
+
+
+async def execute(connection, statement):
+    """Execute a statement without fetching its rows"""
+    sql, params = compile_statement(statement)
+    await connection.execute(sql, *params)
+
+
+def acquire(request: Request, read: bool = False):
+    """Acquire a pooled connection of the primary database, or of the read
+    replica for a ``read`` that :func:`check_modified` did not pin to the
+    primary"""
+    pool = request.app.state.pool
+    if read and not getattr(request.state, "primary_pinned", False):
+        pool = request.app.state.read_pool
+    return pool.acquire(timeout=request.app.state.pool_timeout)
+
+
+async def fetch_all(request: Request, statement, read: bool = False) -> List[dict]:
+    """Fetch the rows of a statement on a pooled connection"""
+    async with acquire(request, read) as connection:
+        return await fetch(connection, statement)
+
+
+async def fetch_first(
+    request: Request, statement, not_found: str, read: bool = False
+) -> dict:
+    """Fetch the first row of a statement, responding 404 if there is none"""
+    rows = await fetch_all(request, statement, read)
+    if not rows:
+        raise HTTPException(404, not_found)
+    return rows[0]
+
+
+def parse_datetime(value, name: str) -> datetime:
+    """Parse a ISO 8601 payload datetime, responding 400 if it is invalid"""
+    try:
+        return parse_iso_datetime(value)
+    except ValueError:
+        raise HTTPException(400, f"{name} must be a ISO 8601 datetime")
+
+
+async def get_payload(request: Request) -> dict:
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(400, "payload must be JSON")
+    if not isinstance(payload, dict):
+        raise HTTPException(400, "payload must be a JSON object")
+    return payload
+
+
+############################
+# Authentication
+# See SRS: S.9.R.1
+# See SRS: S.9.R.2
+# See SRS: S.9.R.3
+############################
+
+
+async def authenticate(request: Request) -> str:
+    """Get the username of the request's bearer token or basic credentials
+
+    Basic credentials are checked against and cached in the same credential
+    cache as :func:`autotradeweb.server.validate_login`.
+    """
+    authorization = request.headers.get("Authorization", "")
+    token = get_bearer_token(authorization)
+    if token is not None:
+        username = load_api_token(token, secret_key=request.app.state.secret_key)
+        if username is None:
+            raise HTTPException(
+                401,
+                "Invalid or expired token",
+                headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+            )
+        return username
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() == "basic":
+        try:
+            username, _, password = (
+                base64.b64decode(credentials).decode("utf-8").partition(":")
+            )
+        except (binascii.Error, UnicodeDecodeError):
+            username, password = None, None
+        if username is not None:
+            credential_key = get_credential_key(username, password)
+            expires_at = CREDENTIAL_CACHE.get(credential_key)
+            if expires_at is not None and time.monotonic() < expires_at:
+                return username
+            users = await fetch_all(
+                request,
+                select([USERS.c.password]).where(USERS.c.username == username),
+            )
+            if users and users[0]["password"] == password:
+                CREDENTIAL_CACHE.put(
+                    credential_key, time.monotonic() + CREDENTIAL_CACHE_TTL
+                )
+                return username
+    raise HTTPException(
+        401,
+        "Invalid credentials",
+        headers={"WWW-Authenticate": 'Basic realm="Login Required"'},
+    )
+
+
+async def http_exception(request: Request, exc: HTTPException) -> JSONResponse:
+    """Respond with a flask-restx style ``{"message": ...}`` error body"""
+    if exc.status_code == 304:
+        return Response(status_code=304, headers=exc.headers)
+    return JSONResponse(
+        {"message": exc.detail}, status_code=exc.status_code, headers=exc.headers
+    )
+
+
+async def api_token(request: Request) -> JSONResponse:
+    """Issue a bearer token for the authenticated user"""
+    username = await authenticate(request)
+    return JSONResponse(
+        marshal(
+            {
+                "access_token": create_api_token(
+                    username, secret_key=request.app.state.secret_key
+                ),
+                "token_type": "Bearer",
+                "expires_in": API_TOKEN_MAX_AGE,
+            },
+            API_TOKEN,
+        ),
+        status_code=201,
+    )
+
+
+############################
+# API
+# See SRS: S.10.R.1
+############################
+
+
+async def check_modified(request: Request, username: str) -> dict:
+    """Get the validator headers of the resources of the authenticated user,
+    responding ``304 Not Modified`` if the request's validators are current
+
+    The user is read from the primary. If the user changed within
+    :data:`autotradeweb.server.READ_YOUR_WRITES_WINDOW` the reads of the rest
+    of the request are pinned to the primary.
+
+    See :func:`autotradeweb.server.conditional_view`.
+    """
+    user = await fetch_first(
+        request,
+        select([USERS.c.id, USERS.c.revision, USERS.c.modified_at]).where(
+            USERS.c.username == username
+        ),
+        "user not found",
+    )
+    modified_at = user["modified_at"]
+    if (
+        modified_at is not None
+        and datetime.utcnow() - modified_at < READ_YOUR_WRITES_WINDOW
+    ):
+        request.state.primary_pinned = True
+    headers = get_user_validators(user["id"], user["revision"])
+    environ = {"HTTP_IF_NONE_MATCH": request.headers.get("If-None-Match")}
+    if not is_resource_modified(environ, etag=headers["ETag"]):
+        raise HTTPException(304, headers=headers)
+    return headers
+
+
+async def list_page(
+    request: Request,
+    statement,
+    key_columns,
+    model,
+    headers: dict,
+    select_page: Optional[Callable] = None,
+) -> JSONResponse:
+    """Respond with the rows of a statement, keyset paginated if asked for
+
+    :param select_page: callable getting the statement of the first ``limit``
+        rows after a keyset, used instead of filtering ``statement``
+    """
+    try:
+        limit, after = parse_page_args(
+            request.query_params.get("limit"),
+            request.query_params.get("after"),
+            key_columns,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    statement = statement.order_by(*key_columns)
+    if limit is None:
+        return JSONResponse(
+            marshal(await fetch_all(request, statement, read=True), model),
+            headers=headers,
+        )
+    if select_page is not None:
+        statement = select_page(limit + 1, after)
+    else:
+        if after is not None:
+            statement = statement.where(tuple_(*key_columns) > tuple_(*after))
+        statement = statement.limit(limit + 1)
+    rows = await fetch_all(request, statement, read=True)
+    rows, next_cursor = split_page(rows, key_columns, limit)
+    base_url = str(request.url.replace(query=""))
+    headers = dict(headers, **page_headers(limit, next_cursor, base_url))
+    return JSONResponse(marshal(rows, model), headers=headers)
+
+
+async def list_trading_sessions(request: Request) -> JSONResponse:
+    """Get the trade sessions of the authenticated user"""
+    username = await authenticate(request)
+    headers = await check_modified(request, username)
+    return await list_page(
+        request,
+        select([SESSIONS]).where(SESSIONS.c.username == username),
+        SESSION_KEY_COLUMNS,
+        TRADING_SESSION,
+        headers,
+    )
+
+
+async def create_trading_session(request: Request) -> JSONResponse:
+    """Add a trade session to the authenticated user"""
+    username = await authenticate(request)
+    payload = await get_payload(request)
+    if not payload.get("ticker"):
+        raise HTTPException(400, "ticker is required")
+    end_time = payload.get("end_time")
+    statement = (
+        SESSIONS.insert()
+        .values(
+            username=username,
+            ticker=payload["ticker"],
+            start_time=parse_datetime(payload.get("start_time"), "start_time"),
+            end_time=end_time and parse_datetime(end_time, "end_time"),
+            is_paused=bool(payload.get("is_paused", False)),
+            is_finished=bool(payload.get("is_finished", False)),
+        )
+        .returning(*SESSIONS.c)
+    )
+    row = await fetch_trading_session_change(request, username, statement)
+    return JSONResponse(row, status_code=201)
+
+
+async def fetch_trading_session_change(
+    request: Request, username: str, statement, not_found: Optional[str] = None
+) -> dict:
+    """Fetch the trading session returned by a insert or update statement and
+    publish it to the user's event streams within the same transaction"""
+    async with acquire(request) as connection:
+        async with connection.transaction():
+            rows = await fetch(connection, statement)
+            if not rows:
+                raise HTTPException(404, not_found)
+            row = marshal(rows[0], TRADING_SESSION)
+            await execute(
+                connection,
+                get_notify_statement(username, [("trading_session", row)]),
+            )
+            await execute(connection, get_touch_user_statement(username))
+    return row
+
+
+def user_session(username: str, session_id: int):
+    return and_(SESSIONS.c.session_id == session_id, SESSIONS.c.username == username)
+
+
+async def get_trading_session(request: Request) -> JSONResponse:
+    """Get a trade session of the authenticated user"""
+    username = await authenticate(request)
+    headers = await check_modified(request, username)
+    row = await fetch_first(
+        request,
+        select([SESSIONS]).where(
+            user_session(username, request.path_params["session_id"])
+        ),
+        "trading session not found",
+        read=True,
+    )
+    return JSONResponse(marshal(row, TRADING_SESSION), headers=headers)
+
+
+def update_trading_session(**values):
+    """Make a endpoint setting ``values`` on a trade session of the
+    authenticated user"""
+
+    async def endpoint(request: Request) -> JSONResponse:
+        username = await authenticate(request)
+        row = await fetch_trading_session_change(
+            request,
+            username,
+            SESSIONS.update()
+            .where(user_session(username, request.path_params["session_id"]))
+            .values(**values)
+            .returning(*SESSIONS.c),
+            "trading session not found",
+        )
+        return JSONResponse(row)
+
+    return endpoint
+
+
+def user_trades(username: str):
+    return (
+        select([TRADES])
+        .select_from(
+            TRADES.join(SESSIONS, TRADES.c.session_id == SESSIONS.c.session_id)
+        )
+        .where(SESSIONS.c.username == username)
+    )
+
+
+async def list_trades(request: Request) -> JSONResponse:
+    """Get the stock trades of the authenticated user
+
+    Trades are ordered by ``(time_stamp, trade_id)``.
+    """
+    username = await authenticate(request)
+    headers = await check_modified(request, username)
+    return await list_page(
+        request,
+        user_trades(username),
+        TRADE_KEY_COLUMNS,
+        TRADE,
+        headers,
+        lambda limit, after: select_user_trades(username, limit, after),
+    )
+
+
+async def create_trade(request: Request) -> JSONResponse:
+    """Add a stock trade to a running trade session of the authenticated user"""
+    username = await authenticate(request)
+    payload = await get_payload(request)
+    invalid_reason = validate_trade(payload)
+    if invalid_reason:
+        raise HTTPException(400, invalid_reason)
+    new_trade = trade(
+        price=payload["price"],
+        trade_type=payload["trade_type"],
+        volume=payload["volume"],
+        session_id=payload["session_id"],
+        time_stamp=parse_datetime(payload["time_stamp"], "time_stamp"),
+    )
+    async with acquire(request) as connection:
+        async with connection.transaction():
+            running_sessions = await fetch(
+                connection,
+                select([SESSIONS.c.session_id]).where(
+                    and_(
+                        user_session(username, new_trade.session_id),
+                        SESSIONS.c.is_finished == False,
+                        SESSIONS.c.is_paused == False,
+                    )
+                ),
+            )
+            if not running_sessions:
+                raise HTTPException(404, "trading session not found")
+            (row,) = await fetch(
+                connection,
+                TRADES.insert()
+                .values(
+                    price=new_trade.price,
+                    trade_type=new_trade.trade_type,
+                    volume=new_trade.volume,
+                    session_id=new_trade.session_id,
+                    time_stamp=new_trade.time_stamp,
+                )
+                .returning(*TRADES.c),
+            )
+            for update in get_session_trade_totals_updates([new_trade]):
+                await execute(connection, update)
+            row = marshal(row, TRADE)
+            await execute(connection, get_notify_statement(username, [("trade", row)]))
+            await execute(connection, get_touch_user_statement(username))
+    return JSONResponse(row, status_code=201)
+
+
+async def get_trade(request: Request) -> JSONResponse:
+    """Get a stock trade of the authenticated user"""
+    username = await authenticate(request)
+    headers = await check_modified(request, username)
+    row = await fetch_first(
+        request,
+        user_trades(username).where(
+            TRADES.c.trade_id == request.path_params["trade_id"]
+        ),
+        "trade not found",
+        read=True,
+    )
+    return JSONResponse(marshal(row, TRADE), headers=headers)
+
+
+async def get_user(request: Request) -> JSONResponse:
+    """Get the authenticated user"""
+    username = await authenticate(request)
+    row = await fetch_first(
+        request,
+        select([USERS.c.username, USERS.c.bank]).where(USERS.c.username == username),
+        "user not found",
+    )
+    return JSONResponse(marshal(row, USER))
+
+
+async def iter_event_stream(
+    username: str, keepalive: float = EVENT_KEEPALIVE
+) -> AsyncIterator[str]:
+    """Yield the ``text/event-stream`` messages of the events of a user until
+    the client disconnects or falls too far behind"""
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue(EVENT_BUFFER_SIZE)
+
+    def put(event: str, data: dict):
+        loop.call_soon_threadsafe(put_nowait, (event, data))
+
+    def put_nowait(item):
+        try:
+            events.put_nowait(item)
+        except asyncio.QueueFull:
+            # a empty event closes the stream
+            events.get_nowait()
+            events.put_nowait(None)
+
+    BROKER.subscribe(username, put)
+    try:
+        yield RETRY_MESSAGE
+        while True:
+            try:
+                item = await asyncio.wait_for(events.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE_MESSAGE
+                continue
+            if item is None:
+                break
+            yield format_event(*item)
+    finally:
+        BROKER.unsubscribe(username, put)
+
+
+async def stream_events(request: Request) -> StreamingResponse:
+    """Stream the trade and trading session events of the authenticated user
+    as server-sent events"""
+    username = await authenticate(request)
+    await asyncio.get_running_loop().run_in_executor(
+        None, start_event_listener, request.app.state.database_uri
+    )
+    return StreamingResponse(
+        iter_event_stream(username),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+ROUTES = [
+    Route("/events/", stream_events, methods=["GET"]),
+    Route("/auth/token", api_token, methods=["POST"]),
+    Route("/trades_sessions/", list_trading_sessions, methods=["GET"]),
+    Route("/trades_sessions/", create_trading_session, methods=["POST"]),
+    Route("/trades_sessions/{session_id:int}", get_trading_session, methods=["GET"]),
+    Route(
+        "/trades_sessions/{session_id:int}/pause",
+        update_trading_session(is_paused=True),
+        methods=["POST"],
+    ),
+    Route(
+        "/trades_sessions/{session_id:int}/start",
+        update_trading_session(is_paused=False),
+        methods=["POST"],
+    ),
+    Route(
+        "/trades_sessions/{session_id:int}/finish",
+        update_trading_session(is_finished=True),
+        methods=["POST"],
+    ),
+    Route("/trades/", list_trades, methods=["GET"]),
+    Route("/trades/", create_trade, methods=["POST"]),
+    Route("/trades/{trade_id:int}", get_trade, methods=["GET"]),
+    Route("/user/", get_user, methods=["GET"]),
+]
+
+
+def create_app(
+    database_uri: str,
+    secret_key=None,
+    pool_size: int = DEFAULT_POOL_SIZE,
+    max_overflow: int = DEFAULT_MAX_OVERFLOW,
+    wsgi_app=APP,
+    pool_timeout: float = DEFAULT_POOL_TIMEOUT,
+    pool_recycle: int = DEFAULT_POOL_RECYCLE,
+    read_database_uri: Optional[str] = None,
+) -> Starlette:
+    """Create the ASGI app serving the async API namespaces, with every other
+    route falling through to ``wsgi_app``
+
+    :param secret_key: key of the bearer tokens, defaults to the
+        ``SECRET_KEY`` of :data:`autotradeweb.server.APP` so that tokens are
+        interchangeable between the ASGI and WSGI routes
+    :param pool_timeout: seconds to wait for a free pooled connection
+    :param pool_recycle: seconds after which a idle pooled connection is
+        closed, ``-1`` keeps idle connections open
+    :param read_database_uri: URI of a read replica of the database to send
+        the reads of the trade and trading session listings to
+    """
+    dsn = get_asyncpg_dsn(database_uri)
+    read_dsn = read_database_uri and get_asyncpg_dsn(read_database_uri)
+    pool_options = {
+        "min_size": 1,
+        "max_size": pool_size + max(max_overflow, 0),
+        # asyncpg only recycles idle connections
+        "max_inactive_connection_lifetime": max(pool_recycle, 0),
+    }
+
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.pool = await asyncpg.create_pool(dsn, **pool_options)
+        app.state.read_pool = app.state.pool
+        try:
+            if read_dsn:
+                app.state.read_pool = await asyncpg.create_pool(
+                    read_dsn, **pool_options
+                )
+            yield
+        finally:
+            if app.state.read_pool is not app.state.pool:
+                await app.state.read_pool.close()
+            await app.state.pool.close()
+
+    app = Starlette(
+        routes=ROUTES + [Mount("/", WSGIMiddleware(wsgi_app))],
+        exception_handlers={HTTPException: http_exception},
+        lifespan=lifespan,
+    )
+    app.state.database_uri = database_uri
+    app.state.pool_timeout = pool_timeout
+    app.state.secret_key = APP.secret_key if secret_key is None else secret_key
+    return app
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Fingerprinted and precompressed static assets
+
+The files of the static folder are read once at startup. Each file is served
+under a name holding a hash of its content (``stylesheet.css`` becomes
+``stylesheet.<hash>.css``), so the content of a fingerprinted URL never
+changes and browsers can cache it for good. The files are also compressed
+ahead of time with every available encoding at the highest level, as it is
+only done once.
+"""
+
+import hashlib
+import mimetypes
+import os
+import posixpath
+from collections import namedtuple
+from typing import Dict, Optional
+
+from flask import Response
+
+from autotradeweb.compression import (
+    COMPRESSIBLE_MIMETYPES,
+    compress,
+    get_encodings,
+    negotiate_encoding,
+)
+
+FINGERPRINT_LENGTH = 12
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+ASSET_GZIP_LEVEL = 9
+ASSET_BROTLI_QUALITY = 11
+
+# ``encoded`` maps each content encoding, ``None`` for identity, to the bytes
+Asset = namedtuple("Asset", ["mimetype", "fingerprint", "encoded"])
+
+
+def get_fingerprinted_path(path: str, fingerprint: str) -> str:
+    base, extension = posixpath.splitext(path)
+    return f"{base}.{fingerprint}{extension}"
+
+
+class StaticAssets:
+    """The fingerprinted and precompressed files of a static folder
+
+    Hidden files are skipped.
+    """
+
+    def __init__(self, static_folder: str):
+        self.static_folder = static_folder
+        self.paths = {}  # type: Dict[str, str]
+        self.assets = {}  # type: Dict[str, Asset]
+        for directory, _, file_names in os.walk(static_folder):
+            for file_name in file_names:
+                if file_name.startswith("."):
+                    continue
+                file_path = os.path.join(directory, file_name)
+                path = os.path.relpath(file_path, static_folder)
+                self.add(path.replace(os.sep, "/"), file_path)
+
+    def add(self, path: str, file_path: str):
+        with open(file_path, "rb") as f:
+            data = f.read()
+        fingerprint = hashlib.sha256(data).hexdigest()[:FINGERPRINT_LENGTH]
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        encoded = {None: data}
+        if mimetype in COMPRESSIBLE_MIMETYPES:
+            for encoding in get_encodings():
+                compressed = compress(
+                    data, encoding, ASSET_GZIP_LEVEL, ASSET_BROTLI_QUALITY
+                )
+                if len(compressed) < len(data):
+                    encoded[encoding] = compressed
+        fingerprinted_path = get_fingerprinted_path(path, fingerprint)
+        self.paths[path] = fingerprinted_path
+        self.assets[fingerprinted_path] = Asset(mimetype, fingerprint, encoded)
+
+    def url_path(self, path: str) -> str:
+        """Get the fingerprinted path of a static file, paths that are not of
+        a static file are returned as is"""
+        return self.paths.get(path, path)
+
+    def get_response(self, path: str, accept_encoding: str) -> Optional[Response]:
+        """Get the response of a fingerprinted path in the encoding preferred
+        by the ``Accept-Encoding`` request header, or ``None`` if the path is
+        not fingerprinted"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+        encoding = negotiate_encoding(
+            accept_encoding, [encoding for encoding in asset.encoded if encoding]
+        )
+        response = Response(asset.encoded[encoding], mimetype=asset.mimetype)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        response.headers["Vary"] = "Accept-Encoding"
+        if encoding is None:
+            response.set_etag(asset.fingerprint)
+        else:
+            response.headers["Content-Encoding"] = encoding
+            response.set_etag(f"{asset.fingerprint}-{encoding}")
+        return response
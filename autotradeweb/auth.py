@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Signed bearer token and cached credential API authentication
+
+Bearer tokens are signed with the Flask ``SECRET_KEY`` and carry their
+username and issue time, so checking one never touches the database.
+"""
+
+import hashlib
+from typing import Optional
+
+from flask import current_app, request, session
+from flask_simplelogin import SimpleLogin
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# seconds a issued bearer token is valid for
+API_TOKEN_MAX_AGE = 3600
+
+API_TOKEN_SALT = "autotradeweb-api-token"
+
+
+def get_token_serializer(secret_key=None) -> URLSafeTimedSerializer:
+    """Get the token serializer of ``secret_key``, defaulting to the
+    ``SECRET_KEY`` of the current Flask app"""
+    if secret_key is None:
+        secret_key = current_app.secret_key
+    return URLSafeTimedSerializer(secret_key, salt=API_TOKEN_SALT)
+
+
+def create_api_token(username: str, secret_key=None) -> str:
+    """Create a signed bearer token for ``username``"""
+    return get_token_serializer(secret_key).dumps({"username": username})
+
+
+def load_api_token(
+    token: str, max_age: int = API_TOKEN_MAX_AGE, secret_key=None
+) -> Optional[str]:
+    """Get the username of a bearer token created by :func:`create_api_token`
+
+    :return: the username, or :obj:`None` if the token is invalid or expired
+    """
+    try:
+        payload = get_token_serializer(secret_key).loads(token, max_age=max_age)
+    except BadSignature:
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get("username"), str):
+        return None
+    return payload["username"]
+
+
+def get_bearer_token(authorization: Optional[str] = None) -> Optional[str]:
+    """Get the bearer token of a ``Authorization`` header, defaulting to that
+    of the current Flask request"""
+    if authorization is None:
+        authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+def get_credential_key(username: str, password: str) -> tuple:
+    """Get the credential cache key of a username and password
+
+    The password is hashed so that plaintext passwords are not kept within
+    the cache.
+    """
+    return username, hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+
+class TokenSimpleLogin(SimpleLogin):
+    """:class:`flask_simplelogin.SimpleLogin` that also accepts bearer tokens
+    for ``login_required(basic=True)`` views"""
+
+    def basic_auth(self, response=None):
+        token = get_bearer_token()
+        if token is None:
+            return super().basic_auth(response)
+        username = load_api_token(token)
+        if username is None:
+            headers = {"WWW-Authenticate": 'Bearer error="invalid_token"'}
+            return "Invalid or expired token", 401, headers
+        session["simple_logged_in"] = True
+        session["simple_basic_auth"] = True
+        session["simple_username"] = username
+        return response or True
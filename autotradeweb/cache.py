@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""In-process caches of expensive database reads and dashboard figures"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class TTLCache:
+    """Cache the result of ``loader`` for ``ttl`` seconds
+
+    The cached value is shared between the server threads, a reload after
+    expiry or :meth:`invalidate` is only done by one thread at a time.
+    """
+
+    def __init__(self, loader: Callable, ttl: float, clock: Callable = time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires_at = None  # type: Optional[float]
+
+    def get(self):
+        """Get the cached value, loading it if it is missing or expired"""
+        with self._lock:
+            if self._expires_at is None or self.clock() >= self._expires_at:
+                self._value = self.loader()
+                self._expires_at = self.clock() + self.ttl
+            return self._value
+
+    def invalidate(self):
+        """Drop the cached value so that the next :meth:`get` reloads it"""
+        with self._lock:
+            self._value = None
+            self._expires_at = None
+
+
+class LRUCache:
+    """Bounded least recently used cache with hit and miss counters"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # type: OrderedDict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Get the value cached for ``key``, or ``default`` if it is missing"""
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Cache ``value`` for ``key``, evicting the least recently used
+        entries beyond ``maxsize``"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > max(self.maxsize, 0):
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate: Callable) -> int:
+        """Drop every entry whose key satisfies ``predicate``
+
+        :return: the number of dropped entries
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def stats(self) -> dict:
+        """Get the size and counters of the cache"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compression of WSGI responses negotiated by the ``Accept-Encoding``
+request header
+
+Brotli is used when the optional ``brotli`` package is installed and the
+client accepts it, falling back to gzip otherwise::
+
+    pip install autotradeweb[brotli]
+"""
+
+import gzip
+from typing import List, Optional
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, quote_etag, unquote_etag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MIN_SIZE = 500
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+    "text/xml",
+}
+
+
+def get_encodings() -> List[str]:
+    """Get the available content encodings in order of preference"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Get the first of ``encodings`` most preferred by a ``Accept-Encoding``
+    request header, or ``None`` if the client accepts none of them"""
+    if not encodings:
+        return None
+    accept = parse_accept_header(accept_encoding)
+    # ties keep the first, and so the most preferred, encoding
+    encoding = max(encodings, key=accept.quality)
+    return encoding if accept.quality(encoding) > 0 else None
+
+
+def compress(data: bytes, encoding: str, level: int, brotli_quality: int) -> bytes:
+    """Compress data with a content encoding"""
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    # a fixed mtime keeps the compressed bytes deterministic
+    return gzip.compress(data, level, mtime=0)
+
+
+class CompressionMiddleware:
+    """WSGI middleware compressing the responses of ``app``
+
+    Only complete responses of a compressible type whose ``Content-Length``
+    is at least ``min_size`` bytes are compressed. Streamed responses without
+    a ``Content-Length``, such as the event streams and trade exports, are
+    passed through as is so that they are never buffered.
+
+    :param level: gzip compression level (1-9)
+    :param brotli_quality: brotli compression quality (0-11)
+    """
+
+    def __init__(
+        self,
+        app,
+        min_size: int = DEFAULT_MIN_SIZE,
+        level: int = DEFAULT_GZIP_LEVEL,
+        brotli_quality: int = DEFAULT_BROTLI_QUALITY,
+    ):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.encodings = get_encodings()
+
+    def get_encoding(self, accept_encoding: str) -> Optional[str]:
+        """Get the preferred content encoding accepted by the client, if any"""
+        return negotiate_encoding(accept_encoding, self.encodings)
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        return compress(data, encoding, self.level, self.brotli_quality)
+
+    def should_compress(self, environ, status: str, headers: Headers) -> bool:
+        content_length = headers.get("Content-Length", type=int)
+        return (
+            environ["REQUEST_METHOD"] != "HEAD"
+            # partial content is a range of the uncompressed representation
+            and status[:3] not in ("204", "206")
+            and status.startswith("2")
+            and "Content-Encoding" not in headers
+            and content_length is not None
+            and content_length >= self.min_size
+        )
+
+    def __call__(self, environ, start_response):
+        encoding = self.get_encoding(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        # the status and headers of a response to buffer and compress
+        response = []
+        body = []
+        returned = False
+
+        def compress_start_response(status, headers, exc_info=None):
+            headers = Headers(headers)
+            mimetype = headers.get("Content-Type", "").split(";")[0].strip()
+            if mimetype in COMPRESSIBLE_MIMETYPES:
+                vary = headers.get("Vary")
+                if not vary:
+                    headers["Vary"] = "Accept-Encoding"
+                elif "accept-encoding" not in vary.lower():
+                    headers["Vary"] = f"{vary}, Accept-Encoding"
+                if (
+                    encoding is not None
+                    and exc_info is None
+                    and not returned
+                    and self.should_compress(environ, status, headers)
+                ):
+                    response[:] = [status, headers]
+                    return body.append
+            response.clear()
+            return start_response(status, headers.to_wsgi_list(), exc_info)
+
+        app_iter = self.app(environ, compress_start_response)
+        returned = True
+        if not response:
+            return app_iter
+        try:
+            body.extend(app_iter)
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+        status, headers = response
+        data = b"".join(body)
+        compressed = self.compress(data, encoding)
+        if len(compressed) < len(data):
+            data = compressed
+            headers["Content-Encoding"] = encoding
+            # the compressed bytes differ from the strongly validated ones
+            etag, weak = unquote_etag(headers.get("ETag"))
+            if etag is not None and not weak:
+                headers["ETag"] = quote_etag(etag, weak=True)
+        headers["Content-Length"] = str(len(data))
+        start_response(status, headers.to_wsgi_list())
+        return [data]
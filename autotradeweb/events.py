@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Server-sent event streams of trade and trading session changes
+
+Events are published within the transaction of the change they describe and
+are only delivered once it commits. On PostgreSQL they are sent with
+``NOTIFY``, so that every server process (pre-forked workers and the ASGI
+server alike) receives them through its own ``LISTEN`` thread. On other
+databases they are delivered within the publishing process.
+
+Events are not persisted, a client that reconnects should re-sync through
+the list endpoints.
+"""
+
+import copy
+import json
+import os
+import queue
+import select
+import threading
+import time
+from logging import getLogger
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import psycopg2
+from sqlalchemy import event as sa_event, text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import Session
+
+__log__ = getLogger(__name__)
+
+EVENT_CHANNEL = "autotradeweb_events"
+
+# seconds between keep-alive comments of a idle event stream, these also
+# detect disconnected clients
+EVENT_KEEPALIVE = 15
+# events buffered for a slow client before its event stream is closed
+EVENT_BUFFER_SIZE = 1000
+# milliseconds a client waits before reconnecting a closed event stream
+EVENT_RETRY = 5000
+# seconds before a lost ``LISTEN`` connection is reopened
+LISTENER_RECONNECT_DELAY = 1.0
+
+# session.info key of the events to deliver upon commit
+PENDING_EVENTS = "pending_events"
+
+
+def format_event(event: str, data: dict) -> str:
+    """Format a event as a ``text/event-stream`` message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+KEEPALIVE_MESSAGE = ": keepalive\n\n"
+RETRY_MESSAGE = f"retry: {EVENT_RETRY}\n\n"
+
+
+class EventBroker:
+    """In-process publisher of user events to subscriber callbacks
+
+    Callbacks are called with the event name and data from the publishing
+    thread, so they must not block.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # type: Dict[str, Set[Callable]]
+
+    def subscribe(self, username: str, callback: Callable):
+        with self._lock:
+            self._subscribers.setdefault(username, set()).add(callback)
+
+    def unsubscribe(self, username: str, callback: Callable):
+        with self._lock:
+            callbacks = self._subscribers.get(username, set())
+            callbacks.discard(callback)
+            if not callbacks:
+                self._subscribers.pop(username, None)
+
+    def publish(self, username: str, event: str, data: dict):
+        with self._lock:
+            callbacks = list(self._subscribers.get(username, ()))
+        for callback in callbacks:
+            callback(event, data)
+
+    def publish_message(self, message: str):
+        """Publish a event encoded by :func:`encode_event_message`"""
+        message = json.loads(message)
+        self.publish(message["username"], message["event"], message["data"])
+
+
+BROKER = EventBroker()
+
+
+def encode_event_message(username: str, event: str, data: dict) -> str:
+    return json.dumps({"username": username, "event": event, "data": data})
+
+
+NOTIFY_EVENTS = text(
+    "SELECT pg_notify(:channel, message) "
+    "FROM unnest(CAST(:messages AS TEXT[])) AS message"
+)
+
+
+def get_notify_statement(username: str, events: List[Tuple[str, dict]]):
+    """Get the statement sending events with PostgreSQL ``NOTIFY``"""
+    return NOTIFY_EVENTS.bindparams(
+        channel=EVENT_CHANNEL,
+        messages=[
+            encode_event_message(username, event, data) for event, data in events
+        ],
+    )
+
+
+def publish_events(session, username: str, events: List[Tuple[str, dict]]):
+    """Publish ``(event, data)`` events of ``username`` once the current
+    transaction of the SQLAlchemy ``session`` commits"""
+    if not events:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(get_notify_statement(username, events))
+    else:
+        session.info.setdefault(PENDING_EVENTS, []).extend(
+            (username, event, data) for event, data in events
+        )
+
+
+def publish_event(session, username: str, event: str, data: dict):
+    """Publish a event of ``username`` once the current transaction of the
+    SQLAlchemy ``session`` commits"""
+    publish_events(session, username, [(event, data)])
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _deliver_pending_events(session):
+    for username, event, data in session.info.pop(PENDING_EVENTS, []):
+        BROKER.publish(username, event, data)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session):
+    session.info.pop(PENDING_EVENTS, None)
+
+
+class EventListener(threading.Thread):
+    """Thread publishing the events received with PostgreSQL ``LISTEN`` to
+    a :class:`EventBroker`"""
+
+    def __init__(self, dsn: str, broker: EventBroker = BROKER):
+        super().__init__(name="autotradeweb-event-listener", daemon=True)
+        self.dsn = dsn
+        self.broker = broker
+        self.listening = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                self.listen()
+            except Exception:
+                __log__.exception("event listener connection lost, reconnecting")
+            self.listening.clear()
+            time.sleep(LISTENER_RECONNECT_DELAY)
+
+    def listen(self):
+        connection = psycopg2.connect(self.dsn)
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {EVENT_CHANNEL}")
+            self.listening.set()
+            while True:
+                if select.select([connection], [], [], EVENT_KEEPALIVE)[0]:
+                    connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    try:
+                        self.broker.publish_message(notify.payload)
+                    except Exception:
+                        __log__.exception(f"failed to publish event: {notify.payload}")
+        finally:
+            connection.close()
+
+
+_listener = None  # type: Optional[EventListener]
+_listener_pid = None  # type: Optional[int]
+_listener_lock = threading.Lock()
+
+
+def get_libpq_dsn(url) -> str:
+    """Get the libpq connection URI of a SQLAlchemy PostgreSQL URL, without
+    its ``+driver`` suffix"""
+    # URL objects are immutable from SQLAlchemy 1.4
+    if hasattr(url, "set"):
+        return url.set(drivername="postgresql").render_as_string(hide_password=False)
+    url = copy.copy(url)
+    url.drivername = "postgresql"
+    return str(url)
+
+
+def start_event_listener(database_uri: str, timeout: float = 5.0):
+    """Start the event listener thread of this process, if the database is
+    PostgreSQL and it is not yet running, and wait until it listens"""
+    global _listener, _listener_pid
+    url = make_url(database_uri)
+    if url.get_backend_name() != "postgresql":
+        return
+    with _listener_lock:
+        # threads do not survive forking into server worker processes
+        if _listener is None or _listener_pid != os.getpid():
+            _listener = EventListener(get_libpq_dsn(url))
+            _listener_pid = os.getpid()
+            _listener.start()
+    if not _listener.listening.wait(timeout):
+        __log__.warning("event listener is not yet listening")
+
+
+class EventSubscription:
+    """Buffered subscription to the events of a user for a blocking event
+    stream
+
+    The subscription is closed if more than ``maxsize`` events are waiting.
+    """
+
+    def __init__(
+        self, username: str, broker: EventBroker = BROKER, maxsize=EVENT_BUFFER_SIZE
+    ):
+        self.username = username
+        self.broker = broker
+        self.events = queue.Queue(maxsize)
+        self.overflowed = False
+        broker.subscribe(username, self.put)
+
+    def put(self, event: str, data: dict):
+        try:
+            self.events.put_nowait((event, data))
+        except queue.Full:
+            self.overflowed = True
+
+    def close(self):
+        self.broker.unsubscribe(self.username, self.put)
+
+
+def iter_event_stream(
+    username: str, broker: EventBroker = BROKER, keepalive: float = EVENT_KEEPALIVE
+) -> Iterator[str]:
+    """Yield the ``text/event-stream`` messages of the events of a user until
+    the client disconnects or falls too far behind"""
+    subscription = EventSubscription(username, broker)
+    try:
+        yield RETRY_MESSAGE
+        while not subscription.overflowed:
+            try:
+                event, data = subscription.events.get(timeout=keepalive)
+            except queue.Empty:
+                yield KEEPALIVE_MESSAGE
+                continue
+            yield format_event(event, data)
+    finally:
+        subscription.close()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Prometheus metrics of the served requests, server threads and database
+queries
+
+Metrics are kept in memory by each server process and rendered in the
+Prometheus text exposition format by :meth:`Registry.render`. Recording a
+observation takes a lock and a bucket lookup, so it is cheap enough to do
+for every request and query.
+
+With ``--workers`` each scrape is answered by whichever worker process
+accepts it, so the metrics are those of that process only.
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# WSGI environ key of the endpoint label of a request, set by the app
+ENDPOINT_ENVIRON_KEY = "autotradeweb.metrics.endpoint"
+UNKNOWN_ENDPOINT = "unknown"
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            f'{name}="{escape_label_value(str(value))}"' for name, value in labels
+        )
+        + "}"
+    )
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base of the metric types, whose samples are kept per label values"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}  # type: Dict[tuple, object]
+
+    def samples(self) -> List[Tuple[str, list, float]]:
+        """Get the ``(name, labels, value)`` samples of the metric"""
+        with self._lock:
+            values = list(self._values.items())
+        return [
+            (self.name, list(zip(self.labelnames, labelvalues)), value)
+            for labelvalues, value in sorted(values)
+        ]
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def set(self, value: float, *labelvalues):
+        """Set the counter from a existing cumulative statistic"""
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues):
+        # per bucket counts are only made cumulative when rendered
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labelvalues)
+            if counts is None:
+                # bucket counts followed by the sum of the observations
+                counts = self._values[labelvalues] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def samples(self) -> List[Tuple[str, list, float]]:
+        with self._lock:
+            values = [
+                (labelvalues, list(counts))
+                for labelvalues, counts in self._values.items()
+            ]
+        samples = []
+        for labelvalues, counts in sorted(values):
+            labels = list(zip(self.labelnames, labelvalues))
+            cumulative_count = 0
+            for upper_bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative_count += count
+                samples.append(
+                    (
+                        f"{self.name}_bucket",
+                        labels + [("le", format_value(float(upper_bound)))],
+                        cumulative_count,
+                    )
+                )
+            samples.append((f"{self.name}_sum", labels, counts[-1]))
+            samples.append((f"{self.name}_count", labels, cumulative_count))
+        return samples
+
+
+class Registry:
+    """The metrics of the server process
+
+    Collect hooks are called before rendering to update the metrics that
+    mirror the state of other components, such as the connection pool.
+    """
+
+    def __init__(self):
+        self._metrics = []  # type: List[Metric]
+        self._collect_hooks = []  # type: List[Callable[[], None]]
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collect_hook(self, hook: Callable[[], None]):
+        self._collect_hooks.append(hook)
+
+    def render(self) -> str:
+        """Render the metrics in the Prometheus text exposition format"""
+        for hook in self._collect_hooks:
+            hook()
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS_IN_FLIGHT = REGISTRY.register(
+    Gauge("autotradeweb_http_requests_in_flight", "Requests currently being handled")
+)
+REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "autotradeweb_http_request_duration_seconds",
+        "Seconds until the response of a request is ready to be sent",
+        ["endpoint", "method", "status"],
+    )
+)
+SERVER_THREADS = REGISTRY.register(
+    Gauge(
+        "autotradeweb_server_threads",
+        "Request handling threads of the cheroot server",
+        ["state"],
+    )
+)
+SERVER_QUEUED_CONNECTIONS = REGISTRY.register(
+    Gauge(
+        "autotradeweb_server_queued_connections",
+        "Connections waiting for a request handling thread",
+    )
+)
+QUERY_DURATION = REGISTRY.register(
+    Histogram(
+        "autotradeweb_db_query_duration_seconds",
+        "Seconds spent executing database queries",
+        ["operation"],
+        QUERY_BUCKETS,
+    )
+)
+
+
+def get_method(method: str) -> str:
+    """Get the bounded label of a request's HTTP method"""
+    if method in ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"):
+        return method
+    return "other"
+
+
+class MetricsMiddleware:
+    """WSGI middleware recording the in-flight requests and the request
+    durations of ``app``
+
+    The endpoint label of a request is taken from the WSGI environ key
+    :data:`ENDPOINT_ENVIRON_KEY`, which the app sets once it has routed the
+    request. Streamed responses, such as event streams, are timed until
+    their headers are ready.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        statuses = []
+
+        def metrics_start_response(status, headers, exc_info=None):
+            statuses.append(status[:3])
+            return start_response(status, headers, exc_info)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            return self.app(environ, metrics_start_response)
+        except Exception:
+            statuses.append("500")
+            raise
+        finally:
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                environ.get(ENDPOINT_ENVIRON_KEY, UNKNOWN_ENDPOINT),
+                get_method(environ["REQUEST_METHOD"]),
+                statuses[-1] if statuses else "",
+            )
+            REQUESTS_IN_FLIGHT.dec()
+
+
+_thread_pool = None
+
+
+def track_thread_pool(thread_pool):
+    """Track the usage of the cheroot thread pool of this process's server"""
+    global _thread_pool
+    _thread_pool = thread_pool
+
+
+def _collect_thread_pool():
+    thread_pool = _thread_pool
+    if thread_pool is None:
+        return
+    # cheroot does not expose the number of threads publicly
+    num_threads = len(thread_pool._threads)
+    idle_threads = thread_pool.idle
+    SERVER_THREADS.set(num_threads - idle_threads, "busy")
+    SERVER_THREADS.set(idle_threads, "idle")
+    SERVER_QUEUED_CONNECTIONS.set(thread_pool.qsize)
+
+
+REGISTRY.add_collect_hook(_collect_thread_pool)
+
+# connection.info key of the start times of the executing queries
+QUERY_START_TIMES = "metrics_query_start_times"
+
+
+def get_operation(statement: str) -> str:
+    """Get the bounded label of a SQL statement's operation"""
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+    if operation in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+        return operation.lower()
+    return "other"
+
+
+@sa_event.listens_for(Engine, "before_cursor_execute")
+def _start_query(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault(QUERY_START_TIMES, []).append(time.perf_counter())
+
+
+@sa_event.listens_for(Engine, "after_cursor_execute")
+def _observe_query(connection, cursor, statement, parameters, context, executemany):
+    start_times = connection.info.get(QUERY_START_TIMES)
+    if start_times:
+        QUERY_DURATION.observe(
+            time.perf_counter() - start_times.pop(), get_operation(statement)
+        )
+
+
+@sa_event.listens_for(Engine, "handle_error")
+def _discard_query(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get(QUERY_START_TIMES):
+        connection.info[QUERY_START_TIMES].pop()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Versioned database schema migrations
+
+Migrations are plain functions registered with :func:`migration` and are
+applied in version order by :func:`upgrade`. The versions already applied to
+a database are recorded within the ``schema_migration`` table so that running
+an upgrade repeatedly is safe.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from logging import getLogger
+from typing import Callable, List
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    inspect,
+    text,
+)
+
+__log__ = getLogger(__name__)
+
+Migration = namedtuple("Migration", ["version", "description", "upgrade"])
+
+MIGRATIONS = []  # type: List[Migration]
+
+_METADATA = MetaData()
+
+schema_migration = Table(
+    "schema_migration",
+    _METADATA,
+    Column("version", Integer(), primary_key=True, autoincrement=False),
+    Column("description", String(255)),
+    Column("applied_at", DateTime()),
+)
+
+
+def migration(version: int, description: str) -> Callable:
+    """Decorator registering a function as the schema migration ``version``
+
+    The decorated function is given a :class:`sqlalchemy.engine.Connection`
+    with an open transaction.
+    """
+
+    def decorator(func):
+        if any(migration_.version == version for migration_ in MIGRATIONS):
+            raise ValueError(f"duplicate schema migration version: {version}")
+        MIGRATIONS.append(Migration(version, description, func))
+        MIGRATIONS.sort(key=lambda migration_: migration_.version)
+        return func
+
+    return decorator
+
+
+def get_applied_versions(connection) -> List[int]:
+    """Get the sorted list of the migration versions applied to the database"""
+    _METADATA.create_all(connection, tables=[schema_migration])
+    return sorted(row.version for row in connection.execute(schema_migration.select()))
+
+
+def get_pending_migrations(connection) -> List[Migration]:
+    """Get the migrations that are not yet applied to the database"""
+    applied_versions = set(get_applied_versions(connection))
+    return [
+        migration_
+        for migration_ in MIGRATIONS
+        if migration_.version not in applied_versions
+    ]
+
+
+def upgrade(engine) -> List[Migration]:
+    """Apply all pending migrations to the database behind ``engine``
+
+    Each migration is run within its own transaction alongside the recording
+    of its version, so an upgrade that fails part way can be rerun.
+    """
+    with engine.begin() as connection:
+        pending_migrations = get_pending_migrations(connection)
+    for migration_ in pending_migrations:
+        __log__.info(
+            f"applying schema migration {migration_.version}: {migration_.description}"
+        )
+        with engine.begin() as connection:
+            migration_.upgrade(connection)
+            connection.execute(
+                schema_migration.insert(),
+                {
+                    "version": migration_.version,
+                    "description": migration_.description,
+                    "applied_at": datetime.utcnow(),
+                },
+            )
+    return pending_migrations
+
+
+###################
+# Migrations
+###################
+
+
+@migration(1, "composite indexes for the trading_session and trade lookups")
+def _add_lookup_indexes(connection):
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_trading_session_username_is_finished_ticker "
+            "ON trading_session (username, is_finished, ticker)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_trade_session_id_time_stamp "
+            "ON trade (session_id, time_stamp)"
+        )
+    )
+
+
+@migration(2, "foreign key from trade.session_id to trading_session.session_id")
+def _add_trade_session_foreign_key(connection):
+    if inspect(connection).get_foreign_keys("trade"):
+        return
+    if connection.dialect.name != "postgresql":
+        # SQLite cannot add constraints to existing tables, its tables
+        # created by ``db.create_all()`` already contain the foreign key
+        __log__.warning(
+            f"skipping trade foreign key for dialect: {connection.dialect.name}"
+        )
+        return
+    # NOT VALID so that any historic orphaned trades do not block the upgrade,
+    # all new and updated rows are still checked against the constraint
+    connection.execute(
+        text(
+            "ALTER TABLE trade ADD CONSTRAINT trade_session_id_fkey "
+            "FOREIGN KEY (session_id) REFERENCES trading_session (session_id) "
+            "NOT VALID"
+        )
+    )
+
+
+@migration(3, "trade time_stamp index for the most recent trades lookup")
+def _add_trade_time_stamp_index(connection):
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_trade_time_stamp ON trade (time_stamp)")
+    )
+
+
+@migration(4, "trading_session (username, session_id) index for paginated listing")
+def _add_trading_session_pagination_index(connection):
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_trading_session_username_session_id "
+            "ON trading_session (username, session_id)"
+        )
+    )
+
+
+@migration(5, "running trade totals on trading_session")
+def _add_trading_session_trade_totals(connection):
+    columns = {
+        column["name"] for column in inspect(connection).get_columns("trading_session")
+    }
+    for side in ["buy", "sell"]:
+        for column, column_type in [
+            (f"{side}_trades", "INTEGER"),
+            (f"{side}_volume", "INTEGER"),
+            (f"{side}_notional", "FLOAT"),
+        ]:
+            if column not in columns:
+                connection.execute(
+                    text(
+                        f"ALTER TABLE trading_session "
+                        f"ADD COLUMN {column} {column_type} DEFAULT 0"
+                    )
+                )
+
+    # backfill the totals from the existing trades
+    session_trades = "FROM trade WHERE trade.session_id = trading_session.session_id"
+    totals = [f"num_trades = (SELECT count(*) {session_trades})"]
+    for side, trade_type in [("buy", "BUY"), ("sell", "SELL")]:
+        side_trades = f"{session_trades} AND trade.trade_type = '{trade_type}'"
+        totals += [
+            f"{side}_trades = (SELECT count(*) {side_trades})",
+            f"{side}_volume = (SELECT coalesce(sum(trade.volume), 0) {side_trades})",
+            f"{side}_notional = "
+            f"(SELECT coalesce(sum(trade.price * trade.volume), 0) {side_trades})",
+        ]
+    connection.execute(text(f"UPDATE trading_session SET {', '.join(totals)}"))
+
+
+@migration(6, "user revision for conditional API requests")
+def _add_user_revision(connection):
+    columns = {column["name"] for column in inspect(connection).get_columns("user")}
+    if "revision" not in columns:
+        connection.execute(
+            text('ALTER TABLE "user" ADD COLUMN revision INTEGER NOT NULL DEFAULT 0')
+        )
+    if "modified_at" not in columns:
+        connection.execute(text('ALTER TABLE "user" ADD COLUMN modified_at TIMESTAMP'))
+        # the upgrade is the earliest modification time known to be current
+        connection.execute(
+            text('UPDATE "user" SET modified_at = :now'), now=datetime.utcnow()
+        )
+
+
+@migration(7, "trade (session_id, time_stamp, trade_id) index for per-user trade order")
+def _add_trade_session_order_index(connection):
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_trade_session_id_time_stamp_trade_id "
+            "ON trade (session_id, time_stamp, trade_id)"
+        )
+    )
+    # superseded by the index above, which leads with the same columns
+    connection.execute(text("DROP INDEX IF EXISTS ix_trade_session_id_time_stamp"))
+
+
+# maintained by add_session_trade_totals
+_TRADING_SESSION_TOTALS = [
+    "num_trades",
+    "buy_trades",
+    "sell_trades",
+    "buy_volume",
+    "sell_volume",
+    "buy_notional",
+    "sell_notional",
+]
+
+
+@migration(8, "non null trading_session trade totals defaulting to 0")
+def _set_trading_session_trade_totals_not_null(connection):
+    if connection.dialect.name != "postgresql":
+        # SQLite cannot alter the columns of existing tables, its tables
+        # created by ``db.create_all()`` already contain the constraints
+        __log__.warning(
+            f"skipping trading_session totals constraints for dialect: "
+            f"{connection.dialect.name}"
+        )
+        return
+    connection.execute(
+        text(
+            "UPDATE trading_session SET "
+            + ", ".join(
+                f"{column} = coalesce({column}, 0)"
+                for column in _TRADING_SESSION_TOTALS
+            )
+            + " WHERE "
+            + " OR ".join(f"{column} IS NULL" for column in _TRADING_SESSION_TOTALS)
+        )
+    )
+    connection.execute(
+        text(
+            "ALTER TABLE trading_session "
+            + ", ".join(
+                f"ALTER COLUMN {column} SET DEFAULT 0, "
+                f"ALTER COLUMN {column} SET NOT NULL"
+                for column in _TRADING_SESSION_TOTALS
+            )
+        )
+    )
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Keyset (cursor) pagination for the API list endpoints
+
+A page is selected by a ``WHERE (key columns) > (cursor values)`` predicate
+with ``ORDER BY key columns LIMIT n``, so fetching a deep page costs the same
+as fetching the first page given an index over the key columns.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from urllib.parse import urlencode
+
+from flask import request
+from flask_restx import abort
+from sqlalchemy import DateTime, tuple_
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+CURSOR_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def encode_cursor(*values) -> str:
+    """Encode the key column values of the last item of a page as a opaque
+    URL safe cursor"""
+    values = [
+        value.strftime(CURSOR_DATETIME_FORMAT) if isinstance(value, datetime) else value
+        for value in values
+    ]
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode("utf-8"))
+    return cursor.decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, key_columns) -> list:
+    """Decode a cursor created by :func:`encode_cursor` into the values of
+    ``key_columns``
+
+    :raises ValueError: if the cursor is malformed
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"malformed cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != len(key_columns):
+        raise ValueError(f"malformed cursor: {cursor}")
+    return [
+        (
+            datetime.strptime(value, CURSOR_DATETIME_FORMAT)
+            if isinstance(column.type, DateTime)
+            else column.type.python_type(value)
+        )
+        for column, value in zip(key_columns, values)
+    ]
+
+
+def parse_page_args(
+    limit: Optional[str], after: Optional[str], key_columns
+) -> Tuple[Optional[int], Optional[list]]:
+    """Parse the ``limit`` and ``after`` pagination query arguments
+
+    ``limit`` is :obj:`None` if neither argument is given, as pagination is
+    opt-in.
+
+    :raises ValueError: if either argument is invalid
+    """
+    if limit is None and after is None:
+        return None, None
+    try:
+        limit = DEFAULT_PAGE_LIMIT if limit is None else int(limit)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise ValueError(f"limit must be an integer between 1 and {MAX_PAGE_LIMIT}")
+    if after is not None:
+        try:
+            after = decode_cursor(after, key_columns)
+        except (ValueError, TypeError) as e:
+            raise ValueError(
+                "after must be a cursor returned by a previous page"
+            ) from e
+    return limit, after
+
+
+def get_page_args(key_columns) -> Tuple[Optional[int], Optional[list]]:
+    """Get the ``limit`` and decoded ``after`` pagination query arguments of
+    the current request
+
+    ``limit`` is :obj:`None` if the request did not ask for pagination.
+    """
+    try:
+        return parse_page_args(
+            request.args.get("limit"), request.args.get("after"), key_columns
+        )
+    except ValueError as e:
+        abort(400, str(e))
+
+
+def paginate(query, key_columns, limit: int, after: Optional[list] = None):
+    """Get a keyset page of the ORM ``query`` ordered by ``key_columns``
+
+    :return: the items of the page and the cursor of the next page, or
+        :obj:`None` if it is the last page
+    """
+    query = query.order_by(*key_columns)
+    if after is not None:
+        query = query.filter(tuple_(*key_columns) > tuple_(*after))
+    items = query.limit(limit + 1).all()  # type: List
+    return split_page(items, key_columns, limit)
+
+
+def split_page(items: list, key_columns, limit: int):
+    """Split the up to ``limit + 1`` items fetched for a page into the items
+    of the page and the cursor of the next page
+
+    :param items: ORM objects or ``dict`` rows holding the key columns
+    """
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last_item = items[-1]
+    if not isinstance(last_item, dict):
+        last_item = {
+            column.key: getattr(last_item, column.key) for column in key_columns
+        }
+    next_cursor = encode_cursor(*[last_item[column.key] for column in key_columns])
+    return items, next_cursor
+
+
+def page_headers(
+    limit: int, next_cursor: Optional[str], base_url: Optional[str] = None
+) -> dict:
+    """Get the response headers pointing to the next page
+
+    :param base_url: URL of the page without its query string, defaults to
+        that of the current request
+    """
+    if next_cursor is None:
+        return {}
+    base_url = request.base_url if base_url is None else base_url
+    next_url = f"{base_url}?{urlencode({'limit': limit, 'after': next_cursor})}"
+    return {"X-Next-Cursor": next_cursor, "Link": f'<{next_url}>; rel="next"'}
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""SQLAlchemy engine connection pool configuration and statistics"""
+
+import threading
+import time
+
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# defaults sized for the default number of cheroot server threads
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_TIMEOUT = 30
+DEFAULT_POOL_RECYCLE = 1800
+
+
+class TimedQueuePool(QueuePool):
+    """:class:`sqlalchemy.pool.QueuePool` recording how long checkouts wait
+    for a connection
+
+    The wait includes opening a new connection when the pool is not full.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._wait_lock:
+                self.timeouts += 1
+            raise
+        wait = time.perf_counter() - start
+        with self._wait_lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        return connection
+
+
+# engine options of :func:`get_engine_options` that only apply to pooled
+# (non SQLite) databases
+POOL_OPTIONS = frozenset(
+    [
+        "poolclass",
+        "pool_size",
+        "max_overflow",
+        "pool_timeout",
+        "pool_recycle",
+        "pool_pre_ping",
+    ]
+)
+
+
+def get_engine_options(
+    database_uri: str,
+    pool_size: int = DEFAULT_POOL_SIZE,
+    max_overflow: int = DEFAULT_MAX_OVERFLOW,
+    pool_timeout: float = DEFAULT_POOL_TIMEOUT,
+    pool_recycle: int = DEFAULT_POOL_RECYCLE,
+    pool_pre_ping: bool = False,
+) -> dict:
+    """Get the ``SQLALCHEMY_ENGINE_OPTIONS`` of a database
+
+    SQLite databases keep the pooling chosen by Flask-SQLAlchemy.
+    """
+    if make_url(database_uri).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+    }
+
+
+def get_pool_statistics(pool) -> dict:
+    """Get the connection usage and checkout wait times of a engine's pool
+
+    Values that the pool does not track are :obj:`None`.
+    """
+    statistics = dict.fromkeys(
+        [
+            "pool_size",
+            "checked_out",
+            "checked_in",
+            "overflow",
+            "max_overflow",
+            "checkouts",
+            "timeouts",
+            "total_wait",
+            "max_wait",
+        ]
+    )  # type: dict
+    statistics["pool"] = type(pool).__name__
+    if isinstance(pool, QueuePool):
+        statistics.update(
+            {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                # negative while the pool is not yet full
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            }
+        )
+    if isinstance(pool, TimedQueuePool):
+        with pool._wait_lock:
+            statistics.update(
+                {
+                    "checkouts": pool.checkouts,
+                    "timeouts": pool.timeouts,
+                    "total_wait": pool.total_wait,
+                    "max_wait": pool.max_wait,
+                }
+            )
+    return statistics
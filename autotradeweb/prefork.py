@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Pre-fork multi-process serving of the cheroot WSGI server
+
+A master process forks a number of worker processes which each run their own
+multi-threaded cheroot server. Every worker binds the same address with
+``SO_REUSEPORT`` so that the kernel balances new connections between them,
+letting the server use more than one core despite the GIL.
+
+The master process respawns workers that die and handles the signals:
+
+* ``SIGHUP``: gracefully restart the workers, a new set of workers is started
+  before the old workers finish their in-flight requests and exit
+* ``SIGTERM``/``SIGINT``: gracefully stop the workers and exit
+"""
+
+import os
+import signal
+import socket
+import time
+from logging import getLogger
+from typing import Callable, Dict, Optional
+
+from cheroot.wsgi import Server as WSGIServer
+
+__log__ = getLogger(__name__)
+
+# seconds between respawns of a worker that keeps dying
+WORKER_RESPAWN_DELAY = 1.0
+# seconds stopping workers get to finish before being killed
+WORKER_STOP_TIMEOUT = 30.0
+
+
+class ReusePortWSGIServer(WSGIServer):
+    """cheroot WSGI server binding its socket with ``SO_REUSEPORT``"""
+
+    @staticmethod
+    def prepare_socket(bind_addr, family, type, proto, nodelay, ssl_adapter):
+        sock = WSGIServer.prepare_socket(
+            bind_addr, family, type, proto, nodelay, ssl_adapter
+        )
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        return sock
+
+
+def run_worker(make_server: Callable, on_worker_start: Optional[Callable] = None):
+    """Run a cheroot server within a worker process until ``SIGTERM``
+
+    :return: the exit code of the worker
+    """
+
+    def stop(signum, frame):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, stop)
+    if on_worker_start is not None:
+        on_worker_start()
+    server = make_server()
+    try:
+        server.start()
+    except SystemExit:
+        __log__.info(f"stopping worker {os.getpid()}")
+        server.stop()
+        return 0
+    except Exception:
+        __log__.exception(f"stopping worker {os.getpid()}: unexpected exception")
+        server.stop()
+        return 1
+    return 0
+
+
+class PreforkServer:
+    """Master process of ``workers`` pre-forked server worker processes
+
+    :param make_server: callable creating the cheroot server of a worker,
+        called within the worker process
+    :param on_worker_start: callable run within each new worker process
+        before its server is created, e.g. to drop inherited database
+        connections
+    """
+
+    def __init__(
+        self,
+        make_server: Callable,
+        workers: int,
+        on_worker_start: Optional[Callable] = None,
+    ):
+        self.make_server = make_server
+        self.workers = workers
+        self.on_worker_start = on_worker_start
+        # pid to generation of the running workers
+        self._workers = {}  # type: Dict[int, int]
+        self._generation = 0
+        self._stopping = False
+        self._restarting = False
+
+    def spawn_worker(self) -> int:
+        """Fork a new worker process of the current generation"""
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                exit_code = run_worker(self.make_server, self.on_worker_start)
+            finally:
+                os._exit(exit_code)
+        self._workers[pid] = self._generation
+        __log__.info(f"started worker {pid}")
+        return pid
+
+    def signal_workers(self, signum, generation: Optional[int] = None):
+        """Send a signal to the workers, optionally only those of a generation"""
+        for pid, worker_generation in list(self._workers.items()):
+            if generation is None or worker_generation == generation:
+                try:
+                    os.kill(pid, signum)
+                except ProcessLookupError:
+                    pass
+
+    def reap_workers(self):
+        """Reap the exited workers"""
+        while self._workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._workers.clear()
+                break
+            if pid == 0:
+                break
+            generation = self._workers.pop(pid, None)
+            if generation == self._generation and not self._stopping:
+                __log__.warning(f"worker {pid} died with status {status}")
+
+    def restart(self):
+        """Start a new generation of workers and gracefully stop the old one"""
+        old_generation = self._generation
+        self._generation += 1
+        __log__.info(f"restarting {self.workers} workers")
+        for _ in range(self.workers):
+            self.spawn_worker()
+        self.signal_workers(signal.SIGTERM, generation=old_generation)
+
+    def stop(self, timeout: float = WORKER_STOP_TIMEOUT):
+        """Gracefully stop all the workers, killing any that outlast
+        ``timeout`` seconds"""
+        self.signal_workers(signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        while self._workers and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+        if self._workers:
+            __log__.warning(f"killing {len(self._workers)} workers")
+            self.signal_workers(signal.SIGKILL)
+            while self._workers:
+                self.reap_workers()
+                time.sleep(0.1)
+
+    def run(self) -> int:
+        """Run the workers until ``SIGTERM`` or ``SIGINT``"""
+
+        def on_stop(signum, frame):
+            self._stopping = True
+
+        def on_restart(signum, frame):
+            self._restarting = True
+
+        signal.signal(signal.SIGTERM, on_stop)
+        signal.signal(signal.SIGINT, on_stop)
+        signal.signal(signal.SIGHUP, on_restart)
+        __log__.info(f"starting {self.workers} workers in master {os.getpid()}")
+        for _ in range(self.workers):
+            self.spawn_worker()
+        last_respawn = 0.0
+        while not self._stopping:
+            if self._restarting:
+                self._restarting = False
+                self.restart()
+            self.reap_workers()
+            missing = self.workers - sum(
+                generation == self._generation for generation in self._workers.values()
+            )
+            if missing and time.monotonic() - last_respawn >= WORKER_RESPAWN_DELAY:
+                last_respawn = time.monotonic()
+                for _ in range(missing):
+                    self.spawn_worker()
+            time.sleep(0.1)
+        __log__.info("stopping workers")
+        self.stop()
+        return 0
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Read replica routing of read-only database queries
+
+Queries run within :func:`read_replica` are sent to the ``read`` bind of
+``SQLALCHEMY_BINDS`` when it is configured. Everything else, along with any
+query of a session that has already written within its transaction or that
+has been pinned by :func:`pin_primary`, stays on the primary database so
+that writes and read-after-write paths never see replication lag.
+"""
+
+from contextlib import contextmanager
+
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, orm
+
+from autotradeweb.pool import POOL_OPTIONS, TimedQueuePool
+
+READ_BIND_KEY = "read"
+
+# session.info keys of the routing state
+USE_READ_REPLICA = "use_read_replica"
+HAS_WRITTEN = "has_written"
+PRIMARY_PINNED = "primary_pinned"
+
+
+class RoutingSession(SignallingSession):
+    """:class:`flask_sqlalchemy.SignallingSession` routing reads within
+    :func:`read_replica` to the read replica"""
+
+    def __init__(self, db, **options):
+        super().__init__(db, **options)
+        event.listen(self, "after_flush", _mark_written)
+        event.listen(self, "after_commit", _clear_written)
+        event.listen(self, "after_rollback", _clear_written)
+
+    def get_bind(self, mapper=None, clause=None):
+        if (
+            self.info.get(USE_READ_REPLICA)
+            and not self.info.get(HAS_WRITTEN)
+            and not self.info.get(PRIMARY_PINNED)
+            and not self._flushing
+            and READ_BIND_KEY in (self.app.config.get("SQLALCHEMY_BINDS") or {})
+        ):
+            return get_state(self.app).db.get_engine(self.app, bind=READ_BIND_KEY)
+        return super().get_bind(mapper, clause)
+
+
+def _mark_written(session, flush_context):
+    session.info[HAS_WRITTEN] = True
+
+
+def _clear_written(session):
+    session.info.pop(HAS_WRITTEN, None)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """:class:`flask_sqlalchemy.SQLAlchemy` whose sessions are
+    :class:`RoutingSession` instances"""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def create_engine(self, sa_url, engine_opts):
+        # ``SQLALCHEMY_ENGINE_OPTIONS`` apply to every bind, a SQLite replica
+        # of a pooled primary keeps SQLite's own pooling
+        if (
+            sa_url.get_backend_name() == "sqlite"
+            and engine_opts.get("poolclass") is TimedQueuePool
+        ):
+            engine_opts = {
+                option: value
+                for option, value in engine_opts.items()
+                if option not in POOL_OPTIONS
+            }
+        return super().create_engine(sa_url, engine_opts)
+
+
+@contextmanager
+def read_replica(scoped_session):
+    """Route the read-only queries of ``scoped_session`` within this context
+    to the read replica, if one is configured"""
+    session = scoped_session()
+    previous = session.info.get(USE_READ_REPLICA, False)
+    session.info[USE_READ_REPLICA] = True
+    try:
+        yield session
+    finally:
+        session.info[USE_READ_REPLICA] = previous
+
+
+def pin_primary(scoped_session):
+    """Keep every query of ``scoped_session`` on the primary database, even
+    within :func:`read_replica`, until the session is removed at the end of
+    the request"""
+    scoped_session().info[PRIMARY_PINNED] = True
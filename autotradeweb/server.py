@@ -3,34 +3,105 @@
 
 """Flask server definition"""
 
+import csv
+import io
+import json
 import os
+import time
+from collections import Counter, namedtuple
 from datetime import datetime, timedelta
+from functools import wraps
 from logging import getLogger
+from typing import List, Optional
 
 import dash
 import dash_core_components as dcc
 import dash_dangerously_set_inner_html
 import dash_html_components as html
 from dash.dependencies import Input, Output, State
-from flask import Flask, render_template, send_from_directory, request, redirect
-from flask_sqlalchemy import SQLAlchemy
-from flask_simplelogin import SimpleLogin, login_required, get_username
-from flask_restx import Api, Resource, fields, abort
-from sqlalchemy import desc, func
+from dash.exceptions import PreventUpdate
+from flask import (
+    Flask,
+    Response,
+    render_template,
+    send_from_directory,
+    request,
+    redirect,
+    stream_with_context,
+)
+from flask_simplelogin import login_required, get_username
+from flask_restx import Api, Resource, fields, abort, marshal
+from flask_restx.utils import unpack
+import numpy as np
+from sqlalchemy import desc, func, select, text, true, tuple_
 
 from sqlalchemy.dialects import postgresql
+from werkzeug.http import is_resource_modified, quote_etag
+
+from autotradeweb.assets import StaticAssets
+from autotradeweb.auth import (
+    API_TOKEN_MAX_AGE,
+    TokenSimpleLogin,
+    create_api_token,
+    get_credential_key,
+)
+from autotradeweb.cache import LRUCache, TTLCache
+from autotradeweb.events import (
+    iter_event_stream,
+    publish_event,
+    publish_events,
+    start_event_listener,
+)
+from autotradeweb.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    ENDPOINT_ENVIRON_KEY,
+    REGISTRY,
+    UNKNOWN_ENDPOINT,
+    Counter as CounterMetric,
+    Gauge,
+)
+from autotradeweb.pagination import get_page_args, page_headers, paginate, split_page
+from autotradeweb.pool import get_pool_statistics
+from autotradeweb.routing import RoutingSQLAlchemy, pin_primary, read_replica
+from autotradeweb.timeseries import (
+    TimeRange,
+    consolidate_predictions,
+    get_num_buckets,
+    get_zoom_range,
+    min_max_downsample,
+    to_cursor_time,
+    to_datetime,
+    to_json_times,
+    to_json_values,
+)
 
 
 __log__ = getLogger(__name__)
 
 
-APP = Flask(__name__)
+# static files are served as fingerprinted assets, see :func:`static_file`
+APP = Flask(__name__, static_folder=None)
 
 
 DEFAULT_SQLITE_PATH = "sqlite:///autotradeweb.db"
 APP.config["SQLALCHEMY_DATABASE_URI"] = DEFAULT_SQLITE_PATH
 APP.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-db = SQLAlchemy(APP)
+db = RoutingSQLAlchemy(APP)
+
+
+def read_replica_view(func):
+    """Decorate a read-only view so that its queries are sent to the read
+    replica, if one is configured
+
+    See :mod:`.routing`.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with read_replica(db.session):
+            return func(*args, **kwargs)
+
+    return wrapper
 
 
 ##############
@@ -42,6 +113,12 @@ db = SQLAlchemy(APP)
 # See SRS: S.9.R.2
 # See SRS: S.9.R.3
 def validate_login(user):
+    # API clients send their credentials with every request, so recently
+    # verified credentials are accepted without a user lookup
+    credential_key = get_credential_key(user["username"], user["password"])
+    expires_at = CREDENTIAL_CACHE.get(credential_key)
+    if expires_at is not None and time.monotonic() < expires_at:
+        return True
     db_user = User.query.filter_by(username=user["username"]).first()
     if db_user is None:
         # no user of that username
@@ -49,6 +126,7 @@ def validate_login(user):
         return False
     if db_user.password == user["password"]:
         __log__.debug(f"logged in user: {user['username']}")
+        CREDENTIAL_CACHE.put(credential_key, time.monotonic() + CREDENTIAL_CACHE_TTL)
         return True
     else:
         # wrong password
@@ -59,7 +137,11 @@ def validate_login(user):
 # See SRS: S.9.R.1
 # See SRS: S.9.R.2
 # See SRS: S.9.R.3
-SL_APP = SimpleLogin(APP, login_checker=validate_login)
+SL_APP = TokenSimpleLogin(APP, login_checker=validate_login)
+
+# seconds verified credentials are cached for
+CREDENTIAL_CACHE_TTL = 60
+CREDENTIAL_CACHE = LRUCache(1024)
 
 
 #################################
@@ -69,14 +151,27 @@ SL_APP = SimpleLogin(APP, login_checker=validate_login)
 
 
 class trade(db.Model):
+    __table_args__ = (
+        db.Index(
+            "ix_trade_session_id_time_stamp_trade_id",
+            "session_id",
+            "time_stamp",
+            "trade_id",
+        ),
+    )
+
     trade_id = db.Column(
         db.Integer(), primary_key=True
     )  # autoincrement defined by server
-    session_id = db.Column(db.Integer())
+    session_id = db.Column(db.Integer(), db.ForeignKey("trading_session.session_id"))
     trade_type = db.Column(db.String(80))
     price = db.Column(db.Float())
     volume = db.Column(db.Integer())
-    time_stamp = db.Column(db.DateTime())
+    time_stamp = db.Column(db.DateTime(), index=True)
+
+    trading_session = db.relationship(
+        "trading_session", backref=db.backref("trades", lazy="dynamic")
+    )
 
     def to_dict(self):
         return {
@@ -90,6 +185,16 @@ class trade(db.Model):
 
 
 class trading_session(db.Model):
+    __table_args__ = (
+        db.Index(
+            "ix_trading_session_username_is_finished_ticker",
+            "username",
+            "is_finished",
+            "ticker",
+        ),
+        db.Index("ix_trading_session_username_session_id", "username", "session_id"),
+    )
+
     session_id = db.Column(
         db.Integer(), primary_key=True
     )  # autoincrement defined by server
@@ -97,9 +202,21 @@ class trading_session(db.Model):
     ticker = db.Column(db.String(80))
     start_time = db.Column(db.DateTime())
     end_time = db.Column(db.DateTime())
-    num_trades = db.Column(db.Integer, default=0)
+    num_trades = db.Column(db.Integer, default=0, server_default="0", nullable=False)
     is_paused = db.Column(db.Boolean(), default=False)
     is_finished = db.Column(db.Boolean(), default=False)
+    # running trade totals maintained by add_session_trade_totals, the server
+    # defaults cover rows inserted without them, see migrations 5 and 8
+    buy_trades = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    sell_trades = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    buy_volume = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    sell_volume = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    buy_notional = db.Column(
+        db.Float(), default=0.0, server_default="0", nullable=False
+    )
+    sell_notional = db.Column(
+        db.Float(), default=0.0, server_default="0", nullable=False
+    )
 
     # TODO: is best way to serialize to dict?
     def to_dict(self):
@@ -112,6 +229,12 @@ class trading_session(db.Model):
             "start_time": self.start_time,
             "end_time": self.end_time,
             "num_trades": int(self.num_trades),
+            "buy_trades": int(self.buy_trades),
+            "sell_trades": int(self.sell_trades),
+            "buy_volume": int(self.buy_volume),
+            "sell_volume": int(self.sell_volume),
+            "buy_notional": float(self.buy_notional),
+            "sell_notional": float(self.sell_notional),
         }
 
 
@@ -137,6 +260,10 @@ class User(db.Model):
     password = db.Column(db.String(80), index=True, nullable=False)
     # TODO: NOTE: bank is set to 5000 for demo purposes
     bank = db.Column(db.Float(), default=5000.0, nullable=False)
+    # bumped by every change of the user's trades and trading sessions, these
+    # validate conditional API requests, see :func:`conditional_view`
+    revision = db.Column(db.Integer(), default=0, nullable=False)
+    modified_at = db.Column(db.DateTime())
 
     def to_dict(self):
         return {
@@ -146,6 +273,117 @@ class User(db.Model):
         }
 
 
+def publish_trading_session_event(trading_session_):
+    """Publish the state of a trading session to its user's event streams
+    once the current transaction commits"""
+    publish_event(
+        db.session,
+        trading_session_.username,
+        "trading_session",
+        marshal(trading_session_.to_dict(), TRADING_SESSION),
+    )
+
+
+def get_touch_user_statement(username):
+    """Get the statement bumping the revision of a user's trades and trading
+    sessions"""
+    users = User.__table__
+    return (
+        users.update()
+        .where(users.c.username == username)
+        .values(revision=users.c.revision + 1, modified_at=datetime.utcnow())
+    )
+
+
+def touch_user(username):
+    """Bump the revision of a user's trades and trading sessions within the
+    current transaction"""
+    # flush first so that the user row is always locked after the changed
+    # trading session rows, avoiding deadlocks between concurrent changes
+    db.session.flush()
+    db.session.execute(get_touch_user_statement(username))
+
+
+def get_user_validators(user_id, revision) -> dict:
+    """Get the ``ETag`` response headers of the API resources of a user at a
+    revision
+
+    No ``Last-Modified`` validator is sent, as its whole second resolution
+    cannot tell apart the changes made within the same second.
+    """
+    return {
+        "ETag": quote_etag(f"{user_id}-{revision}", weak=True),
+        # clients may keep the responses, but must revalidate them
+        "Cache-Control": "private, no-cache",
+    }
+
+
+# the reads of a user's trades and trading sessions stay on the primary for
+# this long after the user's last change, covering the replication lag of
+# the read replica
+READ_YOUR_WRITES_WINDOW = timedelta(seconds=10)
+
+
+def query_user_validators(username):
+    """Get the id, revision and modification time of a user from the primary
+
+    If the user changed within :data:`READ_YOUR_WRITES_WINDOW`, the queries of
+    the rest of the request are pinned to the primary, as the read replica
+    may not have replayed the change yet.
+    """
+    user_ = (
+        db.session.query(User.id, User.revision, User.modified_at)
+        .filter(User.username == username)
+        .first()
+    )
+    if (
+        user_ is not None
+        and user_.modified_at is not None
+        and datetime.utcnow() - user_.modified_at < READ_YOUR_WRITES_WINDOW
+    ):
+        pin_primary(db.session)
+    return user_
+
+
+def read_your_writes_view(func):
+    """Decorate a view of the currently logged in user's trades and trading
+    sessions that is not a :func:`conditional_view`, so that its queries stay
+    on the primary right after the user's changes"""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        query_user_validators(get_username())
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def conditional_view(func):
+    """Decorate a read-only view of the currently logged in user's trades and
+    trading sessions to answer conditional requests
+
+    The validators are looked up by a single user query before running the
+    view, so a request whose ``If-None-Match`` validator is still current is
+    answered with ``304 Not Modified``
+    without querying or marshalling the resource.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # the validators must not be newer than the data of the view, so they
+        # are read first
+        user_ = query_user_validators(get_username())
+        if user_ is None:
+            return func(*args, **kwargs)
+        headers = get_user_validators(user_.id, user_.revision)
+        if not is_resource_modified(request.environ, etag=headers["ETag"]):
+            return Response(status=304, headers=headers)
+        data, code, view_headers = unpack(func(*args, **kwargs))
+        return data, code, dict(view_headers or {}, **headers)
+
+    return wrapper
+
+
 ###################
 # main frontend
 # See SRS: S.11.R.2
@@ -157,10 +395,26 @@ def index():
     return render_template("index.html")
 
 
-@APP.route("/static/<path:path>")
-def static_file(path):
-    static_folder = os.path.join(os.path.dirname(os.path.realpath(__file__)), "static")
-    return send_from_directory(static_folder, path)
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.realpath(__file__)), "static")
+STATIC_ASSETS = StaticAssets(STATIC_FOLDER)
+
+
+@APP.url_defaults
+def fingerprint_static_url(endpoint, values):
+    """Make ``url_for("static", filename=...)`` give fingerprinted URLs"""
+    if endpoint == "static" and "filename" in values:
+        values["filename"] = STATIC_ASSETS.url_path(values["filename"])
+
+
+@APP.route("/static/<path:filename>", endpoint="static")
+def static_file(filename):
+    response = STATIC_ASSETS.get_response(
+        filename, request.headers.get("Accept-Encoding", "")
+    )
+    if response is None:
+        # unfingerprinted URLs may change, so they are revalidated as before
+        return send_from_directory(STATIC_FOLDER, filename)
+    return response.make_conditional(request)
 
 
 ##################
@@ -192,10 +446,13 @@ def register_submit():
 ###############
 
 
+# seconds between the live tail updates of the dashboard graph
+LIVE_TAIL_INTERVAL = 5
+
 external_stylesheets = [
     "https://codepen.io/chriddyp/pen/bWLwgP.css",
-    "/static/stylesheet.css",
-    "/static/dash-stylesheet.css",
+    f"/static/{STATIC_ASSETS.url_path('stylesheet.css')}",
+    f"/static/{STATIC_ASSETS.url_path('dash-stylesheet.css')}",
 ]
 
 DASH = dash.Dash(
@@ -203,6 +460,8 @@ DASH = dash.Dash(
     server=APP,
     external_stylesheets=external_stylesheets,
     suppress_callback_exceptions=True,
+    # responses are compressed by the server, see :mod:`.compression`
+    compress=False,
 )
 DASH.layout = html.Div(
     style={"overflow-x": "hidden"},
@@ -251,6 +510,16 @@ dashboard_layout = html.Div(
                     end_date=datetime.utcnow(),
                     start_date=datetime.utcnow() - timedelta(days=30),
                 ),
+                dcc.Checklist(
+                    id="stock-live-tail",
+                    options=[{"label": " Live tail", "value": "live"}],
+                    value=[],
+                ),
+                dcc.Interval(
+                    id="stock-live-interval",
+                    interval=LIVE_TAIL_INTERVAL * 1000,
+                    disabled=True,
+                ),
             ],
             style={"padding-left": "2em", "padding-right": "2em"},
         ),
@@ -266,7 +535,12 @@ dashboard_layout = html.Div(
                             "yaxis": {"title": "Stock Value"},
                         },
                     },
-                )
+                ),
+                # width of the graph in pixels set by the browser, used to
+                # downsample the graph to about one point per pixel
+                dcc.Store(id="stock-graph-width"),
+                # the newest points of the graph, see get_live_cursor
+                dcc.Store(id="stock-live-cursor"),
             ]
         ),
     ]
@@ -324,6 +598,9 @@ def on_click(n_clicks, stock_id):
             is_finished=False,
         )
         db.session.add(new_trading_session_db)
+        db.session.flush()
+        publish_trading_session_event(new_trading_session_db)
+        touch_user(username)
         db.session.commit()
 
 
@@ -349,6 +626,8 @@ def on_click(n_clicks, stock_id):
     if not trading_session_:
         abort(404, "running trading session not found")
     trading_session_.is_paused = True
+    publish_trading_session_event(trading_session_)
+    touch_user(username)
     db.session.commit()
 
 
@@ -374,6 +653,8 @@ def on_click(n_clicks, stock_id):
     if not trading_session_:
         abort(404, "paused trading session not found")
     trading_session_.is_paused = False
+    publish_trading_session_event(trading_session_)
+    touch_user(username)
     db.session.commit()
 
 
@@ -398,86 +679,290 @@ def on_click(n_clicks, stock_id):
     if not trading_session_:
         abort(404, "trading session not found")
     trading_session_.is_finished = True
+    publish_trading_session_event(trading_session_)
+    touch_user(username)
     db.session.commit()
 
 
 @DASH.callback(Output("stock-dropdown", "options"), [Input("stock-dropdown", "value")])
 @login_required
+@read_replica_view
 def set_stock_timeline_options(v):
-    stocks = set(db.session.query(stock_data.stock_name))
+    stocks = TICKER_CATALOG.get()
     if stocks:
-        return [
-            {"label": str(stock.stock_name), "value": str(stock.stock_name)}
-            for stock in stocks
-        ]
+        return [{"label": stock, "value": stock} for stock in stocks]
     return [{}]
 
 
+# PostgreSQL has no skip scan, so emulate one by recursively looking up the
+# next stock name within the ``(stock_name, time_stamp)`` primary key
+LOOSE_INDEX_SCAN_STOCK_NAMES = text(
+    """
+    WITH RECURSIVE stock_names AS (
+        (SELECT stock_name FROM stock_data ORDER BY stock_name LIMIT 1)
+        UNION ALL
+        SELECT (
+            SELECT stock_data.stock_name FROM stock_data
+            WHERE stock_data.stock_name > stock_names.stock_name
+            ORDER BY stock_data.stock_name LIMIT 1
+        )
+        FROM stock_names WHERE stock_names.stock_name IS NOT NULL
+    )
+    SELECT stock_name FROM stock_names WHERE stock_name IS NOT NULL
+    """
+)
+
+
+def query_tickers() -> List[str]:
+    """Get the sorted names of the stocks within ``stock_data``
+
+    This costs one index lookup per stock rather than a read of every tick.
+    """
+    if db.session.get_bind().dialect.name == "postgresql":
+        rows = db.session.execute(LOOSE_INDEX_SCAN_STOCK_NAMES)
+    else:
+        rows = (
+            db.session.query(stock_data.stock_name)
+            .distinct()
+            .order_by(stock_data.stock_name)
+        )
+    return [row.stock_name for row in rows]
+
+
+# stock data is loaded by the autotrader backend, so the catalog is
+# refreshed after TICKER_CATALOG_TTL seconds, anything loading stock data
+# within this process should call ``TICKER_CATALOG.invalidate()``
+TICKER_CATALOG_TTL = 300
+TICKER_CATALOG = TTLCache(query_tickers, TICKER_CATALOG_TTL)
+
+
+def query_stock_ticks(stock_name, time_range, *columns):
+    """Query the ``stock_data`` ticks of a stock within a
+    :class:`.timeseries.TimeRange` ordered by time
+
+    :param columns: the columns to select, defaults to the whole tick
+    """
+    return (
+        db.session.query(*(columns or [stock_data]))
+        .filter(
+            stock_data.stock_name == stock_name,
+            time_range.filter(stock_data.time_stamp),
+        )
+        .order_by(stock_data.time_stamp)
+    )
+
+
+def query_stock_predictions(stock_name, time_range, *columns):
+    """Query the ``stock_prediction`` rows of a stock made within a
+    :class:`.timeseries.TimeRange` ordered by newest first
+
+    :param columns: the columns to select, defaults to the whole prediction
+    """
+    return (
+        db.session.query(*(columns or [stock_prediction]))
+        .filter(
+            stock_prediction.stock_name == stock_name,
+            time_range.filter(stock_prediction.time_stamp),
+        )
+        .order_by(desc(stock_prediction.time_stamp))
+    )
+
+
+def get_stock_data_version(stock_name) -> tuple:
+    """Get the time stamps of the newest tick and prediction of a stock
+
+    These are index lookups on the primary keys and change whenever new
+    ``stock_data`` or ``stock_prediction`` rows of the stock arrive.
+    """
+    return (
+        db.session.query(func.max(stock_data.time_stamp))
+        .filter(stock_data.stock_name == stock_name)
+        .scalar(),
+        db.session.query(func.max(stock_prediction.time_stamp))
+        .filter(stock_prediction.stock_name == stock_name)
+        .scalar(),
+    )
+
+
+def invalidate_stock_figures(stock_name):
+    """Drop the cached stock timeline figures of a stock, anything loading
+    stock data within this process should call this"""
+    FIGURE_CACHE.invalidate(lambda key: key[0] == stock_name)
+
+
+# built stock timeline figures keyed by the stock, date picker range, number
+# of downsampling buckets and stock data version
+DEFAULT_FIGURE_CACHE_SIZE = 128
+FIGURE_CACHE = LRUCache(DEFAULT_FIGURE_CACHE_SIZE)
+
+# the longest ahead a prediction predicts
+PREDICTION_HORIZON = timedelta(days=2)
+# percentiles of the overlapping predictions shown as the prediction band
+PREDICTION_BAND_PERCENTILES = (10.0, 90.0)
+# the consolidated predictions are rounded to shorten the figure JSON
+PREDICTION_DECIMALS = 4
+
+
+DASH.clientside_callback(
+    """
+    function(stock_id) {
+        var graph = document.getElementById("stock-value-timeline-graph");
+        return graph ? graph.clientWidth : window.innerWidth;
+    }
+    """,
+    Output("stock-graph-width", "data"),
+    [Input("stock-dropdown", "value")],
+)
+
+
 # See SRS: S.10.R.5
+# Dash 1.x allows a output within only one callback, so the live tail shares
+# the callback of the figure
 @DASH.callback(
-    Output("stock-value-timeline-graph", "figure"),
+    [
+        Output("stock-value-timeline-graph", "figure"),
+        Output("stock-value-timeline-graph", "extendData"),
+        Output("stock-live-cursor", "data"),
+    ],
     [
         Input("date-picker-range", "start_date"),
         Input("date-picker-range", "end_date"),
         Input("stock-dropdown", "value"),
+        Input("stock-value-timeline-graph", "relayoutData"),
+        Input("stock-live-interval", "n_intervals"),
     ],
+    [State("stock-graph-width", "data"), State("stock-live-cursor", "data")],
 )
 @login_required
-def update_stock_timeline(start_date, end_date, stock_id):
-    stock_ticks = list(
-        db.session.query(stock_data)
-        .filter(
-            stock_data.stock_name == stock_id,
-            func.date(stock_data.time_stamp) >= start_date,
-            func.date(stock_data.time_stamp) <= end_date,
+@read_replica_view
+def update_stock_timeline(
+    start_date, end_date, stock_id, relayout_data, n_intervals, graph_width, cursor
+):
+    zoom_range = None
+    triggered = [trigger["prop_id"] for trigger in dash.callback_context.triggered]
+    if triggered == ["stock-live-interval.n_intervals"]:
+        return (dash.no_update, *extend_stock_timeline(cursor))
+    if "stock-value-timeline-graph.relayoutData" in triggered:
+        zoom_range = get_zoom_range(relayout_data)
+        if zoom_range is None and not (relayout_data or {}).get("xaxis.autorange"):
+            # not a zoom or zoom reset (e.g. autosize), the figure is unchanged
+            raise PreventUpdate
+
+    time_range = TimeRange.from_date_picker(start_date, end_date)
+    num_buckets = get_num_buckets(graph_width)
+    data_version = get_stock_data_version(stock_id)
+    if zoom_range is not None:
+        # zooms are rarely shared between users, so are not cached
+        timeline = build_stock_timeline_figure(
+            stock_id, time_range, zoom_range, num_buckets
         )
-        .order_by(desc(stock_data.time_stamp))
-        .all()
-    )
+        cursor = get_live_cursor(stock_id, timeline, num_buckets, data_version)
+        return timeline.figure, dash.no_update, cursor
+
+    # new ticks or predictions of the stock change its data version and so
+    # the cache key, the figures of older versions are dropped on a miss
+    key = (stock_id, time_range, num_buckets, data_version)
+    timeline = FIGURE_CACHE.get(key)
+    if timeline is None:
+        FIGURE_CACHE.invalidate(
+            lambda cached_key: cached_key[0] == stock_id
+            and cached_key[-1] != data_version
+        )
+        timeline = build_stock_timeline_figure(
+            stock_id, time_range, None, num_buckets
+        )
+        FIGURE_CACHE.put(key, timeline)
+    cursor = get_live_cursor(stock_id, timeline, num_buckets, data_version)
+    return timeline.figure, dash.no_update, cursor
 
-    try:
-        end_datetime = datetime.strptime(end_date, "%Y-%m-%dT%H:%M:%S.%f")
-    except:
-        end_datetime = datetime.strptime(end_date, "%Y-%m-%d")
 
-    prediction_end_date = (end_datetime + timedelta(days=2)).strftime(
-        "%Y-%m-%dT%H:%M:%S.%f"
+# a stock timeline graph figure along with the full precision time stamps of
+# its newest tick and prediction points, whose second resolution figure
+# times cannot tell apart points within the same second
+StockTimeline = namedtuple(
+    "StockTimeline", ["figure", "newest_tick", "newest_prediction"]
+)
+
+
+def build_stock_timeline_figure(
+    stock_id, time_range, zoom_range, num_buckets
+) -> StockTimeline:
+    """Build the stock timeline graph figure of a stock
+
+    :param time_range: the date picker :class:`.timeseries.TimeRange`
+    :param zoom_range: the zoomed in :class:`.timeseries.TimeRange` of the
+        graph, or :obj:`None` if it is not zoomed in
+    :param num_buckets: the number of downsampling buckets of the ticks
+    """
+    # re-query only the zoomed in range at the full graph resolution
+    stock_ticks = query_stock_ticks(
+        stock_id, zoom_range or time_range, stock_data.time_stamp, stock_data.open
+    ).all()
+    tick_time_stamps, tick_opens = zip(*stock_ticks) if stock_ticks else ((), ())
+    tick_time_stamps = np.array(tick_time_stamps, dtype="datetime64[us]")
+    tick_times, tick_values = min_max_downsample(
+        tick_time_stamps,
+        np.array(tick_opens, dtype=float),
+        num_buckets,
     )
-    stock_predictions = list(
-        db.session.query(stock_prediction)
-        .filter(
-            stock_prediction.stock_name == stock_id,
-            func.date(stock_prediction.time_stamp) >= start_date,
-            func.date(stock_prediction.time_stamp) <= prediction_end_date,
+
+    stock_predictions = query_stock_predictions(
+        stock_id,
+        time_range.extend(PREDICTION_HORIZON),
+        stock_prediction.time_stamp,
+        stock_prediction.prediction,
+    ).all()
+    prediction_times, prediction_mean, prediction_lower, prediction_upper = (
+        consolidate_predictions(
+            np.array([m.time_stamp for m in stock_predictions], dtype="datetime64[us]"),
+            [m.prediction or [] for m in stock_predictions],
+            percentiles=PREDICTION_BAND_PERCENTILES,
         )
-        .order_by(desc(stock_prediction.time_stamp))
-        .all()
     )
-
-    # TODO: cleanup
+    newest_prediction = (
+        to_cursor_time(prediction_times[-1]) if len(prediction_times) else None
+    )
+    prediction_times = to_json_times(prediction_times)
     predictors = []
-    for stock_prediction_ in stock_predictions:
-        x = []
-        y = []
-        for hour, p in enumerate(stock_prediction_.prediction):
-            x.append(stock_prediction_.time_stamp + timedelta(hours=hour))
-            y.append(p)
-        # TODO: makes ugly rainbow garbage need to concentrate down
-        predictors.append(
+    if prediction_times:
+        low, high = PREDICTION_BAND_PERCENTILES
+        predictors = [
             {
-                "y": y,
-                "x": x,
+                "y": to_json_values(prediction_lower, PREDICTION_DECIMALS),
+                "x": prediction_times,
                 "type": "scatter",
-                "name": f"prediction from {stock_prediction_.time_stamp}",
                 "mode": "lines",
-            }
-        )
+                "line": {"width": 0},
+                "hoverinfo": "skip",
+                "showlegend": False,
+                "legendgroup": "prediction band",
+            },
+            {
+                "y": to_json_values(prediction_upper, PREDICTION_DECIMALS),
+                "x": prediction_times,
+                "type": "scatter",
+                "name": f"prediction {low:g}-{high:g}th percentile",
+                "mode": "lines",
+                "line": {"width": 0},
+                "fill": "tonexty",
+                "fillcolor": "rgba(0, 189, 12, 0.2)",
+                "legendgroup": "prediction band",
+            },
+            {
+                "y": to_json_values(prediction_mean, PREDICTION_DECIMALS),
+                "x": prediction_times,
+                "type": "scatter",
+                "name": "prediction mean",
+                "mode": "lines",
+                "line": {"color": "rgb(0, 189, 12)"},
+            },
+        ]
 
-    return {
+    figure = {
         "data": [
             {
-                "y": [str(m.open) for m in stock_ticks],
-                "x": [m.time_stamp for m in stock_ticks],
+                "y": to_json_values(tick_values),
+                "x": to_json_times(tick_times),
                 "type": "scatter",
                 "name": "actual values",
                 "mode": "markers",
@@ -488,8 +973,120 @@ def update_stock_timeline(start_date, end_date, stock_id):
             "title": "Stock Value",
             "xaxis": {"title": "Datetime"},
             "yaxis": {"title": "Stock Value"},
+            # keep the users zoom while the zoomed in range is re-queried
+            "uirevision": f"{stock_id} {time_range.start} {time_range.end}",
         },
     }
+    return StockTimeline(
+        figure,
+        to_cursor_time(tick_time_stamps[-1]) if len(tick_time_stamps) else None,
+        newest_prediction,
+    )
+
+
+def to_json_version(data_version: tuple) -> list:
+    """Get a JSON serializable stock data version"""
+    return [time_stamp and time_stamp.isoformat() for time_stamp in data_version]
+
+
+def get_live_cursor(
+    stock_id, timeline: StockTimeline, num_buckets, data_version
+) -> dict:
+    """Get the live tail cursor of a stock timeline figure
+
+    The cursor holds the full precision times of the newest tick and
+    prediction points of the figure, which the live tail extends the figure
+    after.
+    """
+    return {
+        "stock_id": stock_id,
+        "num_buckets": num_buckets,
+        "version": to_json_version(data_version),
+        "tick": timeline.newest_tick,
+        "prediction": timeline.newest_prediction,
+    }
+
+
+@DASH.callback(
+    Output("stock-live-interval", "disabled"), [Input("stock-live-tail", "value")]
+)
+def toggle_live_tail(live_tail):
+    return "live" not in (live_tail or [])
+
+
+def extend_stock_timeline(cursor):
+    """Get the ``extendData`` and advanced cursor of a live tail update
+
+    :raises PreventUpdate: if the stock has no new ticks or predictions
+    """
+    if not cursor or not cursor["stock_id"]:
+        raise PreventUpdate
+    # a idle stock costs only the two index lookups of its data version
+    data_version = to_json_version(get_stock_data_version(cursor["stock_id"]))
+    if data_version == cursor["version"]:
+        raise PreventUpdate
+    extend_data, cursor = build_stock_timeline_extension(cursor, data_version)
+    return extend_data or dash.no_update, cursor
+
+
+def build_stock_timeline_extension(cursor: dict, data_version: list):
+    """Build the ``extendData`` appending the ticks and predictions newer than
+    a live tail cursor to the stock timeline graph
+
+    Each trace is bounded to the ``2 * num_buckets`` points of a full figure
+    by dropping its oldest points. Prediction points already shown are not
+    revised by newer predictions until the figure is next rebuilt.
+
+    :return: the ``extendData``, or :obj:`None` if there is nothing to
+        append, and the advanced cursor
+    """
+    stock_id = cursor["stock_id"]
+    max_points = 2 * cursor["num_buckets"]
+    cursor = dict(cursor, version=data_version)
+    updates = {"x": [], "y": []}
+    trace_indices = []
+
+    ticks = db.session.query(stock_data.time_stamp, stock_data.open).filter(
+        stock_data.stock_name == stock_id
+    )
+    if cursor["tick"] is not None:
+        ticks = ticks.filter(stock_data.time_stamp > to_datetime(cursor["tick"]))
+    ticks = ticks.order_by(desc(stock_data.time_stamp)).limit(max_points).all()
+    if ticks:
+        tick_time_stamps, tick_opens = zip(*reversed(ticks))
+        tick_time_stamps = np.array(tick_time_stamps, dtype="datetime64[us]")
+        updates["x"].append(to_json_times(tick_time_stamps))
+        updates["y"].append(to_json_values(tick_opens))
+        trace_indices.append(0)
+        cursor["tick"] = to_cursor_time(tick_time_stamps[-1])
+
+    if cursor["prediction"] is not None:
+        # consolidate every prediction that reaches past the newest shown
+        # prediction point, keeping only the points after it
+        last_prediction = to_datetime(cursor["prediction"])
+        stock_predictions = query_stock_predictions(
+            stock_id,
+            TimeRange(last_prediction - PREDICTION_HORIZON, datetime.max),
+            stock_prediction.time_stamp,
+            stock_prediction.prediction,
+        ).all()
+        times, means, lower, upper = consolidate_predictions(
+            np.array([m.time_stamp for m in stock_predictions], dtype="datetime64[us]"),
+            [m.prediction or [] for m in stock_predictions],
+            percentiles=PREDICTION_BAND_PERCENTILES,
+        )
+        newer = times > np.datetime64(last_prediction, "us")
+        if newer.any():
+            prediction_times = to_json_times(times[newer])
+            for values in (lower, upper, means):
+                updates["x"].append(prediction_times)
+                updates["y"].append(to_json_values(values[newer], PREDICTION_DECIMALS))
+            trace_indices.extend([1, 2, 3])
+            cursor["prediction"] = to_cursor_time(times[newer][-1])
+
+    if not trace_indices:
+        return None, cursor
+    return [updates, trace_indices, max_points], cursor
 
 
 DASH.config.suppress_callback_exceptions = True
@@ -570,24 +1167,54 @@ TRADING_SESSION = api.model(
         "start_time": fields.DateTime(),
         "end_time": fields.DateTime(),
         "num_trades": fields.Integer(default=0),
+        "buy_trades": fields.Integer(default=0, description="number of BUY trades"),
+        "sell_trades": fields.Integer(default=0, description="number of SELL trades"),
+        "buy_volume": fields.Integer(default=0, description="total volume bought"),
+        "sell_volume": fields.Integer(default=0, description="total volume sold"),
+        "buy_notional": fields.Float(
+            default=0.0, description="total price * volume bought"
+        ),
+        "sell_notional": fields.Float(
+            default=0.0, description="total price * volume sold"
+        ),
     },
 )
 
 
+PAGE_LIMIT_DESCRIPTION = (
+    "maximum number of items to return, enables pagination with the next page "
+    "cursor given by the X-Next-Cursor and Link response headers"
+)
+PAGE_AFTER_DESCRIPTION = "cursor of the page to return"
+
+
 @trading_sessions_ns.route("/")
 class TradingSessionList(Resource):
     @login_required(basic=True)
+    @conditional_view
     @trading_sessions_ns.doc("list all stock orders")
+    @trading_sessions_ns.param("limit", PAGE_LIMIT_DESCRIPTION, type=int)
+    @trading_sessions_ns.param("after", PAGE_AFTER_DESCRIPTION)
     @trading_sessions_ns.marshal_list_with(TRADING_SESSION)
+    @read_replica_view
     def get(self):
         """Get the list of all trade sessions for the currently logged in user"""
         username = get_username()
-        trading_sessions = (
-            db.session.query(trading_session)
-            .filter(trading_session.username == username)
-            .all()
+        trading_sessions = db.session.query(trading_session).filter(
+            trading_session.username == username
+        )
+        key_columns = [trading_session.session_id]
+        limit, after = get_page_args(key_columns)
+        if limit is None:
+            return [trading_session_.to_dict() for trading_session_ in trading_sessions]
+        trading_sessions, next_cursor = paginate(
+            trading_sessions, key_columns, limit, after
+        )
+        return (
+            [trading_session_.to_dict() for trading_session_ in trading_sessions],
+            200,
+            page_headers(limit, next_cursor),
         )
-        return [trading_session_.to_dict() for trading_session_ in trading_sessions]
 
     # TODO: using basic here makes unit test fails (maybe this is a issue with flask-restx?)
     @login_required()
@@ -608,6 +1235,9 @@ class TradingSessionList(Resource):
             is_finished=new_trading_session.get("is_finished", False),
         )
         db.session.add(new_trading_session_db)
+        db.session.flush()
+        publish_trading_session_event(new_trading_session_db)
+        touch_user(username)
         db.session.commit()
         return new_trading_session_db.to_dict(), 201
 
@@ -616,8 +1246,10 @@ class TradingSessionList(Resource):
 @trading_sessions_ns.response(404, "trading session not found")
 class TradingSession(Resource):
     @login_required(basic=True)
+    @conditional_view
     @trading_sessions_ns.doc("get_todo")
     @trading_sessions_ns.marshal_with(TRADING_SESSION)
+    @read_replica_view
     def get(self, session_id):
         """Get a trade session for the currently logged in user""" ""
         username = get_username()
@@ -652,6 +1284,8 @@ class TradingSessionPause(Resource):
         if not trading_session_:
             abort(404, "trading session not found")
         trading_session_.is_paused = True
+        publish_trading_session_event(trading_session_)
+        touch_user(username)
         db.session.commit()
         return trading_session_.to_dict()
 
@@ -674,6 +1308,8 @@ class TradingSessionStart(Resource):
         if not trading_session_:
             abort(404, "trading session not found")
         trading_session_.is_paused = False
+        publish_trading_session_event(trading_session_)
+        touch_user(username)
         db.session.commit()
         return trading_session_.to_dict()
 
@@ -700,6 +1336,8 @@ class TradingSessionFinish(Resource):
         if not trading_session_:
             abort(404, "trading session not found")
         trading_session_.is_finished = True
+        publish_trading_session_event(trading_session_)
+        touch_user(username)
         db.session.commit()
         return trading_session_.to_dict()
 
@@ -725,24 +1363,173 @@ TRADE = api.model(
 )
 
 
+SESSION_TRADE_TOTALS = {
+    "BUY": ("buy_trades", "buy_volume", "buy_notional"),
+    "SELL": ("sell_trades", "sell_volume", "sell_notional"),
+}
+
+
+def get_session_trade_totals_updates(new_trades) -> list:
+    """Get the statements adding new trades to the running trade totals of
+    their trading sessions
+
+    The totals are incremented by ``SET total = total + increment`` updates
+    so that concurrent trade inserts do not lose updates. Sessions are
+    updated in ``session_id`` order to avoid deadlocks between concurrent
+    batches.
+    """
+    session_increments = {}
+    for new_trade in new_trades:
+        increments = session_increments.setdefault(new_trade.session_id, Counter())
+        count_column, volume_column, notional_column = SESSION_TRADE_TOTALS[
+            new_trade.trade_type
+        ]
+        increments["num_trades"] += 1
+        increments[count_column] += 1
+        increments[volume_column] += new_trade.volume
+        increments[notional_column] += new_trade.price * new_trade.volume
+    session_table = trading_session.__table__
+    return [
+        session_table.update()
+        .where(session_table.c.session_id == session_id)
+        .values(
+            {
+                column: func.coalesce(session_table.c[column], 0) + increment
+                for column, increment in session_increments[session_id].items()
+            }
+        )
+        for session_id in sorted(session_increments)
+    ]
+
+
+def add_session_trade_totals(new_trades):
+    """Add new trades to the running trade totals of their trading sessions
+    within the current transaction"""
+    for update in get_session_trade_totals_updates(new_trades):
+        db.session.execute(update)
+
+
+def parse_iso_datetime(value) -> datetime:
+    """Parse a ISO 8601 payload datetime into a naive :class:`datetime`
+
+    Like the ``TIMESTAMP WITHOUT TIME ZONE`` columns, any UTC offset is
+    dropped rather than applied.
+
+    :raises ValueError: if the value is not a ISO 8601 datetime
+    """
+    if not isinstance(value, str):
+        raise ValueError(f"not a ISO 8601 datetime: {value}")
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def validate_trade(new_trade) -> Optional[str]:
+    """Validate the payload of a new stock trade
+
+    :return: the reason the trade is invalid, or :obj:`None` if it is valid
+    """
+    if not isinstance(new_trade, dict):
+        return "trade must be a JSON object"
+
+    # trade type is BUY or SELL
+    if new_trade.get("trade_type") not in ["BUY", "SELL"]:
+        return "trade_type must be either BUY or SELL"
+
+    # ensure volume>1
+    volume = new_trade.get("volume")
+    # JSON true and false decode to bool, a subclass of int
+    if not isinstance(volume, int) or isinstance(volume, bool) or volume < 1:
+        return "volume must be a integer equal to or greater than 1"
+
+    # ensure price>0
+    price = new_trade.get("price")
+    if not isinstance(price, (int, float)) or price <= 0:
+        return "price must be greater than 0"
+
+    if not isinstance(new_trade.get("session_id"), int):
+        return "session_id must be an integer"
+
+    if not new_trade.get("time_stamp"):
+        return "time_stamp is required"
+    try:
+        parse_iso_datetime(new_trade["time_stamp"])
+    except ValueError:
+        return "time_stamp must be a ISO 8601 datetime"
+    return None
+
+
+def select_user_trades(
+    username, limit: int, after: Optional[list] = None, newest_first: bool = False
+):
+    """Select the first ``limit`` trades of a user in ``(time_stamp,
+    trade_id)`` order, or newest first, along with the ticker of their
+    trading session
+
+    Each trading session of the user reads its own first trades from the
+    ``(session_id, time_stamp, trade_id)`` index through a ``LATERAL`` join,
+    and only these are merged, so the cost grows with the user's trading
+    sessions rather than with the trades of every user, even for deep pages.
+
+    :param after: the ``(time_stamp, trade_id)`` keyset of the trade to
+        start after, see :mod:`.pagination`
+    """
+    trade_table = trade.__table__
+    session_table = trading_session.__table__
+
+    def get_order(key_columns):
+        return [desc(column) if newest_first else column for column in key_columns]
+
+    key_columns = [trade_table.c.time_stamp, trade_table.c.trade_id]
+    session_trades = select([trade_table]).where(
+        trade_table.c.session_id == session_table.c.session_id
+    )
+    if after is not None:
+        keyset = tuple_(*key_columns)
+        session_trades = session_trades.where(
+            keyset < tuple_(*after) if newest_first else keyset > tuple_(*after)
+        )
+    session_trades = (
+        session_trades.order_by(*get_order(key_columns))
+        .limit(limit)
+        .lateral("session_trade")
+    )
+    key_columns = [session_trades.c.time_stamp, session_trades.c.trade_id]
+    return (
+        select([session_trades, session_table.c.ticker])
+        .select_from(session_table.join(session_trades, true()))
+        .where(session_table.c.username == username)
+        .order_by(*get_order(key_columns))
+        .limit(limit)
+    )
+
+
 @trade_ns.route("/")
 class TradeList(Resource):
     @login_required(basic=True)
+    @conditional_view
+    @trade_ns.param("limit", PAGE_LIMIT_DESCRIPTION, type=int)
+    @trade_ns.param("after", PAGE_AFTER_DESCRIPTION)
     @trade_ns.marshal_list_with(TRADE)
+    @read_replica_view
     def get(self):
-        """Get the list of all stock trades for the currently logged in user"""
+        """Get the list of all stock trades for the currently logged in user
+
+        Paginated trades are ordered by ``(time_stamp, trade_id)``.
+        """
         username = get_username()
-        trading_sessions_ids = (
-            db.session.query(trading_session.session_id)
-            .filter(trading_session.username == username)
-            .all()
-        )
-        trades = (
-            db.session.query(trade)
-            .filter(trade.session_id.in_(trading_sessions_ids))
-            .all()
+        key_columns = [trade.time_stamp, trade.trade_id]
+        limit, after = get_page_args(key_columns)
+        if limit is None:
+            trades = (
+                db.session.query(trade)
+                .join(trade.trading_session)
+                .filter(trading_session.username == username)
+            )
+            return [trade_.to_dict() for trade_ in trades]
+        rows = db.session.execute(select_user_trades(username, limit + 1, after))
+        trades, next_cursor = split_page(
+            [dict(row) for row in rows], key_columns, limit
         )
-        return [trade_.to_dict() for trade_ in trades]
+        return trades, 200, page_headers(limit, next_cursor)
 
     # TODO: using basic here makes unit test fails (maybe this is a issue with flask-restx?)
     @login_required()
@@ -751,18 +1538,9 @@ class TradeList(Resource):
     def post(self):
         """Add a stock trade to the currently logged in user"""
         new_trade = api.payload
-
-        # trade type is BUY or SELL
-        if new_trade["trade_type"] not in ["BUY", "SELL"]:
-            abort(400, "trade_type must be either BUY or SELL")
-
-        # ensure volume>1
-        if new_trade["volume"] < 1:
-            abort(400, "volume must be a integer equal to or greater than 1")
-
-        # ensure price>0
-        if new_trade["price"] <= 0:
-            abort(400, "price must be greater than 0")
+        invalid_reason = validate_trade(new_trade)
+        if invalid_reason:
+            abort(400, invalid_reason)
 
         # get the session id by the currently non_paused trading session
         username = get_username()
@@ -784,33 +1562,251 @@ class TradeList(Resource):
             trade_type=new_trade["trade_type"],
             volume=new_trade["volume"],
             session_id=new_trade["session_id"],
-            time_stamp=new_trade["time_stamp"],
+            time_stamp=parse_iso_datetime(new_trade["time_stamp"]),
         )
         db.session.add(new_trade_db)
+        add_session_trade_totals([new_trade_db])
+        db.session.flush()
+        publish_event(db.session, username, "trade", marshal(new_trade_db, TRADE))
+        touch_user(username)
         db.session.commit()
         return new_trade_db.to_dict(), 201
 
 
+def insert_trades(trade_values) -> list:
+    """Insert new trades with a single multi-row ``INSERT ... RETURNING``
+    statement within the current transaction
+
+    The trade ids are drawn from the trade id sequence up front, so that the
+    returned rows are matched to ``trade_values`` by their id, as PostgreSQL
+    does not guarantee the order of the ``RETURNING`` rows.
+
+    :return: the inserted trade rows in the order of ``trade_values``
+    """
+    if not trade_values:
+        return []
+    trade_table = trade.__table__
+    trade_id_sequence = func.pg_get_serial_sequence(
+        trade_table.name, trade_table.c.trade_id.name
+    )
+    trade_ids = sorted(
+        trade_id
+        for trade_id, in db.session.execute(
+            select([func.nextval(trade_id_sequence)]).select_from(
+                func.generate_series(1, len(trade_values))
+            )
+        )
+    )
+    rows = {
+        row.trade_id: row
+        for row in db.session.execute(
+            trade_table.insert()
+            .values(
+                [
+                    dict(values, trade_id=trade_id)
+                    for trade_id, values in zip(trade_ids, trade_values)
+                ]
+            )
+            .returning(*trade_table.c)
+        )
+    }
+    return [rows[trade_id] for trade_id in trade_ids]
+
+
+TRADE_BATCH_RESULT = api.model(
+    "trade_batch_result",
+    {
+        "index": fields.Integer(description="index of the trade within the batch"),
+        "status": fields.Integer(
+            description="HTTP status of adding the trade (201|400|404)"
+        ),
+        "message": fields.String(description="reason the trade was not added"),
+        "trade": fields.Nested(TRADE, allow_null=True, description="the added trade"),
+    },
+)
+
+MAX_TRADE_BATCH_SIZE = 1000
+
+
+@trade_ns.route("/batch")
+class TradeBatch(Resource):
+    # TODO: using basic here makes unit test fails (maybe this is a issue with flask-restx?)
+    @login_required()
+    @trade_ns.expect([TRADE])
+    @trade_ns.marshal_list_with(TRADE_BATCH_RESULT)
+    def post(self):
+        """Add a batch of stock trades to the currently logged in user
+
+        All referenced trading sessions are validated with a single query and
+        the valid trades are added within a single transaction. The result of
+        each trade is given in the order of the batch.
+        """
+        new_trades = api.payload
+        if not isinstance(new_trades, list):
+            abort(400, "payload must be a list of trades")
+        if len(new_trades) > MAX_TRADE_BATCH_SIZE:
+            abort(400, f"a batch can contain at most {MAX_TRADE_BATCH_SIZE} trades")
+
+        results = []
+        for index, new_trade in enumerate(new_trades):
+            invalid_reason = validate_trade(new_trade)
+            results.append(
+                {
+                    "index": index,
+                    "status": 400 if invalid_reason else 201,
+                    "message": invalid_reason,
+                    "trade": None,
+                }
+            )
+
+        # get the referenced trading sessions that are currently non_paused
+        username = get_username()
+        session_ids = {
+            new_trade["session_id"]
+            for new_trade, result in zip(new_trades, results)
+            if result["status"] == 201
+        }
+        running_session_ids = set()
+        if session_ids:
+            running_session_ids = {
+                session_id
+                for session_id, in db.session.query(trading_session.session_id).filter(
+                    trading_session.username == username,
+                    trading_session.session_id.in_(session_ids),
+                    trading_session.is_finished == False,
+                    trading_session.is_paused == False,
+                )
+            }
+
+        added_trades = []
+        for new_trade, result in zip(new_trades, results):
+            if result["status"] != 201:
+                continue
+            if new_trade["session_id"] not in running_session_ids:
+                result.update(status=404, message="trading session not found")
+                continue
+            added_trades.append(
+                (
+                    {
+                        "price": new_trade["price"],
+                        "trade_type": new_trade["trade_type"],
+                        "volume": new_trade["volume"],
+                        "session_id": new_trade["session_id"],
+                        "time_stamp": parse_iso_datetime(new_trade["time_stamp"]),
+                    },
+                    result,
+                )
+            )
+        added_rows = insert_trades([values for values, _ in added_trades])
+        add_session_trade_totals(added_rows)
+        for row, (_, result) in zip(added_rows, added_trades):
+            result["trade"] = dict(row)
+        publish_events(
+            db.session,
+            username,
+            [("trade", marshal(result["trade"], TRADE)) for _, result in added_trades],
+        )
+        if added_trades:
+            touch_user(username)
+        db.session.commit()
+        return results
+
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_COLUMNS = [
+    "trade_id",
+    "session_id",
+    "trade_type",
+    "price",
+    "volume",
+    "time_stamp",
+]
+EXPORT_CHUNK_SIZE = 1000
+
+
+def iter_trade_export(username, export_format):
+    """Yield the encoded trades of a user in chunks of
+    :data:`EXPORT_CHUNK_SIZE` rows
+
+    Rows are read from the read replica, unless the user changed recently,
+    through a server-side cursor as plain column tuples so that memory use
+    does not grow with the size of the trade history.
+    """
+    with read_replica(db.session):
+        rows = (
+            db.session.query(*[getattr(trade, column) for column in EXPORT_COLUMNS])
+            .join(trade.trading_session)
+            .filter(trading_session.username == username)
+            .order_by(trade.time_stamp, trade.trade_id)
+            .execution_options(stream_results=True)
+            .yield_per(EXPORT_CHUNK_SIZE)
+        )
+        buffer = io.StringIO()
+        csv_writer = csv.writer(buffer)
+        if export_format == "csv":
+            csv_writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        for i, row in enumerate(rows, start=1):
+            row = row._asdict()
+            row["time_stamp"] = row["time_stamp"] and row["time_stamp"].isoformat()
+            if export_format == "csv":
+                csv_writer.writerow([row[column] for column in EXPORT_COLUMNS])
+            else:
+                buffer.write(json.dumps(row))
+                buffer.write("\n")
+            if i % EXPORT_CHUNK_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+@trade_ns.route("/export")
+class TradeExport(Resource):
+    @login_required(basic=True)
+    @trade_ns.param(
+        "format",
+        "export format (ndjson|csv)",
+        enum=list(EXPORT_FORMATS),
+        default="ndjson",
+    )
+    @trade_ns.produces(list(EXPORT_FORMATS.values()))
+    def get(self):
+        """Stream the full trade history of the currently logged in user
+
+        Trades are ordered by ``(time_stamp, trade_id)``.
+        """
+        export_format = request.args.get("format", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            abort(400, f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+        username = get_username()
+        query_user_validators(username)
+        return Response(
+            stream_with_context(iter_trade_export(username, export_format)),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={
+                "Content-Disposition": f"attachment; filename=trades.{export_format}"
+            },
+        )
+
+
 @trade_ns.route("/<int:trade_id>")
 class Trade(Resource):
     # TODO: using basic here makes unit test fails (maybe this is a issue with flask-restx?)
     @login_required()
+    @conditional_view
     @trade_ns.marshal_with(TRADE)
+    @read_replica_view
     def get(self, trade_id):
         """Get a stock trade for the currently logged in user"""
         username = get_username()
-        trading_sessions_ids = (
-            db.session.query(trading_session.session_id)
-            .filter(trading_session.username == username)
-            .all()
-        )
-        if not trading_sessions_ids:
-            abort(404, "no trading sessions for user")
         trade_ = (
             db.session.query(trade)
-            .filter(
-                trade.trade_id == trade_id, trade.session_id.in_(trading_sessions_ids)
-            )
+            .join(trade.trading_session)
+            .filter(trade.trade_id == trade_id, trading_session.username == username)
             .first()
         )
         if not trade_:
@@ -818,6 +1814,127 @@ class Trade(Resource):
         return trade_.to_dict()
 
 
+events_ns = api.namespace(
+    "events", description="trade and trading session event operations"
+)
+
+
+@events_ns.route("/")
+class EventStream(Resource):
+    @login_required(basic=True)
+    @events_ns.produces(["text/event-stream"])
+    def get(self):
+        """Stream the trade and trading session events of the currently logged
+        in user as server-sent events
+
+        A ``trade`` event is sent for each added trade and a
+        ``trading_session`` event for each added, paused, started or finished
+        trading session, once their transaction commits. Events missed while
+        disconnected are not replayed.
+        """
+        start_event_listener(APP.config["SQLALCHEMY_DATABASE_URI"])
+        return Response(
+            iter_event_stream(get_username()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
+statistics_ns = api.namespace("statistics", description="trading statistics operations")
+
+SESSION_STATISTICS = api.model(
+    "session_statistics",
+    {
+        "session_id": fields.Integer(description="id of the trading session"),
+        "ticker": fields.String(description="name of the stock"),
+        "is_paused": fields.Boolean(),
+        "is_finished": fields.Boolean(),
+        "start_time": fields.DateTime(),
+        "end_time": fields.DateTime(),
+        "total_trades": fields.Integer(description="number of trades"),
+        "total_buy": fields.Integer(description="number of BUY trades"),
+        "total_sell": fields.Integer(description="number of SELL trades"),
+        "total_buy_volume": fields.Integer(description="total volume bought"),
+        "total_sell_volume": fields.Integer(description="total volume sold"),
+        "total_buy_value": fields.Float(description="total price * volume bought"),
+        "total_sell_value": fields.Float(description="total price * volume sold"),
+    },
+)
+
+
+@statistics_ns.route("/")
+class StatisticsList(Resource):
+    @login_required(basic=True)
+    @conditional_view
+    @statistics_ns.marshal_list_with(SESSION_STATISTICS)
+    @read_replica_view
+    def get(self):
+        """Get the trade statistics of every trading session of the currently
+        logged in user
+
+        The statistics are the running trade totals kept on each trading
+        session, so no trades are scanned.
+        """
+        username = get_username()
+        trading_sessions = (
+            db.session.query(trading_session)
+            .filter(trading_session.username == username)
+            .order_by(trading_session.session_id)
+            .all()
+        )
+        statistics = []
+        for trading_session_ in trading_sessions:
+            session_statistics = trading_session_.to_dict()
+            session_statistics.update(
+                {
+                    "total_trades": session_statistics["num_trades"],
+                    "total_buy": session_statistics["buy_trades"],
+                    "total_sell": session_statistics["sell_trades"],
+                    "total_buy_volume": session_statistics["buy_volume"],
+                    "total_sell_volume": session_statistics["sell_volume"],
+                    "total_buy_value": session_statistics["buy_notional"],
+                    "total_sell_value": session_statistics["sell_notional"],
+                }
+            )
+            statistics.append(session_statistics)
+        return statistics
+
+
+auth_ns = api.namespace("auth", description="API authentication operations")
+
+API_TOKEN = api.model(
+    "api_token",
+    {
+        "access_token": fields.String(description="signed bearer token"),
+        "token_type": fields.String(description="type of the token", default="Bearer"),
+        "expires_in": fields.Integer(
+            description="seconds until the token expires", default=API_TOKEN_MAX_AGE
+        ),
+    },
+)
+
+
+@auth_ns.route("/token")
+class APIToken(Resource):
+    @login_required(basic=True)
+    @auth_ns.marshal_with(API_TOKEN, code=201)
+    def post(self):
+        """Issue a bearer token for the currently logged in user
+
+        The token is accepted within a ``Authorization: Bearer <token>``
+        header in place of basic authentication, and is checked without a
+        user lookup.
+        """
+        return (
+            {
+                "access_token": create_api_token(get_username()),
+                "token_type": "Bearer",
+                "expires_in": API_TOKEN_MAX_AGE,
+            },
+            201,
+        )
+
+
 user_ns = api.namespace("user", description="user operations")
 USER = api.model(
     "user",
@@ -832,6 +1949,8 @@ USER = api.model(
 
 @user_ns.route("/")
 class APIUser(Resource):
+    # not a conditional view, the user revision does not cover changes of the
+    # user's own fields such as bank
     @login_required(basic=True)
     @user_ns.marshal_list_with(USER)
     def get(self):
@@ -839,3 +1958,254 @@ class APIUser(Resource):
         username = get_username()
         user_ = db.session.query(User).filter(User.username == username).first()
         return user_.to_dict()
+
+
+account_ns = api.namespace("account", description="account operations")
+
+RECENT_TRADE = api.inherit(
+    "recent_trade",
+    TRADE,
+    {"ticker": fields.String(description="name of the stock of the trade")},
+)
+
+ACCOUNT_SUMMARY = api.model(
+    "account_summary",
+    {
+        "username": fields.String(description="Name of the user"),
+        "bank": fields.Float(description="The user's liquid cash assets"),
+        "total_sessions": fields.Integer(description="number of trading sessions"),
+        "active_sessions": fields.Integer(
+            description="number of unfinished trading sessions"
+        ),
+        "total_trades": fields.Integer(description="number of trades"),
+        "sessions": fields.List(
+            fields.Nested(TRADING_SESSION), description="unfinished trading sessions"
+        ),
+        "recent_trades": fields.List(
+            fields.Nested(RECENT_TRADE), description="most recent trades"
+        ),
+    },
+)
+
+DEFAULT_RECENT_TRADES = 5
+MAX_RECENT_TRADES = 100
+
+
+@account_ns.route("/summary")
+class AccountSummary(Resource):
+    # not a conditional view, as the summary holds the user's bank
+    @login_required(basic=True)
+    @read_your_writes_view
+    @account_ns.param(
+        "recent_trades",
+        f"number of recent trades to return (max {MAX_RECENT_TRADES})",
+        type=int,
+        default=DEFAULT_RECENT_TRADES,
+    )
+    @account_ns.marshal_with(ACCOUNT_SUMMARY)
+    @read_replica_view
+    def get(self):
+        """Get the account summary of the currently logged in user"""
+        num_recent_trades = request.args.get(
+            "recent_trades", DEFAULT_RECENT_TRADES, type=int
+        )
+        if not 0 <= num_recent_trades <= MAX_RECENT_TRADES:
+            abort(
+                400,
+                f"recent_trades must be an integer between 0 and {MAX_RECENT_TRADES}",
+            )
+
+        username = get_username()
+        user_ = db.session.query(User).filter(User.username == username).first()
+        total_sessions = (
+            db.session.query(func.count(trading_session.session_id))
+            .filter(trading_session.username == username)
+            .scalar()
+        )
+        active_sessions = (
+            db.session.query(trading_session)
+            .filter(
+                trading_session.username == username,
+                trading_session.is_finished == False,
+            )
+            .order_by(trading_session.session_id)
+            .all()
+        )
+        total_trades = (
+            db.session.query(func.coalesce(func.sum(trading_session.num_trades), 0))
+            .filter(trading_session.username == username)
+            .scalar()
+        )
+        recent_trades = db.session.execute(
+            select_user_trades(username, num_recent_trades, newest_first=True)
+        ).fetchall()
+        return {
+            "username": user_.username,
+            "bank": user_.bank,
+            "total_sessions": total_sessions,
+            "active_sessions": len(active_sessions),
+            "total_trades": total_trades,
+            "sessions": [
+                trading_session_.to_dict() for trading_session_ in active_sessions
+            ],
+            "recent_trades": [dict(row) for row in recent_trades],
+        }
+
+
+cache_ns = api.namespace("cache", description="server cache operations")
+
+CACHE_STATISTICS = api.model(
+    "cache_statistics",
+    {
+        "name": fields.String(description="name of the cache"),
+        "size": fields.Integer(description="number of cached entries"),
+        "maxsize": fields.Integer(description="maximum number of cached entries"),
+        "hits": fields.Integer(description="number of lookups found in the cache"),
+        "misses": fields.Integer(
+            description="number of lookups missing from the cache"
+        ),
+        "evictions": fields.Integer(
+            description="number of least recently used entries evicted"
+        ),
+        "invalidations": fields.Integer(
+            description="number of entries dropped due to new stock data"
+        ),
+    },
+)
+
+
+@cache_ns.route("/")
+class CacheStatistics(Resource):
+    @login_required(basic=True)
+    @cache_ns.marshal_list_with(CACHE_STATISTICS)
+    def get(self):
+        """Get the size and hit/miss counters of the server caches"""
+        return [dict(FIGURE_CACHE.stats(), name="stock timeline figures")]
+
+
+pool_ns = api.namespace("pool", description="database connection pool operations")
+
+POOL_STATISTICS = api.model(
+    "pool_statistics",
+    {
+        "pool": fields.String(description="class of the connection pool"),
+        "pool_size": fields.Integer(description="number of connections kept open"),
+        "checked_out": fields.Integer(description="number of connections in use"),
+        "checked_in": fields.Integer(description="number of idle connections"),
+        "overflow": fields.Integer(
+            description="number of open connections beyond the pool size"
+        ),
+        "max_overflow": fields.Integer(
+            description="maximum number of connections beyond the pool size"
+        ),
+        "checkouts": fields.Integer(description="number of connection checkouts"),
+        "timeouts": fields.Integer(
+            description="number of checkouts that timed out waiting for a connection"
+        ),
+        "total_wait": fields.Float(
+            description="total seconds checkouts waited for a connection"
+        ),
+        "max_wait": fields.Float(
+            description="longest seconds a checkout waited for a connection"
+        ),
+    },
+)
+
+
+@pool_ns.route("/")
+class PoolStatistics(Resource):
+    @login_required(basic=True)
+    @pool_ns.marshal_with(POOL_STATISTICS)
+    def get(self):
+        """Get the connection usage and wait times of the database
+        connection pool"""
+        return get_pool_statistics(db.engine.pool)
+
+
+############
+# Metrics
+############
+
+DASH_CALLBACK_ENDPOINT = "_dash-update-component"
+UNKNOWN_DASH_CALLBACK_ENDPOINT = "dash:unknown"
+
+DB_POOL_CONNECTIONS = REGISTRY.register(
+    Gauge(
+        "autotradeweb_db_pool_connections",
+        "Connections of the database connection pool",
+        ["state"],
+    )
+)
+DB_POOL_CHECKOUTS = REGISTRY.register(
+    CounterMetric(
+        "autotradeweb_db_pool_checkouts_total", "Checkouts of database connections"
+    )
+)
+DB_POOL_TIMEOUTS = REGISTRY.register(
+    CounterMetric(
+        "autotradeweb_db_pool_timeouts_total",
+        "Checkouts that timed out waiting for a database connection",
+    )
+)
+DB_POOL_WAIT = REGISTRY.register(
+    CounterMetric(
+        "autotradeweb_db_pool_wait_seconds_total",
+        "Seconds checkouts waited for a database connection",
+    )
+)
+CACHE_ENTRIES = REGISTRY.register(
+    Gauge("autotradeweb_cache_entries", "Entries of the server caches", ["cache"])
+)
+CACHE_LOOKUPS = REGISTRY.register(
+    CounterMetric(
+        "autotradeweb_cache_lookups_total",
+        "Lookups of the server caches",
+        ["cache", "result"],
+    )
+)
+
+CACHES = {"figure": FIGURE_CACHE, "credential": CREDENTIAL_CACHE}
+
+
+@APP.before_request
+def set_metrics_endpoint():
+    """Label the metrics of a request with its endpoint, or with the outputs
+    of its Dash callback"""
+    endpoint = request.endpoint or UNKNOWN_ENDPOINT
+    if endpoint.endswith(DASH_CALLBACK_ENDPOINT):
+        # flask caches the parsed payload for the callback itself
+        payload = request.get_json(silent=True)
+        output = payload.get("output") if isinstance(payload, dict) else None
+        # only the registered callbacks are labelled, so that requests cannot
+        # add label values without bound
+        if isinstance(output, str) and output in DASH.callback_map:
+            endpoint = f"dash:{output}"
+        else:
+            endpoint = UNKNOWN_DASH_CALLBACK_ENDPOINT
+    request.environ[ENDPOINT_ENVIRON_KEY] = endpoint
+
+
+def collect_server_metrics():
+    """Update the metrics of the connection pool and caches"""
+    statistics = get_pool_statistics(db.engine.pool)
+    for state in ["checked_out", "checked_in", "overflow"]:
+        if statistics[state] is not None:
+            DB_POOL_CONNECTIONS.set(statistics[state], state)
+    if statistics["checkouts"] is not None:
+        DB_POOL_CHECKOUTS.set(statistics["checkouts"])
+        DB_POOL_TIMEOUTS.set(statistics["timeouts"])
+        DB_POOL_WAIT.set(statistics["total_wait"])
+    for name, cache in CACHES.items():
+        cache_statistics = cache.stats()
+        CACHE_ENTRIES.set(cache_statistics["size"], name)
+        CACHE_LOOKUPS.set(cache_statistics["hits"], name, "hit")
+        CACHE_LOOKUPS.set(cache_statistics["misses"], name, "miss")
+
+
+REGISTRY.add_collect_hook(collect_server_metrics)
+
+
+@APP.route("/metrics")
+def metrics():
+    """Get the server metrics in the Prometheus text exposition format"""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Time series helpers for the dashboard stock timeline graph"""
+
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_
+
+DEFAULT_GRAPH_WIDTH = 1000
+MIN_GRAPH_WIDTH = 100
+MAX_GRAPH_WIDTH = 4000
+
+
+def to_datetime(value: str) -> datetime:
+    """Parse a Dash date picker or Plotly axis range date string"""
+    return np.datetime64(value.replace(" ", "T"), "us").astype(datetime)
+
+
+class TimeRange(namedtuple("TimeRange", ["start", "end"])):
+    """Half-open ``[start, end)`` time stamp range
+
+    Comparing the bare ``time_stamp`` column against both bounds lets the
+    database range scan the ``(stock_name, time_stamp)`` primary key, whereas
+    wrapping the column within ``date()`` scans the whole history of a stock.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_date_picker(cls, start_date: str, end_date: str) -> "TimeRange":
+        """Get the range covering every day of a Dash date picker range
+
+        The date picker dates are inclusive and may include a time of day,
+        which is ignored.
+        """
+        start = datetime.combine(to_datetime(start_date).date(), time())
+        end = datetime.combine(to_datetime(end_date).date(), time())
+        return cls(start, end + timedelta(days=1))
+
+    def extend(self, delta: timedelta) -> "TimeRange":
+        """Get this range with its end moved by ``delta``"""
+        return TimeRange(self.start, self.end + delta)
+
+    def filter(self, column):
+        """Get the SQL predicate selecting the values of ``column`` within
+        this range"""
+        return and_(column >= self.start, column < self.end)
+
+
+def get_num_buckets(graph_width: Optional[int]) -> int:
+    """Get the number of downsampling buckets (one per pixel) for a graph of
+    ``graph_width`` pixels"""
+    if not graph_width:
+        return DEFAULT_GRAPH_WIDTH
+    return int(min(max(graph_width, MIN_GRAPH_WIDTH), MAX_GRAPH_WIDTH))
+
+
+def get_zoom_range(relayout_data: Optional[dict]) -> Optional[TimeRange]:
+    """Get the x axis range a user zoomed the graph to from its ``relayoutData``
+
+    :return: the zoomed range, or :obj:`None` if the graph is not zoomed in
+    """
+    if not relayout_data or relayout_data.get("xaxis.autorange"):
+        return None
+    if "xaxis.range[0]" in relayout_data and "xaxis.range[1]" in relayout_data:
+        zoom_range = [relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]]
+    elif "xaxis.range" in relayout_data:
+        zoom_range = relayout_data["xaxis.range"]
+    else:
+        return None
+    start, end = sorted(to_datetime(str(value)) for value in zoom_range)
+    return TimeRange(start, end)
+
+
+def min_max_downsample(
+    x: np.ndarray, y: np.ndarray, num_buckets: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Downsample a time ordered series to the minimum and maximum point of
+    each of ``num_buckets`` equal width time buckets
+
+    With one bucket per pixel of the graph this keeps the visual shape of
+    the series, including any spikes, while bounding it to at most
+    ``2 * num_buckets`` points.
+
+    :param x: ascending ``datetime64`` time stamps
+    :param y: values of the time stamps
+    """
+    if len(x) <= 2 * num_buckets:
+        return x, y
+    x_int = x.astype("datetime64[us]").astype(np.int64)
+    span = max(int(x_int[-1] - x_int[0]), 1)
+    buckets = (x_int - x_int[0]) * num_buckets // span
+    np.clip(buckets, 0, num_buckets - 1, out=buckets)
+
+    # sort by bucket then value, the first and last point of each bucket
+    # within this ordering are its minimum and maximum
+    order = np.lexsort((y, buckets))
+    sorted_buckets = buckets[order]
+    bucket_edges = sorted_buckets[1:] != sorted_buckets[:-1]
+    is_first = np.concatenate(([True], bucket_edges))
+    is_last = np.concatenate((bucket_edges, [True]))
+    keep = np.unique(np.concatenate((order[is_first], order[is_last])))
+    return x[keep], y[keep]
+
+
+def consolidate_predictions(
+    time_stamps: np.ndarray,
+    predictions: list,
+    step: np.timedelta64 = np.timedelta64(1, "h"),
+    percentiles: Tuple[float, float] = (10.0, 90.0),
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Consolidate overlapping predictions into a consensus over one time grid
+
+    The ``i`` th value of each prediction is for ``step * i`` after its time
+    stamp. Every predicted value is placed on a shared grid of ``step``
+    spaced times, after rounding the prediction time stamps to the nearest
+    ``step``, and the values predicted for each grid time are reduced to
+    their mean and (linearly interpolated) percentile band.
+
+    :param time_stamps: ``datetime64`` time stamps of the predictions
+    :param predictions: sequences of predicted values of each prediction
+    :return: the grid times along with the mean, lower percentile and upper
+        percentile of the values predicted for each time
+    """
+    lengths = np.array([len(prediction) for prediction in predictions], dtype=int)
+    values = np.concatenate(
+        [np.asarray(prediction, dtype=float) for prediction in predictions]
+        or [np.array([], dtype=float)]
+    )
+    step_us = step.astype("timedelta64[us]").astype(np.int64)
+    start_steps = np.rint(
+        time_stamps.astype("datetime64[us]").astype(np.int64) / step_us
+    ).astype(np.int64)
+    # grid step of every predicted value
+    value_steps = np.repeat(start_steps, lengths) + (
+        np.arange(len(values)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    )
+    predicted = ~np.isnan(values)
+    values, value_steps = values[predicted], value_steps[predicted]
+    if not len(values):
+        empty = np.array([], dtype=float)
+        return np.array([], dtype="datetime64[us]"), empty, empty, empty
+
+    # group the values of each grid step together in ascending order
+    order = np.lexsort((values, value_steps))
+    values, value_steps = values[order], value_steps[order]
+    group_starts = np.flatnonzero(
+        np.concatenate(([True], value_steps[1:] != value_steps[:-1]))
+    )
+    group_sizes = np.diff(np.append(group_starts, len(values)))
+
+    means = np.add.reduceat(values, group_starts) / group_sizes
+    bands = []
+    for percentile in percentiles:
+        position = group_starts + (group_sizes - 1) * (percentile / 100.0)
+        below = np.floor(position).astype(np.int64)
+        above = np.ceil(position).astype(np.int64)
+        bands.append(
+            values[below] + (values[above] - values[below]) * (position - below)
+        )
+    times = (value_steps[group_starts] * step_us).astype("datetime64[us]")
+    return times, means, bands[0], bands[1]
+
+
+def to_json_times(times: np.ndarray) -> List[str]:
+    """Format ``datetime64`` time stamps in bulk as second resolution ISO 8601
+    strings for a JSON graph figure"""
+    return np.datetime_as_string(times.astype("datetime64[s]"), unit="s").tolist()
+
+
+def to_cursor_time(time: np.datetime64) -> str:
+    """Format a ``datetime64`` time stamp as a microsecond resolution ISO 8601
+    string, which :func:`to_datetime` parses back without loss"""
+    return np.datetime_as_string(np.datetime64(time, "us"), unit="us")
+
+
+def to_json_values(values: np.ndarray, decimals: Optional[int] = None) -> list:
+    """Convert values to a list of JSON numbers for a graph figure
+
+    NaN values become ``null`` as NaN is not valid JSON.
+
+    :param decimals: number of decimals to round the values to, shortening
+        their JSON encoding
+    """
+    values = np.asarray(values, dtype=float)
+    if decimals is not None:
+        values = np.round(values, decimals)
+    json_values = values.tolist()
+    for index in np.flatnonzero(np.isnan(values)).tolist():
+        json_values[index] = None
+    return json_values
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark the REST API throughput of the WSGI and ASGI servers under many
+concurrent clients
+
+A benchmark user with a trading session of trades is added, each server is
+started in turn as a ``autotradeweb`` subprocess, and a number of concurrent
+keep-alive clients each send a number of ``GET /trades/?limit=<n>`` requests.
+The benchmark user is removed again afterwards.
+
+.. code-block:: console
+
+    python benchmark/bench_asgi.py --database <DATABASE_URI> --clients 1000
+"""
+
+import argparse
+import asyncio
+import base64
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from autotradeweb.server import APP, User, db, trade, trading_session
+
+BENCHMARK_USERNAME = "__benchmark_asgi"
+BENCHMARK_PASSWORD = "password"
+
+SERVER_MODES = {"wsgi": [], "asgi": ["--asgi"]}
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--database", required=True, help="URI of the PostgreSQL database"
+    )
+    parser.add_argument("--port", type=int, default=8090, help="Port of the servers")
+    parser.add_argument(
+        "--mode",
+        choices=sorted(SERVER_MODES),
+        action="append",
+        help="Server to benchmark, may be repeated (default: all)",
+    )
+    parser.add_argument(
+        "--clients", type=int, default=1000, help="Number of concurrent clients"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=20, help="Requests sent by each client"
+    )
+    parser.add_argument(
+        "--trades", type=int, default=1000, help="Trades of the benchmark user"
+    )
+    parser.add_argument("--limit", type=int, default=10, help="Trades per page")
+    parser.add_argument(
+        "--threads", type=int, default=10, help="Threads of the WSGI server"
+    )
+    parser.add_argument(
+        "--pool-size", type=int, default=10, help="Database connections per server"
+    )
+    return parser
+
+
+def add_benchmark_user(num_trades: int):
+    db.session.add(User(username=BENCHMARK_USERNAME, password=BENCHMARK_PASSWORD))
+    session = trading_session(
+        username=BENCHMARK_USERNAME,
+        ticker="AAPL",
+        start_time=datetime(2020, 1, 1),
+        num_trades=num_trades,
+    )
+    db.session.add(session)
+    db.session.flush()
+    db.session.bulk_insert_mappings(
+        trade,
+        [
+            {
+                "session_id": session.session_id,
+                "trade_type": "BUY",
+                "price": 1.0,
+                "volume": 1,
+                "time_stamp": datetime(2020, 1, 1) + timedelta(minutes=minute),
+            }
+            for minute in range(num_trades)
+        ],
+    )
+    db.session.commit()
+
+
+def remove_benchmark_user():
+    db.session.rollback()
+    session_ids = db.session.query(trading_session.session_id).filter(
+        trading_session.username == BENCHMARK_USERNAME
+    )
+    db.session.query(trade).filter(trade.session_id.in_(session_ids.subquery())).delete(
+        synchronize_session=False
+    )
+    session_ids.delete(synchronize_session=False)
+    db.session.query(User).filter(User.username == BENCHMARK_USERNAME).delete()
+    db.session.commit()
+
+
+def start_server(args, mode: str, log_dir: str) -> subprocess.Popen:
+    """Start a server subprocess and wait for it to accept connections"""
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "autotradeweb",
+            "--database",
+            args.database,
+            "--port",
+            str(args.port),
+            "--disable-https",
+            "--log-dir",
+            log_dir,
+            "--threads",
+            str(args.threads),
+            "--request-queue-size",
+            str(args.clients),
+            "--pool-size",
+            str(args.pool_size),
+            "--max-overflow",
+            "0",
+        ]
+        + SERVER_MODES[mode]
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"{mode} server exited with {server.returncode}")
+        try:
+            socket.create_connection(("localhost", args.port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+async def run_client(port: int, request: bytes, num_requests: int, latencies: list):
+    """Send ``num_requests`` requests over one keep-alive connection
+
+    :return: the number of failed requests
+    """
+    reader, writer = await asyncio.open_connection("localhost", port)
+    failures = 0
+    try:
+        for _ in range(num_requests):
+            start = time.perf_counter()
+            writer.write(request)
+            status_line = await reader.readline()
+            content_length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    content_length = int(value)
+            await reader.readexactly(content_length)
+            latencies.append(time.perf_counter() - start)
+            if b" 200 " not in status_line:
+                failures += 1
+    finally:
+        writer.close()
+    return failures
+
+
+async def run_clients(args) -> tuple:
+    credentials = base64.b64encode(
+        f"{BENCHMARK_USERNAME}:{BENCHMARK_PASSWORD}".encode("utf-8")
+    ).decode("ascii")
+    request = (
+        f"GET /trades/?limit={args.limit} HTTP/1.1\r\n"
+        f"Host: localhost:{args.port}\r\n"
+        f"Authorization: Basic {credentials}\r\n"
+        # flask-simplelogin only checks basic credentials of JSON requests
+        "Content-Type: application/json\r\n\r\n"
+    ).encode("ascii")
+    latencies = []
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[
+            run_client(args.port, request, args.requests, latencies)
+            for _ in range(args.clients)
+        ],
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+    failures = sum(
+        result if isinstance(result, int) else args.requests for result in results
+    )
+    return elapsed, sorted(latencies), failures
+
+
+def main(argv=sys.argv[1:]) -> int:
+    args = get_parser().parse_args(argv)
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(
+        resource.RLIMIT_NOFILE,
+        (max(soft_limit, min(args.clients * 2, hard_limit)), hard_limit),
+    )
+    APP.config["SQLALCHEMY_DATABASE_URI"] = args.database
+    db.create_all()
+    remove_benchmark_user()
+    try:
+        add_benchmark_user(args.trades)
+        print(
+            f"{args.clients} concurrent clients x {args.requests} requests of "
+            f"GET /trades/?limit={args.limit}"
+        )
+        with tempfile.TemporaryDirectory() as log_dir:
+            for mode in args.mode or sorted(SERVER_MODES, reverse=True):
+                server = start_server(args, mode, log_dir)
+                try:
+                    elapsed, latencies, failures = asyncio.run(run_clients(args))
+                finally:
+                    server.terminate()
+                    server.wait()
+                completed = len(latencies)
+                print(
+                    f"\n{mode}: {completed / elapsed:.0f} requests/s, "
+                    f"{failures} failed of {args.clients * args.requests}"
+                )
+                if latencies:
+                    print(
+                        f"latency p50: {latencies[completed // 2] * 1000:.1f} ms, "
+                        f"p99: {latencies[int(completed * 0.99)] * 1000:.1f} ms"
+                    )
+    finally:
+        remove_benchmark_user()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
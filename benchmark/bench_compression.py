@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark the response size and compression CPU cost of the largest API
+and dashboard responses
+
+A benchmark user with a trading session of trades and a benchmark stock of
+synthetic minute ticks are added, the uncompressed response of each endpoint
+is fetched from the flask app, and each response is then compressed with
+every available encoding the way :class:`autotradeweb.compression.CompressionMiddleware`
+compresses it. The benchmark data is removed again afterwards.
+
+.. code-block:: console
+
+    python benchmark/bench_compression.py --database <DATABASE_URI> --trades 10000
+"""
+
+import argparse
+import base64
+import sys
+import time
+from datetime import timedelta
+
+from autotradeweb.compression import (
+    DEFAULT_BROTLI_QUALITY,
+    DEFAULT_GZIP_LEVEL,
+    CompressionMiddleware,
+    get_encodings,
+)
+from autotradeweb.server import (
+    APP,
+    build_stock_timeline_figure,
+    db,
+    stock_data,
+)
+from autotradeweb.timeseries import TimeRange, get_num_buckets
+from bench_asgi import (
+    BENCHMARK_PASSWORD,
+    BENCHMARK_USERNAME,
+    add_benchmark_user,
+    remove_benchmark_user,
+)
+from bench_figure_payload import encode_figure
+from bench_time_range import BENCHMARK_START, BENCHMARK_STOCK_PREFIX, add_ticks
+
+API_URLS = [
+    "/trades/",
+    "/trades/?limit=100",
+    "/trades_sessions/",
+    "/account/summary?recent_trades=100",
+    "/_dash-layout",
+]
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--database", required=True, help="URI of the database")
+    parser.add_argument(
+        "--trades", type=int, default=10000, help="Trades of the benchmark user"
+    )
+    parser.add_argument(
+        "--days", type=int, default=30, help="Days of minute ticks to graph"
+    )
+    parser.add_argument(
+        "--graph-width", type=int, default=1000, help="Graph width in pixels"
+    )
+    parser.add_argument(
+        "--level", type=int, default=DEFAULT_GZIP_LEVEL, help="gzip level"
+    )
+    parser.add_argument(
+        "--brotli-quality",
+        type=int,
+        default=DEFAULT_BROTLI_QUALITY,
+        help="brotli quality",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Timed repetitions of each encoding"
+    )
+    return parser
+
+
+def get_payloads(args) -> list:
+    """Get the uncompressed ``(endpoint, payload)`` responses to compress"""
+    credentials = base64.b64encode(
+        f"{BENCHMARK_USERNAME}:{BENCHMARK_PASSWORD}".encode("utf-8")
+    ).decode("ascii")
+    payloads = []
+    with APP.test_client() as client:
+        for url in API_URLS:
+            resp = client.get(
+                url,
+                headers={
+                    "Authorization": f"Basic {credentials}",
+                    # flask-simplelogin only checks basic credentials of JSON requests
+                    "Content-Type": "application/json",
+                },
+            )
+            if resp.status_code != 200:
+                raise RuntimeError(f"GET {url} responded {resp.status_code}")
+            payloads.append((f"GET {url}", resp.data))
+    figure = build_stock_timeline_figure(
+        f"{BENCHMARK_STOCK_PREFIX}0",
+        TimeRange(BENCHMARK_START, BENCHMARK_START + timedelta(days=args.days)),
+        None,
+        get_num_buckets(args.graph_width),
+    ).figure
+    payloads.append(
+        ("POST /_dash-update-component (figure)", encode_figure(figure).encode())
+    )
+    return payloads
+
+
+def time_compress(middleware, payload: bytes, encoding: str, repeat: int):
+    """Get the compressed size and the best CPU seconds of compressing"""
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        compressed = middleware.compress(payload, encoding)
+        timings.append(time.process_time() - start)
+    return len(compressed), min(timings)
+
+
+def main(argv=sys.argv[1:]) -> int:
+    args = get_parser().parse_args(argv)
+    APP.config["SQLALCHEMY_DATABASE_URI"] = args.database
+    db.create_all()
+    remove_benchmark_user()
+    middleware = CompressionMiddleware(
+        None, level=args.level, brotli_quality=args.brotli_quality
+    )
+    try:
+        add_benchmark_user(args.trades)
+        add_ticks([f"{BENCHMARK_STOCK_PREFIX}0"], args.days)
+        print(
+            f"{args.trades} trades, {args.days} days of minute ticks, "
+            f"gzip level {args.level}, brotli quality {args.brotli_quality}"
+        )
+        for endpoint, payload in get_payloads(args):
+            print(f"\n{endpoint}: {len(payload)} bytes")
+            for encoding in get_encodings():
+                size, cpu_time = time_compress(
+                    middleware, payload, encoding, args.repeat
+                )
+                print(
+                    f"  {encoding}: {size} bytes ({size / len(payload):.1%}), "
+                    f"{cpu_time * 1000:.2f} ms CPU"
+                )
+    finally:
+        remove_benchmark_user()
+        db.session.query(stock_data).filter(
+            stock_data.stock_name.like(f"{BENCHMARK_STOCK_PREFIX}%")
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark the payload size and callback time of the dashboard stock
+timeline figure over a large range
+
+Synthetic minute ticks are added for a benchmark stock, the figure of the
+whole range is built and JSON encoded the way Dash encodes callback
+responses, and the benchmark stock is removed again afterwards. The legacy
+figure encoding (string prices and ``datetime`` time stamps) of the same
+points is measured alongside for comparison.
+
+.. code-block:: console
+
+    python benchmark/bench_figure_payload.py --database <DATABASE_URI> --days 365
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+import plotly
+
+from autotradeweb.server import (
+    APP,
+    build_stock_timeline_figure,
+    db,
+    stock_data,
+)
+from autotradeweb.timeseries import TimeRange, get_num_buckets
+from bench_time_range import BENCHMARK_START, BENCHMARK_STOCK_PREFIX, add_ticks
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--database", required=True, help="URI of the database")
+    parser.add_argument(
+        "--days", type=int, default=365, help="Days of minute ticks to graph"
+    )
+    parser.add_argument(
+        "--graph-width", type=int, default=1000, help="Graph width in pixels"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Timed repetitions of the callback"
+    )
+    return parser
+
+
+def encode_figure(figure) -> str:
+    """JSON encode a figure the way Dash encodes a callback response"""
+    return json.dumps(
+        {"response": {"stock-value-timeline-graph": {"figure": figure}}},
+        cls=plotly.utils.PlotlyJSONEncoder,
+    )
+
+
+def to_legacy_figure(figure) -> dict:
+    """Get a figure with the legacy string prices and ``datetime`` time stamps"""
+    return dict(
+        figure,
+        data=[
+            dict(
+                trace,
+                y=[str(value) for value in trace["y"]],
+                x=[datetime.fromisoformat(value) for value in trace["x"]],
+            )
+            for trace in figure["data"]
+        ],
+    )
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def main(argv=sys.argv[1:]) -> int:
+    args = get_parser().parse_args(argv)
+    APP.config["SQLALCHEMY_DATABASE_URI"] = args.database
+    stock_data.__table__.create(bind=db.engine, checkfirst=True)
+    stock_name = f"{BENCHMARK_STOCK_PREFIX}0"
+    try:
+        add_ticks([stock_name], args.days)
+        time_range = TimeRange(
+            BENCHMARK_START, BENCHMARK_START + timedelta(days=args.days)
+        )
+        num_buckets = get_num_buckets(args.graph_width)
+        timeline, build_time = time_call(
+            lambda: build_stock_timeline_figure(
+                stock_name, time_range, None, num_buckets
+            ),
+            args.repeat,
+        )
+        figure = timeline.figure
+        print(
+            f"stock timeline figure of {args.days * 24 * 60} ticks "
+            f"({len(figure['data'][0]['x'])} points after downsampling)"
+        )
+        print(f"\nbuild: {build_time * 1000:.1f} ms (best of {args.repeat})")
+        for name, encoded_figure in [
+            ("numeric", figure),
+            ("legacy", to_legacy_figure(figure)),
+        ]:
+            payload, encode_time = time_call(
+                lambda: encode_figure(encoded_figure), args.repeat
+            )
+            print(
+                f"{name} encode: {encode_time * 1000:.1f} ms, "
+                f"payload: {len(payload.encode('utf-8'))} bytes"
+            )
+    finally:
+        db.session.rollback()
+        db.session.query(stock_data).filter(
+            stock_data.stock_name.like(f"{BENCHMARK_STOCK_PREFIX}%")
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
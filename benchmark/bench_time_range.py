@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmark the ``date()`` wrapped and half-open time range predicates of
+the dashboard ``stock_data`` reads
+
+Synthetic minute ticks are added for a number of benchmark stocks, a 30 day
+window of one of them is read with both predicates, and the benchmark stocks
+are removed again afterwards.
+
+.. code-block:: console
+
+    python benchmark/bench_time_range.py --database <DATABASE_URI> --days 365
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from autotradeweb.server import APP, db, query_stock_ticks, stock_data
+from autotradeweb.timeseries import TimeRange
+
+BENCHMARK_STOCK_PREFIX = "__BENCHMARK_"
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN`` of a SQLAlchemy statement"""
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kwargs):
+    if compiler.dialect.name == "postgresql":
+        return f"EXPLAIN {compiler.process(element.statement, **kwargs)}"
+    return f"EXPLAIN QUERY PLAN {compiler.process(element.statement, **kwargs)}"
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--database", required=True, help="URI of the database")
+    parser.add_argument("--stocks", type=int, default=5, help="Number of stocks")
+    parser.add_argument(
+        "--days", type=int, default=365, help="Days of minute ticks per stock"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Timed repetitions per predicate"
+    )
+    return parser
+
+
+BENCHMARK_START = datetime(2020, 1, 1)
+
+
+def add_ticks(stock_names, days):
+    start = BENCHMARK_START
+    for stock_name in stock_names:
+        for day in range(days):
+            db.session.execute(
+                stock_data.__table__.insert(),
+                [
+                    {
+                        "stock_name": stock_name,
+                        "time_stamp": start + timedelta(days=day, minutes=minute),
+                        "open": 100.0 + minute % 60,
+                        "high": 101.0,
+                        "low": 99.0,
+                        "close": 100.0,
+                        "volume": 1,
+                    }
+                    for minute in range(24 * 60)
+                ],
+            )
+        db.session.commit()
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("ANALYZE stock_data"))
+        db.session.commit()
+
+
+def time_query(query, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        num_rows = len(query.all())
+        timings.append(time.perf_counter() - start)
+    return num_rows, min(timings)
+
+
+def main(argv=sys.argv[1:]) -> int:
+    args = get_parser().parse_args(argv)
+    APP.config["SQLALCHEMY_DATABASE_URI"] = args.database
+    stock_data.__table__.create(bind=db.engine, checkfirst=True)
+    stock_names = [f"{BENCHMARK_STOCK_PREFIX}{i}" for i in range(args.stocks)]
+    try:
+        add_ticks(stock_names, args.days)
+        # the last 30 days of the benchmark ticks
+        end_date = BENCHMARK_START + timedelta(days=args.days - 1)
+        start_date = max(BENCHMARK_START, end_date - timedelta(days=29))
+        start_date, end_date = (
+            start_date.date().isoformat(),
+            end_date.date().isoformat(),
+        )
+        date_query = db.session.query(stock_data.time_stamp, stock_data.open).filter(
+            stock_data.stock_name == stock_names[0],
+            func.date(stock_data.time_stamp) >= start_date,
+            func.date(stock_data.time_stamp) <= end_date,
+        )
+        range_query = query_stock_ticks(
+            stock_names[0],
+            TimeRange.from_date_picker(start_date, end_date),
+            stock_data.time_stamp,
+            stock_data.open,
+        )
+        print(
+            f"stock_data benchmark rows: {args.stocks * args.days * 24 * 60} "
+            f"({db.engine.dialect.name})"
+        )
+        for name, query in [("date()", date_query), ("half-open range", range_query)]:
+            num_rows, best = time_query(query, args.repeat)
+            plan = db.session.execute(Explain(query.statement)).fetchall()
+            print(
+                f"\n{name}: {num_rows} rows in {best * 1000:.1f} ms (best of {args.repeat})"
+            )
+            print("\n".join(f"    {row[-1]}" for row in plan))
+    finally:
+        db.session.rollback()
+        db.session.query(stock_data).filter(
+            stock_data.stock_name.like(f"{BENCHMARK_STOCK_PREFIX}%")
+        ).delete(synchronize_session=False)
+        db.session.commit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -96,12 +96,22 @@ setup(
         "psycopg2-binary>=2.8.4,<3.0.0",
         "graypy>=2.1.0,<3.0.0",
         "dash-dangerously-set-inner-html>=0.0.2,<1.0.0",
+        "numpy>=1.16.0,<2.0.0",
     ],
+    extras_require={
+        "asgi": [
+            "starlette>=0.27.0,<0.28.0",
+            "uvicorn>=0.22.0,<1.0.0",
+            "asyncpg>=0.27.0,<1.0.0",
+        ],
+        "brotli": ["brotli>=1.0.0,<2.0.0"],
+    },
     tests_require=[
         "pytest>=4.1.0,<5.0.0",
         "pytest-cov>=2.6.1,<3.0.0",
         "pylint>=2.2.2,<3.0.0",
         "beautifulsoup4>=4.8.2,<5.0.0",
+        "httpx>=0.24.0,<1.0.0",
         # "dash[testing]>=1.9.1,<2.0.0",
     ],
     entry_points={"console_scripts": ["autotradeweb = autotradeweb.__main__:main"]},
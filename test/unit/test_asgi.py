@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.asgi`"""
+
+import asyncio
+import base64
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("asyncpg")
+pytest.importorskip("httpx")
+
+from starlette.testclient import TestClient
+
+from autotradeweb.asgi import (
+    SESSIONS,
+    compile_statement,
+    create_app,
+    get_asyncpg_dsn,
+    iter_event_stream,
+)
+from autotradeweb.events import (
+    BROKER,
+    KEEPALIVE_MESSAGE,
+    RETRY_MESSAGE,
+    EventSubscription,
+    format_event,
+    start_event_listener,
+)
+from autotradeweb.server import (
+    APP,
+    READ_YOUR_WRITES_WINDOW,
+    User,
+    db,
+    trade,
+    trading_session,
+)
+
+APP.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("TEST_DATABASE_URI")
+
+BASIC_AUTH = {
+    "Authorization": "Basic " + base64.b64encode(b"asgi_user:password").decode("ascii")
+}
+
+
+def clear_user_related_db_entities():
+    db.session.query(trade).delete()
+    db.session.query(trading_session).delete()
+    db.session.query(User).delete()
+    db.session.commit()
+
+
+@pytest.fixture(scope="module")
+def client():
+    """init the ASGI app as a testing client with a test user"""
+    db.create_all()
+    clear_user_related_db_entities()
+    db.session.add(User(username="asgi_user", password="password"))
+    db.session.commit()
+    with TestClient(create_app(os.getenv("TEST_DATABASE_URI"))) as c:
+        yield c
+    clear_user_related_db_entities()
+
+
+@pytest.fixture
+def session_id(client):
+    resp = client.post(
+        "/trades_sessions/",
+        json={"ticker": "AAPL", "start_time": "2020-01-01T00:00:00"},
+        headers=BASIC_AUTH,
+    )
+    assert resp.status_code == 201
+    return resp.json()["session_id"]
+
+
+def test_compile_statement():
+    sql, params = compile_statement(
+        SESSIONS.insert()
+        .values(username="user", ticker="AAPL")
+        .returning(SESSIONS.c.session_id)
+    )
+    assert sql.startswith("INSERT INTO trading_session (username, ticker, num_trades")
+    assert "$11" in sql and "%s" not in sql
+    assert params[:4] == ["user", "AAPL", 0, False]
+
+
+def test_compile_statement_literal_percent():
+    sql, params = compile_statement(
+        SESSIONS.select().where(SESSIONS.c.ticker.like("A%"))
+    )
+    assert sql.endswith("trading_session.ticker LIKE $1")
+    assert params == ["A%"]
+
+
+def test_get_asyncpg_dsn():
+    assert (
+        get_asyncpg_dsn("postgresql+psycopg2://user:pw@localhost/db")
+        == "postgresql://user:pw@localhost/db"
+    )
+    with pytest.raises(ValueError):
+        get_asyncpg_dsn("sqlite:///autotradeweb.db")
+
+
+def test_unauthorized(client):
+    assert client.get("/trades/").status_code == 401
+    resp = client.get(
+        "/trades/",
+        headers={"Authorization": "Basic " + base64.b64encode(b"a:b").decode()},
+    )
+    assert resp.status_code == 401
+    assert resp.headers["WWW-Authenticate"].startswith("Basic")
+    resp = client.get("/trades/", headers={"Authorization": "Bearer invalid"})
+    assert resp.status_code == 401
+
+
+def test_trading_session(client, session_id):
+    resp = client.get(f"/trades_sessions/{session_id}", headers=BASIC_AUTH)
+    assert resp.status_code == 200
+    assert resp.json()["ticker"] == "AAPL"
+    assert resp.json()["start_time"] == "2020-01-01T00:00:00"
+    assert resp.json()["is_paused"] is False
+
+    resp = client.post(f"/trades_sessions/{session_id}/pause", headers=BASIC_AUTH)
+    assert resp.json()["is_paused"] is True
+    resp = client.post(f"/trades_sessions/{session_id}/start", headers=BASIC_AUTH)
+    assert resp.json()["is_paused"] is False
+    resp = client.post(f"/trades_sessions/{session_id}/finish", headers=BASIC_AUTH)
+    assert resp.json()["is_finished"] is True
+
+
+def test_trading_session_not_found(client):
+    resp = client.get("/trades_sessions/0", headers=BASIC_AUTH)
+    assert resp.status_code == 404
+    assert resp.json() == {"message": "trading session not found"}
+    resp = client.post("/trades_sessions/0/pause", headers=BASIC_AUTH)
+    assert resp.status_code == 404
+
+
+def test_trade(client, session_id):
+    new_trade = {
+        "session_id": session_id,
+        "trade_type": "BUY",
+        "price": 2.5,
+        "volume": 4,
+        "time_stamp": "2020-01-01T00:00:00",
+    }
+    resp = client.post("/trades/", json=new_trade, headers=BASIC_AUTH)
+    assert resp.status_code == 201
+    trade_id = resp.json()["trade_id"]
+    assert resp.json() == dict(new_trade, trade_id=trade_id)
+
+    resp = client.get(f"/trades/{trade_id}", headers=BASIC_AUTH)
+    assert resp.status_code == 200
+    assert resp.json()["price"] == 2.5
+
+    resp = client.get(f"/trades_sessions/{session_id}", headers=BASIC_AUTH)
+    assert resp.json()["num_trades"] == 1
+    assert resp.json()["buy_volume"] == 4
+    assert resp.json()["buy_notional"] == 10.0
+
+
+def test_trade_invalid(client, session_id):
+    new_trade = {
+        "session_id": session_id,
+        "trade_type": "HOLD",
+        "price": 2.5,
+        "volume": 4,
+        "time_stamp": "2020-01-01T00:00:00",
+    }
+    resp = client.post("/trades/", json=new_trade, headers=BASIC_AUTH)
+    assert resp.status_code == 400
+    new_trade["trade_type"] = "SELL"
+    new_trade["time_stamp"] = "yesterday"
+    resp = client.post("/trades/", json=new_trade, headers=BASIC_AUTH)
+    assert resp.status_code == 400
+
+
+def test_trade_paused_session(client, session_id):
+    client.post(f"/trades_sessions/{session_id}/pause", headers=BASIC_AUTH)
+    new_trade = {
+        "session_id": session_id,
+        "trade_type": "SELL",
+        "price": 2.5,
+        "volume": 4,
+        "time_stamp": "2020-01-01T00:00:00",
+    }
+    resp = client.post("/trades/", json=new_trade, headers=BASIC_AUTH)
+    assert resp.status_code == 404
+    resp = client.get(f"/trades_sessions/{session_id}", headers=BASIC_AUTH)
+    assert resp.json()["num_trades"] == 0
+
+
+def test_trade_not_found(client):
+    resp = client.get("/trades/0", headers=BASIC_AUTH)
+    assert resp.status_code == 404
+    assert resp.json() == {"message": "trade not found"}
+
+
+def test_list_trades_paginated(client, session_id):
+    for minute in range(3):
+        resp = client.post(
+            "/trades/",
+            json={
+                "session_id": session_id,
+                "trade_type": "SELL",
+                "price": 1.0,
+                "volume": 1,
+                "time_stamp": f"2021-01-01T00:0{minute}:00",
+            },
+            headers=BASIC_AUTH,
+        )
+        assert resp.status_code == 201
+    all_trades = client.get("/trades/", headers=BASIC_AUTH).json()
+    resp = client.get("/trades/?limit=2", headers=BASIC_AUTH)
+    assert resp.status_code == 200
+    assert resp.json() == all_trades[:2]
+    next_url = resp.headers["Link"].split(">")[0].lstrip("<")
+    assert next_url.startswith("http://testserver/trades/?limit=2&after=")
+    resp = client.get(next_url, headers=BASIC_AUTH)
+    assert resp.json() == all_trades[2:4]
+
+    resp = client.get("/trades/?limit=0", headers=BASIC_AUTH)
+    assert resp.status_code == 400
+
+
+def test_list_trading_sessions(client, session_id):
+    resp = client.get("/trades_sessions/", headers=BASIC_AUTH)
+    assert resp.status_code == 200
+    assert session_id in [session["session_id"] for session in resp.json()]
+
+
+def test_user(client):
+    resp = client.get("/user/", headers=BASIC_AUTH)
+    assert resp.status_code == 200
+    assert resp.json()["username"] == "asgi_user"
+
+
+def test_not_modified(client, session_id):
+    resp = client.get("/trades_sessions/", headers=BASIC_AUTH)
+    etag = resp.headers["ETag"]
+    resp = client.get(
+        "/trades_sessions/", headers=dict(BASIC_AUTH, **{"If-None-Match": etag})
+    )
+    assert resp.status_code == 304
+    assert resp.content == b""
+
+    client.post(f"/trades_sessions/{session_id}/pause", headers=BASIC_AUTH)
+    resp = client.get(
+        "/trades_sessions/", headers=dict(BASIC_AUTH, **{"If-None-Match": etag})
+    )
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_read_replica(client, session_id):
+    database_uri = os.getenv("TEST_DATABASE_URI")
+    app = create_app(database_uri, pool_timeout=5, read_database_uri=database_uri)
+    with TestClient(app) as read_client:
+        read_pool = app.state.read_pool
+        assert read_pool is not app.state.pool
+        reads = []
+
+        class RecordingPool:
+            def acquire(self, **kwargs):
+                reads.append(kwargs)
+                return read_pool.acquire(**kwargs)
+
+        app.state.read_pool = RecordingPool()
+        try:
+            # right after creating the trading session its reads are pinned to
+            # the primary
+            resp = read_client.get("/trades_sessions/", headers=BASIC_AUTH)
+            assert resp.status_code == 200
+            assert reads == []
+
+            db.session.query(User).filter(User.username == "asgi_user").update(
+                {User.modified_at: datetime.utcnow() - READ_YOUR_WRITES_WINDOW}
+            )
+            db.session.commit()
+            resp = read_client.get(f"/trades_sessions/{session_id}", headers=BASIC_AUTH)
+            assert resp.status_code == 200
+            assert resp.json()["session_id"] == session_id
+            assert reads == [{"timeout": 5}]
+        finally:
+            app.state.read_pool = read_pool
+
+
+def test_bearer_token(client):
+    resp = client.post("/auth/token", headers=BASIC_AUTH)
+    assert resp.status_code == 201
+    assert resp.json()["token_type"] == "Bearer"
+    token_auth = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    resp = client.get("/user/", headers=token_auth)
+    assert resp.status_code == 200
+    assert resp.json()["username"] == "asgi_user"
+
+
+def test_wsgi_fallthrough(client):
+    resp = client.get("/register")
+    assert resp.status_code == 200
+    resp = client.get("/statistics/", headers=BASIC_AUTH)
+    assert resp.status_code == 200
+
+
+def test_iter_event_stream():
+    async def read_stream():
+        stream = iter_event_stream("asgi_user", keepalive=0.01)
+        messages = [await stream.__anext__(), await stream.__anext__()]
+        BROKER.publish("asgi_user", "trade", {"trade_id": 1})
+        await asyncio.sleep(0)
+        messages.append(await stream.__anext__())
+        await stream.aclose()
+        return messages
+
+    assert asyncio.run(read_stream()) == [
+        RETRY_MESSAGE,
+        KEEPALIVE_MESSAGE,
+        format_event("trade", {"trade_id": 1}),
+    ]
+    assert "asgi_user" not in BROKER._subscribers
+
+
+def test_event_stream_unauthorized(client):
+    assert client.get("/events/").status_code == 401
+
+
+def test_trading_session_event(client, session_id):
+    start_event_listener(os.getenv("TEST_DATABASE_URI"))
+    subscription = EventSubscription("asgi_user")
+    try:
+        client.post(f"/trades_sessions/{session_id}/pause", headers=BASIC_AUTH)
+        event, data = subscription.events.get(timeout=5)
+        assert event == "trading_session"
+        assert data["session_id"] == session_id
+        assert data["is_paused"] is True
+    finally:
+        subscription.close()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.assets`"""
+
+import gzip
+
+import pytest
+from flask import Flask
+
+from autotradeweb.assets import IMMUTABLE_CACHE_CONTROL, StaticAssets
+
+STYLESHEET = b"body { color: black; }\n" * 100
+
+
+@pytest.fixture
+def static_assets(tmpdir):
+    tmpdir.join("stylesheet.css").write_binary(STYLESHEET)
+    tmpdir.mkdir("js").join("app.js").write_binary(b"var a;")
+    tmpdir.join(".DS_Store").write_binary(b"")
+    return StaticAssets(str(tmpdir))
+
+
+def test_url_path(static_assets):
+    path = static_assets.url_path("stylesheet.css")
+    assert path.startswith("stylesheet.") and path.endswith(".css")
+    assert path != "stylesheet.css"
+    assert static_assets.url_path("js/app.js").startswith("js/app.")
+    assert static_assets.url_path(".DS_Store") == ".DS_Store"
+    assert static_assets.url_path("nonsuch.css") == "nonsuch.css"
+
+
+def test_fingerprint_changes_with_content(static_assets, tmpdir):
+    path = static_assets.url_path("stylesheet.css")
+    tmpdir.join("stylesheet.css").write_binary(STYLESHEET + b"a {}")
+    assert StaticAssets(str(tmpdir)).url_path("stylesheet.css") != path
+
+
+def test_get_response(static_assets):
+    path = static_assets.url_path("stylesheet.css")
+    with Flask(__name__).test_request_context():
+        response = static_assets.get_response(path, "gzip")
+        assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.mimetype == "text/css"
+        assert gzip.decompress(response.get_data()) == STYLESHEET
+
+        response = static_assets.get_response(path, "")
+        assert "Content-Encoding" not in response.headers
+        assert response.get_data() == STYLESHEET
+
+        # too small to be smaller compressed
+        response = static_assets.get_response(
+            static_assets.url_path("js/app.js"), "gzip"
+        )
+        assert "Content-Encoding" not in response.headers
+
+        assert static_assets.get_response("stylesheet.css", "gzip") is None
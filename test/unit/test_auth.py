@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.auth`"""
+
+import pytest
+from flask import Flask
+
+from autotradeweb.auth import (
+    create_api_token,
+    get_bearer_token,
+    get_credential_key,
+    load_api_token,
+)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.secret_key = "foo"
+    with app.test_request_context():
+        yield app
+
+
+def test_api_token(app):
+    token = create_api_token("foo")
+    assert load_api_token(token) == "foo"
+
+
+def test_api_token_expired(app):
+    token = create_api_token("foo")
+    assert load_api_token(token, max_age=-1) is None
+
+
+def test_api_token_tampered(app):
+    token = create_api_token("foo")
+    # the last character may only hold base64 padding bits, so tamper
+    # with one before it
+    tampered = token[:-2] + ("A" if token[-2] != "A" else "B") + token[-1]
+    assert load_api_token(tampered) is None
+    assert load_api_token("nonsuch") is None
+
+
+def test_api_token_other_secret_key(app):
+    token = create_api_token("foo")
+    app.secret_key = "bar"
+    assert load_api_token(token) is None
+
+
+@pytest.mark.parametrize(
+    "authorization, expected",
+    [
+        ("Bearer foo", "foo"),
+        ("bearer foo", "foo"),
+        ("Basic Zm9vOmJhcg==", None),
+        ("Bearer ", None),
+        ("", None),
+    ],
+)
+def test_get_bearer_token(authorization, expected):
+    app = Flask(__name__)
+    with app.test_request_context(headers={"Authorization": authorization}):
+        assert get_bearer_token() == expected
+
+
+def test_get_credential_key():
+    key = get_credential_key("foo", "bar")
+    assert key[0] == "foo"
+    assert "bar" not in key[1]
+    assert key == get_credential_key("foo", "bar")
+    assert key != get_credential_key("foo", "baz")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.cache`"""
+
+from autotradeweb.cache import LRUCache, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache():
+    clock = FakeClock()
+    loads = []
+
+    def loader():
+        loads.append(clock.now)
+        return len(loads)
+
+    cache = TTLCache(loader, 10, clock=clock)
+    assert cache.get() == 1
+    clock.now = 9.0
+    assert cache.get() == 1
+    clock.now = 10.0
+    assert cache.get() == 2
+    assert loads == [0.0, 10.0]
+
+
+def test_ttl_cache_invalidate():
+    loads = []
+    cache = TTLCache(lambda: loads.append(None) or len(loads), 60, clock=FakeClock())
+    assert cache.get() == 1
+    cache.invalidate()
+    assert cache.get() == 2
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    # "b" is the least recently used entry
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert cache.stats() == {
+        "size": 2,
+        "maxsize": 2,
+        "hits": 2,
+        "misses": 2,
+        "evictions": 1,
+        "invalidations": 0,
+    }
+
+
+def test_lru_cache_invalidate():
+    cache = LRUCache(10)
+    cache.put(("foo", 1), 1)
+    cache.put(("foo", 2), 2)
+    cache.put(("bar", 1), 3)
+    assert cache.invalidate(lambda key: key[0] == "foo") == 2
+    assert cache.get(("foo", 1)) is None
+    assert cache.get(("bar", 1)) == 3
+    assert cache.stats()["invalidations"] == 2
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.compression`"""
+
+import gzip
+
+import pytest
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from autotradeweb import compression
+from autotradeweb.compression import CompressionMiddleware
+
+BODY = b'{"trades": []}' * 100
+
+
+def make_client(response, **kwargs) -> Client:
+    return Client(CompressionMiddleware(response, **kwargs), Response)
+
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip", "gzip"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("*", "br"),
+        ("gzip;q=0, identity", None),
+        ("", None),
+    ],
+)
+def test_get_encoding(accept_encoding, expected):
+    pytest.importorskip("brotli")
+    assert CompressionMiddleware(None).get_encoding(accept_encoding) == expected
+
+
+def test_get_encoding_no_brotli(no_brotli):
+    assert CompressionMiddleware(None).get_encoding("br, gzip") == "gzip"
+    assert CompressionMiddleware(None).get_encoding("br") is None
+
+
+def test_gzip(no_brotli):
+    client = make_client(Response(BODY, mimetype="application/json"))
+    resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["Vary"] == "Accept-Encoding"
+    assert int(resp.headers["Content-Length"]) < len(BODY)
+    assert gzip.decompress(resp.data) == BODY
+
+
+def test_brotli():
+    brotli = pytest.importorskip("brotli")
+    client = make_client(Response(BODY, mimetype="application/json"))
+    resp = client.get("/", headers={"Accept-Encoding": "gzip, br"})
+    assert resp.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(resp.data) == BODY
+
+
+def test_not_accepted():
+    client = make_client(Response(BODY, mimetype="application/json"))
+    resp = client.get("/")
+    assert "Content-Encoding" not in resp.headers
+    assert resp.headers["Vary"] == "Accept-Encoding"
+    assert resp.data == BODY
+
+
+def test_min_size():
+    client = make_client(
+        Response(BODY, mimetype="application/json"), min_size=len(BODY) + 1
+    )
+    resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    assert resp.data == BODY
+
+
+def test_not_compressible_mimetype():
+    client = make_client(Response(BODY, mimetype="image/png"))
+    resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    assert "Vary" not in resp.headers
+
+
+def test_streamed_response():
+    client = make_client(
+        Response(iter([BODY, BODY]), mimetype="text/plain", direct_passthrough=True)
+    )
+    resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    assert resp.data == BODY + BODY
+
+
+def test_strong_etag_weakened(no_brotli):
+    response = Response(BODY, mimetype="text/css")
+    response.set_etag("foo")
+    client = make_client(response)
+    resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["ETag"] == 'W/"foo"'
+
+
+def test_head_request():
+    client = make_client(Response(BODY, mimetype="application/json"))
+    resp = client.head("/", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    assert resp.headers["Content-Length"] == str(len(BODY))
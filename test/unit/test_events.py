@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.events`"""
+
+import json
+import os
+import queue
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import sessionmaker
+
+from autotradeweb.events import (
+    BROKER,
+    KEEPALIVE_MESSAGE,
+    RETRY_MESSAGE,
+    EventBroker,
+    EventSubscription,
+    format_event,
+    get_libpq_dsn,
+    iter_event_stream,
+    publish_event,
+    publish_events,
+    start_event_listener,
+)
+
+
+def test_format_event():
+    assert format_event("trade", {"trade_id": 1}) == (
+        'event: trade\ndata: {"trade_id": 1}\n\n'
+    )
+
+
+def test_get_libpq_dsn():
+    url = make_url("postgresql+psycopg2://user:pw@localhost/db")
+    assert get_libpq_dsn(url) == "postgresql://user:pw@localhost/db"
+    assert url.drivername == "postgresql+psycopg2"
+
+
+def test_broker():
+    broker = EventBroker()
+    received = []
+    callback = lambda event, data: received.append((event, data))
+    broker.subscribe("foo", callback)
+    broker.publish("foo", "trade", {"trade_id": 1})
+    broker.publish("bar", "trade", {"trade_id": 2})
+    broker.publish_message(
+        json.dumps({"username": "foo", "event": "trade", "data": {"trade_id": 3}})
+    )
+    broker.unsubscribe("foo", callback)
+    broker.publish("foo", "trade", {"trade_id": 4})
+    assert received == [("trade", {"trade_id": 1}), ("trade", {"trade_id": 3})]
+
+
+def test_subscription_overflow():
+    broker = EventBroker()
+    subscription = EventSubscription("foo", broker, maxsize=1)
+    broker.publish("foo", "trade", {"trade_id": 1})
+    assert not subscription.overflowed
+    broker.publish("foo", "trade", {"trade_id": 2})
+    assert subscription.overflowed
+    subscription.close()
+    assert subscription.events.get_nowait() == ("trade", {"trade_id": 1})
+    broker.publish("foo", "trade", {"trade_id": 3})
+    with pytest.raises(queue.Empty):
+        subscription.events.get_nowait()
+
+
+def test_iter_event_stream():
+    broker = EventBroker()
+    stream = iter_event_stream("foo", broker, keepalive=0.01)
+    assert next(stream) == RETRY_MESSAGE
+    assert next(stream) == KEEPALIVE_MESSAGE
+    broker.publish("foo", "trade", {"trade_id": 1})
+    assert next(stream) == format_event("trade", {"trade_id": 1})
+    stream.close()
+    assert not broker._subscribers
+
+
+@pytest.fixture
+def sqlite_session():
+    session = sessionmaker(bind=create_engine("sqlite://"))()
+    yield session
+    session.close()
+
+
+def subscribe(username):
+    received = []
+    callback = lambda event, data: received.append((event, data))
+    BROKER.subscribe(username, callback)
+    return received, callback
+
+
+def test_publish_event_on_commit(sqlite_session):
+    received, callback = subscribe("foo")
+    try:
+        publish_event(sqlite_session, "foo", "trade", {"trade_id": 1})
+        publish_events(sqlite_session, "foo", [("trade", {"trade_id": 2})])
+        assert received == []
+        sqlite_session.commit()
+        assert received == [("trade", {"trade_id": 1}), ("trade", {"trade_id": 2})]
+    finally:
+        BROKER.unsubscribe("foo", callback)
+
+
+def test_publish_event_rollback(sqlite_session):
+    received, callback = subscribe("foo")
+    try:
+        sqlite_session.execute("SELECT 1")
+        publish_event(sqlite_session, "foo", "trade", {"trade_id": 1})
+        sqlite_session.rollback()
+        sqlite_session.commit()
+        assert received == []
+    finally:
+        BROKER.unsubscribe("foo", callback)
+
+
+@pytest.mark.skipif(
+    not os.getenv("TEST_DATABASE_URI"), reason="requires a PostgreSQL test database"
+)
+def test_publish_event_notify():
+    database_uri = os.getenv("TEST_DATABASE_URI")
+    start_event_listener(database_uri)
+    subscription = EventSubscription("foo")
+    session = sessionmaker(bind=create_engine(database_uri))()
+    try:
+        publish_events(
+            session, "foo", [("trade", {"trade_id": 1}), ("trade", {"trade_id": 2})]
+        )
+        session.commit()
+        assert subscription.events.get(timeout=5) == ("trade", {"trade_id": 1})
+        assert subscription.events.get(timeout=5) == ("trade", {"trade_id": 2})
+    finally:
+        session.close()
+        subscription.close()
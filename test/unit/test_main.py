@@ -7,8 +7,22 @@ import argparse
 import logging
 
 import pytest
+from flask_sqlalchemy import get_state
 
-from autotradeweb.__main__ import get_parser, main, log_level
+from autotradeweb.__main__ import (
+    dispose_engines,
+    get_parser,
+    get_wsgi_app,
+    main,
+    make_server,
+    log_level,
+    serve_asgi,
+)
+from autotradeweb.compression import CompressionMiddleware
+from autotradeweb.metrics import MetricsMiddleware
+from autotradeweb.prefork import ReusePortWSGIServer
+from autotradeweb.routing import READ_BIND_KEY
+from autotradeweb.server import APP, db
 
 
 def test_get_parser():
@@ -37,3 +51,111 @@ def test_log_level_invalid():
 def test_main_missing_key_arg():
     with pytest.raises(SystemExit):
         main()
+
+
+def test_make_server():
+    args = get_parser().parse_args(
+        [
+            "--threads",
+            "4",
+            "--request-queue-size",
+            "64",
+            "--socket-timeout",
+            "30",
+            "--max-request-body-size",
+            "1024",
+        ]
+    )
+    server = make_server(args)
+    assert server.requests.min == 4
+    assert server.request_queue_size == 64
+    assert server.timeout == 30
+    assert server.max_request_body_size == 1024
+    assert server.max_request_header_size == 0
+
+
+def test_make_server_reuse_port():
+    args = get_parser().parse_args(["--workers", "2"])
+    assert isinstance(
+        make_server(args, server_class=ReusePortWSGIServer), ReusePortWSGIServer
+    )
+
+
+def test_dispose_engines(tmp_path):
+    APP.config["SQLALCHEMY_BINDS"] = {
+        READ_BIND_KEY: f"sqlite:///{tmp_path / 'replica.db'}"
+    }
+    try:
+        engines = [db.get_engine(APP), db.get_engine(APP, bind=READ_BIND_KEY)]
+        pools = [engine.pool for engine in engines]
+        dispose_engines()
+        # disposing replaces the pool of each engine
+        assert all(engine.pool is not pool for engine, pool in zip(engines, pools))
+    finally:
+        db.get_engine(APP, bind=READ_BIND_KEY).dispose()
+        get_state(APP).connectors.pop(READ_BIND_KEY)
+        APP.config["SQLALCHEMY_BINDS"] = None
+
+
+def test_get_wsgi_app():
+    args = get_parser().parse_args(
+        ["--compression-min-size", "1000", "--compression-level", "9"]
+    )
+    app = get_wsgi_app(args)
+    assert isinstance(app, MetricsMiddleware)
+    assert isinstance(app.app, CompressionMiddleware)
+    assert app.app.min_size == 1000
+    assert app.app.level == 9
+    args = get_parser().parse_args(["--disable-compression"])
+    assert not isinstance(get_wsgi_app(args).app, CompressionMiddleware)
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--threads", "0"],
+        ["--workers", "0"],
+        ["--compression-level", "10"],
+        ["--brotli-quality", "12"],
+    ],
+)
+def test_server_args_invalid(argv):
+    with pytest.raises(SystemExit):
+        get_parser().parse_args(argv)
+
+
+def test_main_asgi_workers():
+    with pytest.raises(SystemExit):
+        main(["--database", "postgresql://localhost/db", "--asgi", "--workers", "2"])
+
+
+def test_serve_asgi_pool_args(monkeypatch):
+    asgi = pytest.importorskip("autotradeweb.asgi")
+    uvicorn = pytest.importorskip("uvicorn")
+    create_app = asgi.create_app
+    create_app_kwargs = {}
+
+    def record_create_app(database_uri, **kwargs):
+        create_app_kwargs.update(kwargs)
+        return create_app(database_uri, **kwargs)
+
+    monkeypatch.setattr(asgi, "create_app", record_create_app)
+    monkeypatch.setattr(uvicorn, "run", lambda app, **kwargs: None)
+    parser = get_parser()
+    args = parser.parse_args(
+        [
+            "--database",
+            "postgresql://localhost/db",
+            "--read-database",
+            "postgresql://replica/db",
+            "--pool-timeout",
+            "5",
+            "--pool-recycle",
+            "-1",
+            "--asgi",
+        ]
+    )
+    assert serve_asgi(args, parser) == 0
+    assert create_app_kwargs["pool_timeout"] == 5
+    assert create_app_kwargs["pool_recycle"] == -1
+    assert create_app_kwargs["read_database_uri"] == "postgresql://replica/db"
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.metrics`"""
+
+import pytest
+from sqlalchemy import create_engine
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from autotradeweb.metrics import (
+    ENDPOINT_ENVIRON_KEY,
+    QUERY_DURATION,
+    REQUEST_DURATION,
+    REQUESTS_IN_FLIGHT,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    Registry,
+    get_method,
+    get_operation,
+)
+
+
+def test_counter_gauge_render():
+    counter = Counter("foo_total", "Foo", ["kind"])
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    counter.inc('b"')
+    assert counter.render() == (
+        "# HELP foo_total Foo\n"
+        "# TYPE foo_total counter\n"
+        'foo_total{kind="a"} 3\n'
+        'foo_total{kind="b\\""} 1'
+    )
+    gauge = Gauge("bar", "Bar")
+    gauge.inc()
+    gauge.dec()
+    gauge.set(2.5)
+    assert gauge.render().splitlines()[-1] == "bar 2.5"
+
+
+def test_histogram():
+    histogram = Histogram("baz_seconds", "Baz", ["endpoint"], buckets=[0.1, 1.0])
+    for value in [0.05, 0.1, 0.5, 2.0]:
+        histogram.observe(value, "x")
+    assert histogram.render().splitlines()[2:] == [
+        'baz_seconds_bucket{endpoint="x",le="0.1"} 2',
+        'baz_seconds_bucket{endpoint="x",le="1.0"} 3',
+        'baz_seconds_bucket{endpoint="x",le="+Inf"} 4',
+        'baz_seconds_sum{endpoint="x"} 2.65',
+        'baz_seconds_count{endpoint="x"} 4',
+    ]
+
+
+def test_registry_collect_hook():
+    registry = Registry()
+    gauge = registry.register(Gauge("qux", "Qux"))
+    registry.add_collect_hook(lambda: gauge.set(7))
+    assert registry.render().endswith("qux 7\n")
+
+
+def get_count(histogram, *labelvalues) -> int:
+    return sum(histogram._values.get(labelvalues, [0, 0])[:-1])
+
+
+def test_middleware():
+    def app(environ, start_response):
+        assert REQUESTS_IN_FLIGHT._values[()] >= 1
+        environ[ENDPOINT_ENVIRON_KEY] = "test_endpoint"
+        return Response("ok", status=201)(environ, start_response)
+
+    count = get_count(REQUEST_DURATION, "test_endpoint", "POST", "201")
+    resp = Client(MetricsMiddleware(app), Response).post("/")
+    assert resp.status_code == 201
+    assert get_count(REQUEST_DURATION, "test_endpoint", "POST", "201") == count + 1
+
+
+def test_middleware_exception():
+    def app(environ, start_response):
+        raise RuntimeError
+
+    count = get_count(REQUEST_DURATION, "unknown", "GET", "500")
+    with pytest.raises(RuntimeError):
+        Client(MetricsMiddleware(app), Response).get("/")
+    assert get_count(REQUEST_DURATION, "unknown", "GET", "500") == count + 1
+
+
+def test_middleware_custom_method():
+    def app(environ, start_response):
+        return Response("ok")(environ, start_response)
+
+    count = get_count(REQUEST_DURATION, "unknown", "other", "200")
+    resp = Client(MetricsMiddleware(app), Response).open("/", method="FOOBAR")
+    assert resp.status_code == 200
+    assert get_count(REQUEST_DURATION, "unknown", "other", "200") == count + 1
+    assert ("unknown", "FOOBAR", "200") not in REQUEST_DURATION._values
+
+
+@pytest.mark.parametrize(
+    "method, expected",
+    [("GET", "GET"), ("OPTIONS", "OPTIONS"), ("PROPFIND", "other"), ("get", "other")],
+)
+def test_get_method(method, expected):
+    assert get_method(method) == expected
+
+
+@pytest.mark.parametrize(
+    "statement, expected",
+    [
+        ("SELECT 1", "select"),
+        ("\n  insert into trade VALUES (1)", "insert"),
+        ("WITH RECURSIVE a AS (SELECT 1) SELECT * FROM a", "with"),
+        ("BEGIN", "other"),
+        ("", "other"),
+    ],
+)
+def test_get_operation(statement, expected):
+    assert get_operation(statement) == expected
+
+
+def test_query_duration():
+    count = get_count(QUERY_DURATION, "select")
+    with create_engine("sqlite://").connect() as connection:
+        connection.execute("SELECT 1")
+    assert get_count(QUERY_DURATION, "select") == count + 1
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.migrations`"""
+
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import desc, inspect, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from autotradeweb.__main__ import main
+from autotradeweb.migrations import (
+    MIGRATIONS,
+    get_applied_versions,
+    get_pending_migrations,
+    migration,
+    upgrade,
+)
+from autotradeweb.server import (
+    APP,
+    User,
+    db,
+    query_stock_ticks,
+    select_user_trades,
+    trade,
+    trading_session,
+)
+from autotradeweb.timeseries import TimeRange
+
+# NOTE: to run these tests you must set a enviroment variable witht the database URI
+# of autotradeweb postgresql test database
+APP.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("TEST_DATABASE_URI")
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN`` of a SQLAlchemy statement"""
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kwargs):
+    if compiler.dialect.name == "postgresql":
+        return f"EXPLAIN {compiler.process(element.statement, **kwargs)}"
+    return f"EXPLAIN QUERY PLAN {compiler.process(element.statement, **kwargs)}"
+
+
+def explain(query) -> str:
+    """Get the query plan of a SQLAlchemy query or statement with sequential
+    scans discouraged so that any usable index is picked regardless of table
+    size"""
+    with db.engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = connection.execute(Explain(getattr(query, "statement", query)))
+        return "\n".join(row[-1] for row in rows)
+
+
+def assert_no_full_scan(plan: str, table_name: str):
+    assert f"Seq Scan on {table_name}" not in plan
+    assert f"SCAN {table_name}" not in plan.replace("SCAN TABLE", "SCAN")
+
+
+def test_migration_duplicate_version():
+    with pytest.raises(ValueError):
+        migration(MIGRATIONS[0].version, "duplicate")(lambda connection: None)
+
+
+def test_main_db_upgrade():
+    assert main(["--database", os.getenv("TEST_DATABASE_URI"), "db", "upgrade"]) == 0
+    with db.engine.begin() as connection:
+        assert get_applied_versions(connection) == [
+            migration_.version for migration_ in MIGRATIONS
+        ]
+        assert not get_pending_migrations(connection)
+
+
+def test_upgrade_idempotent():
+    upgrade(db.engine)
+    assert upgrade(db.engine) == []
+
+
+def test_trading_session_trade_totals_backfill():
+    db.create_all()
+    trading_session_ = trading_session(
+        username="foo", ticker="bar", start_time=datetime.utcnow()
+    )
+    db.session.add(trading_session_)
+    db.session.flush()
+    db.session.add_all(
+        [
+            trade(
+                time_stamp=datetime.utcnow(),
+                session_id=trading_session_.session_id,
+                trade_type=trade_type,
+                volume=2,
+                price=3.0,
+            )
+            for trade_type in ["BUY", "BUY", "SELL"]
+        ]
+    )
+    db.session.commit()
+    session_id = trading_session_.session_id
+
+    backfill_migration = next(
+        migration_ for migration_ in MIGRATIONS if migration_.version == 5
+    )
+    with db.engine.begin() as connection:
+        backfill_migration.upgrade(connection)
+    db.session.expire_all()
+
+    totals = db.session.query(trading_session).get(session_id).to_dict()
+    assert totals["num_trades"] == 3
+    assert totals["buy_trades"] == 2
+    assert totals["sell_trades"] == 1
+    assert totals["buy_volume"] == 4
+    assert totals["sell_volume"] == 2
+    assert totals["buy_notional"] == 12.0
+    assert totals["sell_notional"] == 6.0
+
+
+def test_trading_session_trade_totals_not_null():
+    db.create_all()
+    upgrade(db.engine)
+    columns = {
+        column["name"]: column
+        for column in inspect(db.engine).get_columns("trading_session")
+    }
+    for name in ["num_trades", "buy_trades", "sell_volume", "sell_notional"]:
+        assert columns[name]["nullable"] is False
+        assert columns[name]["default"] == "0"
+
+    # rows inserted without the totals, as by older app versions, get zeros
+    with db.engine.begin() as connection:
+        session_id = connection.execute(
+            text(
+                "INSERT INTO trading_session (username, ticker) "
+                "VALUES ('foo', 'bar') RETURNING session_id"
+            )
+        ).scalar()
+    totals = db.session.query(trading_session).get(session_id).to_dict()
+    assert totals["buy_trades"] == 0
+    assert totals["sell_notional"] == 0.0
+
+
+class TestHotQueryPlans:
+    @pytest.fixture(autouse=True, scope="class")
+    def upgraded_db(self):
+        db.create_all()
+        upgrade(db.engine)
+
+    def test_trading_session_by_user(self):
+        plan = explain(
+            db.session.query(trading_session).filter(trading_session.username == "foo")
+        )
+        assert_no_full_scan(plan, "trading_session")
+
+    def test_trading_session_by_user_ticker(self):
+        plan = explain(
+            db.session.query(trading_session).filter(
+                trading_session.is_finished != True,
+                trading_session.ticker == "bar",
+                trading_session.username == "foo",
+            )
+        )
+        assert_no_full_scan(plan, "trading_session")
+
+    def test_trade_by_session(self):
+        plan = explain(
+            db.session.query(trade)
+            .filter(trade.session_id == 1)
+            .order_by(trade.time_stamp)
+        )
+        assert_no_full_scan(plan, "trade")
+
+    def test_recent_trades(self):
+        plan = explain(
+            db.session.query(trade).order_by(desc(trade.time_stamp)).limit(5)
+        )
+        assert_no_full_scan(plan, "trade")
+
+    def test_recent_user_trades(self):
+        plan = explain(select_user_trades("foo", 5, newest_first=True))
+        assert_no_full_scan(plan, "trade")
+        # each session's newest trades are read in order from the index
+        assert "ix_trade_session_id_time_stamp_trade_id" in plan
+
+    def test_user_trades_page(self):
+        plan = explain(select_user_trades("foo", 101, [datetime(2020, 4, 1), 1]))
+        assert_no_full_scan(plan, "trade")
+        # the keyset is part of the index condition of each session's trades
+        assert any(
+            "time_stamp" in line and "trade_id" in line
+            for line in plan.splitlines()
+            if "Index Cond" in line
+        )
+
+    def test_user_validators_by_username(self):
+        plan = explain(
+            db.session.query(User.id, User.revision, User.modified_at).filter(
+                User.username == "foo"
+            )
+        )
+        assert_no_full_scan(plan.replace('"', ""), "user")
+
+    def test_stock_ticks_time_range(self):
+        plan = explain(
+            query_stock_ticks(
+                "foo", TimeRange.from_date_picker("2020-03-30", "2020-04-05")
+            )
+        )
+        assert_no_full_scan(plan, "stock_data")
+        # the time range is part of the index condition rather than a filter
+        # applied to every tick of the stock
+        assert any(
+            "time_stamp" in line
+            for line in plan.splitlines()
+            if "Index Cond" in line or "SEARCH" in line
+        )
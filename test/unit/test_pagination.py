@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.pagination`"""
+
+from datetime import datetime
+
+import pytest
+
+from autotradeweb.pagination import decode_cursor, encode_cursor
+from autotradeweb.server import trade, trading_session
+
+
+def test_cursor_round_trip():
+    key_columns = [trade.time_stamp, trade.trade_id]
+    values = [datetime(2020, 4, 4, 20, 43, 41, 225000), 12]
+    assert decode_cursor(encode_cursor(*values), key_columns) == values
+
+
+def test_cursor_url_safe():
+    cursor = encode_cursor(datetime(2020, 4, 4), 2**40)
+    assert cursor.isascii()
+    assert all(character not in cursor for character in "+/=&?")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor",
+        encode_cursor(1, 2),
+        encode_cursor("one"),
+        encode_cursor([1]),
+    ],
+)
+def test_decode_cursor_invalid(cursor):
+    with pytest.raises((ValueError, TypeError)):
+        decode_cursor(cursor, [trading_session.session_id])
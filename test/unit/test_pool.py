@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.pool`"""
+
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+
+from autotradeweb.pool import TimedQueuePool, get_engine_options, get_pool_statistics
+
+
+def test_get_engine_options():
+    options = get_engine_options(
+        "postgresql://foo@localhost/bar", pool_size=3, pool_pre_ping=True
+    )
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_size"] == 3
+    assert options["pool_pre_ping"] is True
+
+
+def test_get_engine_options_sqlite():
+    assert get_engine_options("sqlite:///foo.db") == {}
+
+
+def test_get_pool_statistics_untracked():
+    statistics = get_pool_statistics(NullPool(lambda: None))
+    assert statistics["pool"] == "NullPool"
+    assert statistics["checked_out"] is None
+    assert statistics["max_wait"] is None
+
+
+def test_timed_queue_pool():
+    engine = create_engine(
+        os.getenv("TEST_DATABASE_URI"),
+        **get_engine_options(
+            os.getenv("TEST_DATABASE_URI"),
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.1,
+        ),
+    )
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            statistics = get_pool_statistics(engine.pool)
+            assert statistics["pool"] == "TimedQueuePool"
+            assert statistics["pool_size"] == 1
+            assert statistics["checked_out"] == 1
+            assert statistics["overflow"] == 0
+            assert statistics["checkouts"] == 1
+
+            # the only connection is checked out
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+        statistics = get_pool_statistics(engine.pool)
+        assert statistics["checked_out"] == 0
+        assert statistics["checked_in"] == 1
+        assert statistics["timeouts"] == 1
+        assert statistics["max_wait"] >= 0.0
+    finally:
+        engine.dispose()
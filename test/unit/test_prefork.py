@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.prefork`"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+import urllib.request
+
+import pytest
+
+from autotradeweb.prefork import ReusePortWSGIServer
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "SO_REUSEPORT"), reason="requires SO_REUSEPORT"
+)
+
+# master serving the pid of the worker handling each request
+PREFORK_SCRIPT = textwrap.dedent("""
+    import os
+    import sys
+
+    from autotradeweb.prefork import PreforkServer, ReusePortWSGIServer
+
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [str(os.getpid()).encode()]
+
+    sys.exit(
+        PreforkServer(
+            lambda: ReusePortWSGIServer(
+                ("127.0.0.1", int(sys.argv[1])), app, shutdown_timeout=1
+            ),
+            int(sys.argv[2]),
+        ).run()
+    )
+    """)
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_worker_pids(port, num_requests=20, timeout=10.0) -> set:
+    """get the pids of the workers handling a number of requests"""
+    deadline = time.monotonic() + timeout
+    pids = set()
+    num_responses = 0
+    while num_responses < num_requests and time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as resp:
+                pids.add(int(resp.read()))
+                num_responses += 1
+        except OSError:
+            time.sleep(0.1)
+    return pids
+
+
+def test_reuse_port_server_socket():
+    sock = ReusePortWSGIServer.prepare_socket(
+        ("127.0.0.1", get_free_port()),
+        socket.AF_INET,
+        socket.SOCK_STREAM,
+        0,
+        True,
+        None,
+    )
+    with sock:
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT) == 1
+
+
+def test_prefork_server():
+    port = get_free_port()
+    master = subprocess.Popen(
+        [sys.executable, "-c", PREFORK_SCRIPT, str(port), "2"],
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+    )
+    try:
+        pids = get_worker_pids(port)
+        assert pids
+        assert master.pid not in pids
+
+        # graceful restart replaces every worker
+        master.send_signal(signal.SIGHUP)
+        time.sleep(2)
+        restarted_pids = get_worker_pids(port)
+        assert restarted_pids
+        assert not restarted_pids & pids
+
+        # a killed worker is respawned
+        os.kill(restarted_pids.pop(), signal.SIGKILL)
+        time.sleep(2)
+        assert get_worker_pids(port)
+
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=30) == 0
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
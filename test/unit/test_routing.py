@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.routing`"""
+
+import os
+from datetime import datetime
+
+import pytest
+from flask_sqlalchemy import get_state
+from sqlalchemy.engine.url import make_url
+
+from autotradeweb.pool import TimedQueuePool, get_engine_options
+from autotradeweb.routing import READ_BIND_KEY, pin_primary, read_replica
+from autotradeweb.server import APP, db, stock_data, trading_session
+
+# NOTE: to run these tests you must set a enviroment variable witht the database URI
+# of autotradeweb postgresql test database
+APP.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("TEST_DATABASE_URI")
+
+REPLICA_STOCK_NAME = "__REPLICA_TEST"
+
+
+@pytest.fixture
+def replica(tmp_path):
+    """a SQLite read replica holding a single tick"""
+    APP.config["SQLALCHEMY_BINDS"] = {
+        READ_BIND_KEY: f"sqlite:///{tmp_path / 'replica.db'}"
+    }
+    engine = db.get_engine(APP, bind=READ_BIND_KEY)
+    stock_data.__table__.create(bind=engine)
+    engine.execute(
+        stock_data.__table__.insert(),
+        {"stock_name": REPLICA_STOCK_NAME, "time_stamp": datetime(2020, 4, 1)},
+    )
+    yield engine
+    db.session.rollback()
+    engine.dispose()
+    get_state(APP).connectors.pop(READ_BIND_KEY)
+    APP.config["SQLALCHEMY_BINDS"] = None
+
+
+def query_replica_ticks():
+    return (
+        db.session.query(stock_data)
+        .filter(stock_data.stock_name == REPLICA_STOCK_NAME)
+        .count()
+    )
+
+
+def test_read_replica(replica):
+    assert query_replica_ticks() == 0
+    with read_replica(db.session):
+        assert query_replica_ticks() == 1
+    assert query_replica_ticks() == 0
+
+
+def test_read_replica_not_configured():
+    with read_replica(db.session):
+        assert query_replica_ticks() == 0
+
+
+def test_read_replica_after_write(replica):
+    with read_replica(db.session):
+        db.session.add(
+            trading_session(username="foo", ticker="bar", start_time=datetime.utcnow())
+        )
+        db.session.flush()
+        # reads following a write within the transaction stay on the primary
+        assert query_replica_ticks() == 0
+        db.session.rollback()
+        assert query_replica_ticks() == 1
+
+
+def test_pin_primary(replica):
+    pin_primary(db.session)
+    with read_replica(db.session):
+        assert query_replica_ticks() == 0
+    db.session.remove()
+    with read_replica(db.session):
+        assert query_replica_ticks() == 1
+
+
+def test_sqlite_replica_engine_options():
+    engine = db.create_engine(
+        make_url("sqlite://"), get_engine_options("postgresql://foo@localhost/bar")
+    )
+    assert not isinstance(engine.pool, TimedQueuePool)
@@ -3,12 +3,22 @@
 
 """pytests for :mod:`.server`"""
 
+import base64
+import contextlib
+import csv
+import io
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pytest
 from bs4 import BeautifulSoup
+from flask import url_for
+from flask_sqlalchemy import get_state
+from sqlalchemy import event
+from werkzeug.http import http_date
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
 
 from autotradeweb.server import (
     APP,
@@ -18,7 +28,24 @@ from autotradeweb.server import (
     trade,
     stock_prediction,
     stock_data,
+    query_tickers,
+    TICKER_CATALOG,
+    FIGURE_CACHE,
+    get_stock_data_version,
+    invalidate_stock_figures,
+    validate_login,
+    CREDENTIAL_CACHE,
+    STATIC_ASSETS,
+    build_stock_timeline_extension,
+    build_stock_timeline_figure,
+    get_live_cursor,
+    to_json_version,
+    touch_user,
+    READ_YOUR_WRITES_WINDOW,
 )
+from autotradeweb.metrics import MetricsMiddleware
+from autotradeweb.routing import READ_BIND_KEY
+from autotradeweb.timeseries import TimeRange
 
 # NOTE: to run these tests you must set a enviroment variable witht the database URI
 # of autotradeweb postgresql test database
@@ -54,6 +81,70 @@ class TestBasicFlaskApp:
         assert resp.status_code == 200
         assert resp.content_type == "text/css; charset=utf-8"
 
+    def test_static_files_fingerprinted(self, client):
+        path = STATIC_ASSETS.url_path("stylesheet.css")
+        resp = client.get(f"/static/{path}", headers={"Accept-Encoding": "gzip"})
+        assert resp.status_code == 200
+        assert resp.content_type == "text/css; charset=utf-8"
+        assert "immutable" in resp.headers["Cache-Control"]
+        assert resp.headers["Content-Encoding"] == "gzip"
+
+        resp = client.get(
+            f"/static/{path}",
+            headers={
+                "Accept-Encoding": "gzip",
+                "If-None-Match": resp.headers["ETag"],
+            },
+        )
+        assert resp.status_code == 304
+
+    def test_metrics(self, client):
+        resp = client.get("/metrics")
+        assert resp.status_code == 200
+        assert resp.content_type.startswith("text/plain; version=0.0.4")
+        metrics = resp.get_data(as_text=True)
+        assert (
+            'autotradeweb_cache_lookups_total{cache="figure",result="hit"}' in metrics
+        )
+        assert "# TYPE autotradeweb_db_query_duration_seconds histogram" in metrics
+
+    def test_metrics_endpoint_label(self):
+        client = Client(MetricsMiddleware(APP), Response)
+        assert client.get("/register").status_code == 200
+        assert (
+            'autotradeweb_http_request_duration_seconds_count{endpoint="register",'
+            'method="GET",status="200"}'
+        ) in client.get("/metrics").get_data(as_text=True)
+
+    @pytest.mark.parametrize(
+        "output, label",
+        [
+            ("page-content.children", "dash:page-content.children"),
+            ("not-a-callback.children", "dash:unknown"),
+            ({"id": "page-content"}, "dash:unknown"),
+        ],
+    )
+    def test_metrics_dash_callback_label(self, output, label):
+        client = Client(MetricsMiddleware(APP), Response)
+        # the callback itself fails on the incomplete payload, which is
+        # raised while testing
+        with contextlib.suppress(Exception):
+            client.post(
+                "/_dash-update-component",
+                data=json.dumps({"output": output, "inputs": []}),
+                content_type="application/json",
+            )
+        assert f'endpoint="{label}",method="POST"' in client.get("/metrics").get_data(
+            as_text=True
+        )
+        assert "not-a-callback" not in client.get("/metrics").get_data(as_text=True)
+
+    def test_static_files_fingerprinted_url_for(self, client):
+        with APP.test_request_context():
+            assert url_for("static", filename="stylesheet.css") == (
+                f"/static/{STATIC_ASSETS.url_path('stylesheet.css')}"
+            )
+
     @pytest.mark.parametrize("page", ["/", "/api", "/register", "/login/"])
     def test_page_no_login_access(self, client, page):
         resp = client.get(page)
@@ -194,6 +285,34 @@ class TestLoggedInBasicFlaskApp:
         resp = logged_in_client.get(page)
         assert resp.status_code == 200
 
+    @pytest.mark.parametrize(
+        "page, filename",
+        [
+            ("/account", "stylesheet.css"),
+            ("/history", "sortable.min.js"),
+            ("/dashboard", "dash-stylesheet.css"),
+        ],
+    )
+    def test_page_fingerprinted_static_files(self, logged_in_client, page, filename):
+        resp = logged_in_client.get(page)
+        assert f"/static/{STATIC_ASSETS.url_path(filename)}" in resp.get_data(
+            as_text=True
+        )
+
+    @pytest.mark.parametrize(
+        "page",
+        ["/", "/register", "/account", "/history", "/dashboard", "/statistics"],
+    )
+    def test_page_static_files_all_fingerprinted(self, logged_in_client, page):
+        soup = BeautifulSoup(logged_in_client.get(page).data, "html.parser")
+        static_paths = [
+            tag.get(attribute)[len("/static/") :]
+            for tag in soup.find_all(["link", "script", "img"])
+            for attribute in ["href", "src"]
+            if (tag.get(attribute) or "").startswith("/static/")
+        ]
+        assert all(path in STATIC_ASSETS.assets for path in static_paths)
+
 
 def create_trade_session(logged_in_client):
     """test helper to create a trade session via the API"""
@@ -235,6 +354,21 @@ class TestLoggedInFlaskRestxApp:
         assert resp.is_json
         assert resp.json
 
+    def test_get_cache_statistics(self, logged_in_client):
+        resp = logged_in_client.get("/cache/")
+        assert resp.status_code == 200
+        assert resp.is_json
+        assert resp.json[0]["name"] == "stock timeline figures"
+        assert resp.json[0]["maxsize"] == FIGURE_CACHE.maxsize
+        assert resp.json[0]["hits"] == FIGURE_CACHE.hits
+
+    def test_get_pool_statistics(self, logged_in_client):
+        resp = logged_in_client.get("/pool/")
+        assert resp.status_code == 200
+        assert resp.is_json
+        assert resp.json["pool"]
+        assert resp.json["checked_out"] >= 0
+
     def test_get_trading_sessions(self, logged_in_client):
         resp = logged_in_client.get("/trades_sessions/")
         assert resp.status_code == 200
@@ -377,7 +511,9 @@ class TestLoggedInFlaskRestxApp:
         )
         assert resp.status_code == 400
 
-    @pytest.mark.parametrize("volume", [0, -1, -1000, 0.0, -1.0, -1000.0])
+    @pytest.mark.parametrize(
+        "volume", [0, -1, -1000, 0.0, -1.0, -1000.0, 1.5, 2.0, True, "1"]
+    )
     def test_post_trade_bad_volume(self, logged_in_client, volume):
         session = create_trade_session(logged_in_client)
         resp = logged_in_client.post(
@@ -445,6 +581,455 @@ class TestLoggedInFlaskRestxApp:
         resp = logged_in_client.get(f"/trades/{trade_id}")
         assert resp.status_code == 404
 
+    def test_get_trades_other_user(self, logged_in_client):
+        trading_session_ = trading_session(
+            username="other", ticker="bar", start_time=datetime.utcnow()
+        )
+        db.session.add(trading_session_)
+        db.session.commit()
+        trade_ = trade(
+            time_stamp=datetime.utcnow(),
+            session_id=trading_session_.session_id,
+            trade_type="BUY",
+            volume=1,
+            price=1,
+        )
+        db.session.add(trade_)
+        db.session.commit()
+        trade_id = trade_.trade_id
+
+        resp = logged_in_client.get("/trades/")
+        assert resp.status_code == 200
+        assert trade_id not in [trade_["trade_id"] for trade_ in resp.json]
+        resp = logged_in_client.get(f"/trades/{trade_id}")
+        assert resp.status_code == 404
+
+    def test_get_statistics(self, logged_in_client):
+        session = create_trade_session(logged_in_client)
+        for trade_type, price, volume in [("BUY", 2, 3), ("BUY", 1, 1), ("SELL", 4, 2)]:
+            resp = logged_in_client.post(
+                "/trades/",
+                data=json.dumps(
+                    {
+                        "session_id": session["session_id"],
+                        "trade_type": trade_type,
+                        "price": price,
+                        "volume": volume,
+                        "time_stamp": "2020-04-04T20:43:41.225Z",
+                    }
+                ),
+                content_type="application/json",
+            )
+            assert resp.status_code == 201
+        empty_session = create_trade_session(logged_in_client)
+
+        resp = logged_in_client.get("/statistics/")
+        assert resp.status_code == 200
+        assert resp.is_json
+        statistics = {
+            session_statistics["session_id"]: session_statistics
+            for session_statistics in resp.json
+        }
+        session_statistics = statistics[session["session_id"]]
+        assert session_statistics["ticker"] == "foobar"
+        assert session_statistics["total_trades"] == 3
+        assert session_statistics["total_buy"] == 2
+        assert session_statistics["total_sell"] == 1
+        assert session_statistics["total_buy_volume"] == 4
+        assert session_statistics["total_sell_volume"] == 2
+        assert session_statistics["total_buy_value"] == 7.0
+        assert session_statistics["total_sell_value"] == 8.0
+        assert statistics[empty_session["session_id"]]["total_trades"] == 0
+        assert statistics[empty_session["session_id"]]["total_buy_value"] == 0.0
+
+    def test_get_account_summary(self, logged_in_client):
+        # setup delete all trade sessions
+        db.session.query(trade).delete()
+        db.session.query(trading_session).delete()
+        db.session.commit()
+
+        trades = [create_trade(logged_in_client) for _ in range(3)]
+        resp = logged_in_client.post(
+            f"/trades_sessions/{trades[0]['session_id']}/finish"
+        )
+        assert resp.status_code == 200
+
+        resp = logged_in_client.get("/account/summary?recent_trades=2")
+        assert resp.status_code == 200
+        assert resp.is_json
+        assert resp.json["username"] == "foo"
+        assert resp.json["bank"] == 5000.0
+        assert resp.json["total_sessions"] == 3
+        assert resp.json["active_sessions"] == 2
+        assert len(resp.json["sessions"]) == 2
+        assert resp.json["total_trades"] == 3
+        assert [trade_["trade_id"] for trade_ in resp.json["recent_trades"]] == [
+            trades[2]["trade_id"],
+            trades[1]["trade_id"],
+        ]
+        assert resp.json["recent_trades"][0]["ticker"] == "foobar"
+
+    @pytest.mark.parametrize("recent_trades", [-1, 101])
+    def test_get_account_summary_bad_recent_trades(
+        self, logged_in_client, recent_trades
+    ):
+        resp = logged_in_client.get(f"/account/summary?recent_trades={recent_trades}")
+        assert resp.status_code == 400
+
+    @pytest.mark.parametrize(
+        "url,id_key",
+        [("/trades/", "trade_id"), ("/trades_sessions/", "session_id")],
+    )
+    def test_get_paginated(self, logged_in_client, url, id_key):
+        for _ in range(5):
+            create_trade(logged_in_client)
+        resp = logged_in_client.get(url)
+        assert resp.status_code == 200
+        expected_ids = sorted(item[id_key] for item in resp.json)
+
+        ids = []
+        resp = logged_in_client.get(f"{url}?limit=2")
+        while True:
+            assert resp.status_code == 200
+            assert resp.is_json
+            assert len(resp.json) <= 2
+            ids.extend(item[id_key] for item in resp.json)
+            if "X-Next-Cursor" not in resp.headers:
+                assert "Link" not in resp.headers
+                break
+            assert 'rel="next"' in resp.headers["Link"]
+            resp = logged_in_client.get(
+                url, query_string={"limit": 2, "after": resp.headers["X-Next-Cursor"]}
+            )
+        assert sorted(ids) == expected_ids
+        assert len(ids) == len(set(ids))
+
+    @pytest.mark.parametrize("url", ["/trades/", "/trades_sessions/"])
+    @pytest.mark.parametrize(
+        "query_string",
+        [{"limit": 0}, {"limit": 1001}, {"limit": "foo"}, {"after": "not a cursor"}],
+    )
+    def test_get_paginated_bad_args(self, logged_in_client, url, query_string):
+        resp = logged_in_client.get(url, query_string=query_string)
+        assert resp.status_code == 400
+
+    def test_get_trades_export_ndjson(self, logged_in_client):
+        trade_ = create_trade(logged_in_client)
+        resp = logged_in_client.get("/trades/export")
+        assert resp.status_code == 200
+        assert resp.is_streamed
+        assert resp.mimetype == "application/x-ndjson"
+        trades = [json.loads(line) for line in resp.data.decode().splitlines()]
+        assert trade_["trade_id"] in [exported["trade_id"] for exported in trades]
+        resp = logged_in_client.get("/trades/")
+        assert len(trades) == len(resp.json)
+
+    def test_get_trades_export_csv(self, logged_in_client):
+        trade_ = create_trade(logged_in_client)
+        resp = logged_in_client.get("/trades/export?format=csv")
+        assert resp.status_code == 200
+        assert resp.mimetype == "text/csv"
+        rows = list(csv.DictReader(io.StringIO(resp.data.decode())))
+        exported = [row for row in rows if int(row["trade_id"]) == trade_["trade_id"]]
+        assert exported
+        assert exported[0]["trade_type"] == "BUY"
+        assert float(exported[0]["price"]) == 1.0
+
+    def test_get_trades_export_bad_format(self, logged_in_client):
+        resp = logged_in_client.get("/trades/export?format=xml")
+        assert resp.status_code == 400
+
+    def test_post_trades_batch(self, logged_in_client):
+        session = create_trade_session(logged_in_client)
+        paused_session = create_trade_session(logged_in_client)
+        resp = logged_in_client.post(
+            f"/trades_sessions/{paused_session['session_id']}/pause"
+        )
+        assert resp.status_code == 200
+
+        new_trade = {
+            "session_id": session["session_id"],
+            "trade_type": "BUY",
+            "price": 1,
+            "volume": 1,
+            "time_stamp": "2020-04-04T20:43:41.225Z",
+        }
+        resp = logged_in_client.post(
+            "/trades/batch",
+            data=json.dumps(
+                [
+                    new_trade,
+                    dict(new_trade, trade_type="SELL", price=2),
+                    dict(new_trade, volume=0),
+                    dict(new_trade, session_id=paused_session["session_id"]),
+                    "not a trade",
+                    dict(new_trade, volume=1.5),
+                    dict(new_trade, volume=True),
+                ]
+            ),
+            content_type="application/json",
+        )
+        assert resp.status_code == 200
+        assert resp.is_json
+        assert [result["index"] for result in resp.json] == [0, 1, 2, 3, 4, 5, 6]
+        assert [result["status"] for result in resp.json] == [
+            201,
+            201,
+            400,
+            404,
+            400,
+            400,
+            400,
+        ]
+        assert resp.json[0]["trade"]["trade_id"]
+        assert resp.json[1]["trade"]["trade_type"] == "SELL"
+        assert resp.json[1]["trade"]["price"] == 2
+        assert resp.json[2]["trade"] is None
+        assert resp.json[3]["message"] == "trading session not found"
+
+        trade_id = resp.json[1]["trade"]["trade_id"]
+        resp = logged_in_client.get(f"/trades/{trade_id}")
+        assert resp.status_code == 200
+        assert resp.json["session_id"] == session["session_id"]
+
+    def test_post_trades_batch_single_insert(self, logged_in_client):
+        session = create_trade_session(logged_in_client)
+        new_trade = {
+            "session_id": session["session_id"],
+            "trade_type": "BUY",
+            "price": 1,
+            "volume": 1,
+            "time_stamp": "2020-04-04T20:43:41.225Z",
+        }
+        inserts = []
+
+        def record_insert(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO trade "):
+                inserts.append(statement)
+
+        engine = db.get_engine(APP)
+        event.listen(engine, "before_cursor_execute", record_insert)
+        try:
+            resp = logged_in_client.post(
+                "/trades/batch",
+                data=json.dumps(
+                    [dict(new_trade, volume=volume) for volume in range(1, 6)]
+                ),
+                content_type="application/json",
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", record_insert)
+        assert resp.status_code == 200
+        assert len(inserts) == 1
+        assert [result["trade"]["volume"] for result in resp.json] == [1, 2, 3, 4, 5]
+        trade_ids = [result["trade"]["trade_id"] for result in resp.json]
+        assert trade_ids == sorted(set(trade_ids))
+
+    @pytest.mark.parametrize("payload", [{"trade_type": "BUY"}, [{}] * 1001])
+    def test_post_trades_batch_bad_payload(self, logged_in_client, payload):
+        resp = logged_in_client.post(
+            "/trades/batch", data=json.dumps(payload), content_type="application/json"
+        )
+        assert resp.status_code == 400
+
+    def test_post_trade_session_totals(self, logged_in_client):
+        session = create_trade_session(logged_in_client)
+        new_trade = {
+            "session_id": session["session_id"],
+            "trade_type": "BUY",
+            "price": 2.5,
+            "volume": 4,
+            "time_stamp": "2020-04-04T20:43:41.225Z",
+        }
+        resp = logged_in_client.post(
+            "/trades/", data=json.dumps(new_trade), content_type="application/json"
+        )
+        assert resp.status_code == 201
+        resp = logged_in_client.post(
+            "/trades/batch",
+            data=json.dumps([new_trade, dict(new_trade, trade_type="SELL", volume=1)]),
+            content_type="application/json",
+        )
+        assert resp.status_code == 200
+
+        resp = logged_in_client.get(f"/trades_sessions/{session['session_id']}")
+        assert resp.status_code == 200
+        assert resp.json["num_trades"] == 3
+        assert resp.json["buy_trades"] == 2
+        assert resp.json["sell_trades"] == 1
+        assert resp.json["buy_volume"] == 8
+        assert resp.json["sell_volume"] == 1
+        assert resp.json["buy_notional"] == 20.0
+        assert resp.json["sell_notional"] == 2.5
+
+
+class TestConditionalRequests:
+    @pytest.mark.parametrize("url", ["/trades/", "/trades_sessions/", "/statistics/"])
+    def test_not_modified(self, logged_in_client, url):
+        resp = logged_in_client.get(url)
+        assert resp.status_code == 200
+        etag = resp.headers["ETag"]
+        assert etag.startswith('W/"')
+
+        resp = logged_in_client.get(url, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.data == b""
+        assert resp.headers["ETag"] == etag
+
+    @pytest.mark.parametrize("url", ["/user/", "/account/summary"])
+    def test_unconditional(self, logged_in_client, url):
+        resp = logged_in_client.get(url)
+        assert resp.status_code == 200
+        assert "ETag" not in resp.headers
+        assert "Last-Modified" not in resp.headers
+
+    def test_modified(self, logged_in_client):
+        resp = logged_in_client.get("/trades/")
+        etag = resp.headers["ETag"]
+
+        new_trade = create_trade(logged_in_client)
+        resp = logged_in_client.get("/trades/", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert new_trade in resp.json
+        assert resp.headers["ETag"] != etag
+        assert "Last-Modified" not in resp.headers
+
+        logged_in_client.post(f"/trades_sessions/{new_trade['session_id']}/pause")
+        resp = logged_in_client.get(
+            f"/trades_sessions/{new_trade['session_id']}",
+            headers={"If-None-Match": resp.headers["ETag"]},
+        )
+        assert resp.status_code == 200
+        assert resp.json["is_paused"] is True
+
+    def test_modified_same_second(self, logged_in_client):
+        # the client's copy is taken between two changes within the same
+        # second
+        touch_user("foo")
+        db.session.commit()
+        if_modified_since = http_date(datetime.utcnow())
+        touch_user("foo")
+        db.session.commit()
+        db.session.remove()
+
+        resp = logged_in_client.get(
+            "/trades/", headers={"If-Modified-Since": if_modified_since}
+        )
+        assert resp.status_code == 200
+
+    def test_modified_other_user(self, logged_in_client):
+        resp = logged_in_client.get("/trades_sessions/")
+        etag = resp.headers["ETag"]
+        db.session.add(User(username="conditional_other_user", password="password"))
+        db.session.commit()
+        touch_user("conditional_other_user")
+        db.session.commit()
+        resp = logged_in_client.get(
+            "/trades_sessions/", headers={"If-None-Match": etag}
+        )
+        assert resp.status_code == 304
+
+
+class TestReadYourWrites:
+    @pytest.fixture
+    def replica(self, tmp_path):
+        """a SQLite read replica without any trading sessions"""
+        APP.config["SQLALCHEMY_BINDS"] = {
+            READ_BIND_KEY: f"sqlite:///{tmp_path / 'replica.db'}"
+        }
+        engine = db.get_engine(APP, bind=READ_BIND_KEY)
+        trading_session.__table__.create(bind=engine)
+        yield engine
+        db.session.remove()
+        engine.dispose()
+        get_state(APP).connectors.pop(READ_BIND_KEY)
+        APP.config["SQLALCHEMY_BINDS"] = None
+
+    def test_read_after_write(self, logged_in_client, replica):
+        session = create_trade_session(logged_in_client)
+        resp = logged_in_client.get(f"/trades_sessions/{session['session_id']}")
+        assert resp.status_code == 200
+        assert resp.json == session
+
+        db.session.query(User).filter(User.username == "foo").update(
+            {User.modified_at: datetime.utcnow() - READ_YOUR_WRITES_WINDOW}
+        )
+        db.session.commit()
+        # as at the end of a request, in case a test left a app context pushed
+        db.session.remove()
+        # reads go to the replica, which has not replayed the write
+        resp = logged_in_client.get(f"/trades_sessions/{session['session_id']}")
+        assert resp.status_code == 404
+
+
+class TestAPIAuthentication:
+    @pytest.fixture(autouse=True)
+    def clear_credential_cache(self, logged_in_client):
+        """ensure the foo user exists and no credentials are cached"""
+        CREDENTIAL_CACHE.invalidate(lambda key: True)
+
+    def basic_auth_headers(self, username="foo", password="bar"):
+        credentials = base64.b64encode(f"{username}:{password}".encode()).decode()
+        return {"Authorization": f"Basic {credentials}"}
+
+    def test_basic_auth(self):
+        with APP.test_client() as client:
+            resp = client.get(
+                "/user/",
+                headers=self.basic_auth_headers(),
+                content_type="application/json",
+            )
+            assert resp.status_code == 200
+            assert resp.json["username"] == "foo"
+
+    def test_basic_auth_invalid(self):
+        with APP.test_client() as client:
+            resp = client.get(
+                "/user/",
+                headers=self.basic_auth_headers(password="nonsuch"),
+                content_type="application/json",
+            )
+            assert resp.status_code == 401
+
+    def test_basic_auth_credential_cache(self):
+        validate_login({"username": "foo", "password": "bar"})
+        assert CREDENTIAL_CACHE.stats()["size"] == 1
+        hits = CREDENTIAL_CACHE.hits
+        assert validate_login({"username": "foo", "password": "bar"})
+        assert CREDENTIAL_CACHE.hits == hits + 1
+        # other credentials of a cached user are still checked
+        assert not validate_login({"username": "foo", "password": "nonsuch"})
+
+    def test_bearer_token(self):
+        with APP.test_client() as client:
+            resp = client.post(
+                "/auth/token",
+                headers=self.basic_auth_headers(),
+                content_type="application/json",
+            )
+            assert resp.status_code == 201
+            assert resp.json["token_type"] == "Bearer"
+            assert resp.json["expires_in"] > 0
+            token = resp.json["access_token"]
+
+        with APP.test_client() as client:
+            resp = client.get(
+                "/user/",
+                headers={"Authorization": f"Bearer {token}"},
+                content_type="application/json",
+            )
+            assert resp.status_code == 200
+            assert resp.json["username"] == "foo"
+
+    def test_bearer_token_invalid(self):
+        with APP.test_client() as client:
+            resp = client.get(
+                "/user/",
+                headers={"Authorization": "Bearer nonsuch"},
+                content_type="application/json",
+            )
+            assert resp.status_code == 401
+
 
 class TestDatabaseBindings:
     def test_add_user(self):
@@ -504,6 +1089,10 @@ class TestDatabaseBindings:
         assert trade_get.trade_id is not None
         assert trade_get.to_dict()
 
+        # test the trade to trading session relationship
+        assert trade_get.trading_session.session_id == trading_session_.session_id
+        assert trade_get in trading_session_.trades.all()
+
     def test_get_stock_prediction(self):
         stock_prediction_ = db.session.query(stock_prediction).first()
         assert stock_prediction_
@@ -514,6 +1103,126 @@ class TestDatabaseBindings:
         assert stock_data_
         assert stock_data_.stock_name
 
+    def test_query_tickers(self):
+        tickers = query_tickers()
+        assert tickers
+        assert tickers == sorted(
+            stock.stock_name
+            for stock in db.session.query(stock_data.stock_name).distinct()
+        )
+
+    def test_ticker_catalog(self):
+        TICKER_CATALOG.invalidate()
+        assert TICKER_CATALOG.get() == query_tickers()
+
+    def test_stock_figure_invalidation(self):
+        stock_name = "__FIGURE_CACHE_TEST"
+        assert get_stock_data_version(stock_name) == (None, None)
+        FIGURE_CACHE.put((stock_name, None, 1, (None, None)), {})
+        FIGURE_CACHE.put(("other", None, 1, (None, None)), {})
+        db.session.add(
+            stock_data(stock_name=stock_name, time_stamp=datetime(2020, 4, 1), open=1.0)
+        )
+        db.session.commit()
+        try:
+            assert get_stock_data_version(stock_name) == (datetime(2020, 4, 1), None)
+            invalidate_stock_figures(stock_name)
+            assert FIGURE_CACHE.get((stock_name, None, 1, (None, None))) is None
+            assert FIGURE_CACHE.get(("other", None, 1, (None, None))) == {}
+        finally:
+            db.session.query(stock_data).filter(
+                stock_data.stock_name == stock_name
+            ).delete()
+            db.session.commit()
+
+    def test_stock_timeline_live_tail(self):
+        stock_name = "__LIVE_TAIL_TEST"
+        start = datetime(2020, 4, 1)
+        db.session.add_all(
+            [
+                stock_data(
+                    stock_name=stock_name,
+                    time_stamp=start + timedelta(minutes=minute),
+                    open=float(minute),
+                )
+                for minute in range(5)
+            ]
+            + [
+                stock_prediction(
+                    stock_name=stock_name, time_stamp=start, prediction=[1.0, 2.0]
+                )
+            ]
+        )
+        db.session.commit()
+        try:
+            timeline = build_stock_timeline_figure(
+                stock_name, TimeRange(start, start + timedelta(days=1)), None, 1000
+            )
+            assert timeline.figure["data"][0]["x"][-1] == "2020-04-01T00:04:00"
+            cursor = get_live_cursor(
+                stock_name, timeline, 1000, get_stock_data_version(stock_name)
+            )
+            assert cursor["tick"] == "2020-04-01T00:04:00.000000"
+            assert cursor["prediction"] == "2020-04-01T01:00:00.000000"
+
+            db.session.add_all(
+                [
+                    stock_data(
+                        stock_name=stock_name,
+                        time_stamp=start + timedelta(minutes=5),
+                        open=5.0,
+                    ),
+                    stock_prediction(
+                        stock_name=stock_name,
+                        time_stamp=start + timedelta(hours=1),
+                        prediction=[3.0, 4.0, 5.0],
+                    ),
+                ]
+            )
+            db.session.commit()
+            data_version = to_json_version(get_stock_data_version(stock_name))
+            extend_data, cursor = build_stock_timeline_extension(cursor, data_version)
+            updates, trace_indices, max_points = extend_data
+            assert trace_indices == [0, 1, 2, 3]
+            assert max_points == 2000
+            assert updates["x"][0] == ["2020-04-01T00:05:00"]
+            assert updates["y"][0] == [5.0]
+            # only the prediction points after the newest shown one
+            assert updates["x"][3] == ["2020-04-01T02:00:00", "2020-04-01T03:00:00"]
+            assert updates["y"][3] == [4.0, 5.0]
+            assert cursor["tick"] == "2020-04-01T00:05:00.000000"
+            assert cursor["prediction"] == "2020-04-01T03:00:00.000000"
+            assert cursor["version"] == data_version
+
+            assert build_stock_timeline_extension(cursor, data_version)[0] is None
+
+            # ticks within the same second as the newest shown one are only
+            # appended once
+            for microseconds in [250000, 750000]:
+                db.session.add(
+                    stock_data(
+                        stock_name=stock_name,
+                        time_stamp=start
+                        + timedelta(minutes=5, microseconds=microseconds),
+                        open=6.0,
+                    )
+                )
+                db.session.commit()
+                data_version = to_json_version(get_stock_data_version(stock_name))
+                extend_data, cursor = build_stock_timeline_extension(
+                    cursor, data_version
+                )
+                assert extend_data[0]["x"] == [["2020-04-01T00:05:00"]]
+                assert cursor["tick"] == f"2020-04-01T00:05:00.{microseconds:06d}"
+        finally:
+            db.session.query(stock_data).filter(
+                stock_data.stock_name == stock_name
+            ).delete()
+            db.session.query(stock_prediction).filter(
+                stock_prediction.stock_name == stock_name
+            ).delete()
+            db.session.commit()
+
 
 # TODO: using selenium to instrumentation test the dash "/dashboard" endpoint
 # from dash.testing.application_runners import import_app
@@ -523,3 +1232,44 @@ class TestDatabaseBindings:
 #     app = import_app("autotradeweb.server.APP")
 #     dash_duo.start_server(app)
 #     dash_duo.wait_for_page(url="/dashboard", timeout=10)
+
+
+def read_event(stream):
+    """test helper to read the next event of a event stream response"""
+    for message in stream:
+        if isinstance(message, bytes):
+            message = message.decode("utf-8")
+        if message.startswith("event:"):
+            event_line, data_line = message.strip().split("\n")
+            return event_line[len("event: ") :], json.loads(data_line[len("data: ") :])
+
+
+class TestEventStream:
+    def test_event_stream(self, logged_in_client):
+        resp = logged_in_client.get("/events/", buffered=False)
+        assert resp.status_code == 200
+        assert resp.mimetype == "text/event-stream"
+        stream = iter(resp.response)
+        # the first message subscribes the stream
+        assert next(stream).startswith(b"retry:")
+        try:
+            new_trade = create_trade(logged_in_client)
+            event, data = read_event(stream)
+            assert event == "trading_session"
+            assert data["session_id"] == new_trade["session_id"]
+            assert data["is_paused"] is False
+            event, data = read_event(stream)
+            assert event == "trade"
+            assert data == new_trade
+
+            logged_in_client.post(f"/trades_sessions/{new_trade['session_id']}/pause")
+            event, data = read_event(stream)
+            assert event == "trading_session"
+            assert data["is_paused"] is True
+            assert data["num_trades"] == 1
+        finally:
+            resp.close()
+
+    def test_event_stream_login_required(self, client):
+        resp = client.get("/events/", content_type="application/json")
+        assert resp.status_code == 401
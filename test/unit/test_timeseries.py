@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""pytests for :mod:`.timeseries`"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from autotradeweb.server import stock_data
+from autotradeweb.timeseries import (
+    DEFAULT_GRAPH_WIDTH,
+    MAX_GRAPH_WIDTH,
+    MIN_GRAPH_WIDTH,
+    TimeRange,
+    consolidate_predictions,
+    get_num_buckets,
+    get_zoom_range,
+    min_max_downsample,
+    to_cursor_time,
+    to_datetime,
+    to_json_times,
+    to_json_values,
+)
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("2020-04-02", datetime(2020, 4, 2)),
+        ("2020-04-02T05:12:33.123456", datetime(2020, 4, 2, 5, 12, 33, 123456)),
+        ("2020-04-02 05:12:33.1234", datetime(2020, 4, 2, 5, 12, 33, 123400)),
+        ("2020-04-02 05:12", datetime(2020, 4, 2, 5, 12)),
+    ],
+)
+def test_to_datetime(value, expected):
+    assert to_datetime(value) == expected
+
+
+@pytest.mark.parametrize(
+    "start_date,end_date",
+    [
+        ("2020-03-30", "2020-04-05"),
+        ("2020-03-30T13:01:02.123456", "2020-04-05T08:09:10.111111"),
+    ],
+)
+def test_time_range_from_date_picker(start_date, end_date):
+    time_range = TimeRange.from_date_picker(start_date, end_date)
+    assert time_range == (datetime(2020, 3, 30), datetime(2020, 4, 6))
+
+
+def test_time_range_extend():
+    time_range = TimeRange(datetime(2020, 3, 30), datetime(2020, 4, 6))
+    assert time_range.extend(timedelta(days=2)).end == datetime(2020, 4, 8)
+
+
+def test_time_range_filter():
+    time_range = TimeRange(datetime(2020, 3, 30), datetime(2020, 4, 6))
+    predicate = str(time_range.filter(stock_data.time_stamp))
+    assert "stock_data.time_stamp >=" in predicate
+    assert "stock_data.time_stamp <" in predicate
+    assert "date(" not in predicate
+
+
+@pytest.mark.parametrize(
+    "graph_width,expected",
+    [
+        (None, DEFAULT_GRAPH_WIDTH),
+        (0, DEFAULT_GRAPH_WIDTH),
+        (1, MIN_GRAPH_WIDTH),
+        (800, 800),
+        (100000, MAX_GRAPH_WIDTH),
+    ],
+)
+def test_get_num_buckets(graph_width, expected):
+    assert get_num_buckets(graph_width) == expected
+
+
+@pytest.mark.parametrize(
+    "relayout_data",
+    [
+        None,
+        {},
+        {"autosize": True},
+        {"xaxis.autorange": True, "xaxis.range[0]": "2020-04-02"},
+    ],
+)
+def test_get_zoom_range_not_zoomed(relayout_data):
+    assert get_zoom_range(relayout_data) is None
+
+
+@pytest.mark.parametrize(
+    "relayout_data",
+    [
+        {"xaxis.range[0]": "2020-04-02 05:00", "xaxis.range[1]": "2020-04-03"},
+        {"xaxis.range": ["2020-04-03", "2020-04-02 05:00"]},
+    ],
+)
+def test_get_zoom_range(relayout_data):
+    assert get_zoom_range(relayout_data) == (
+        datetime(2020, 4, 2, 5),
+        datetime(2020, 4, 3),
+    )
+
+
+def test_min_max_downsample_small_series():
+    x = np.arange("2020-04-01", "2020-04-02", dtype="datetime64[h]")
+    y = np.arange(len(x), dtype=float)
+    downsampled_x, downsampled_y = min_max_downsample(x, y, 100)
+    assert np.array_equal(downsampled_x, x)
+    assert np.array_equal(downsampled_y, y)
+
+
+def test_min_max_downsample():
+    x = np.arange("2020-01-01", "2020-04-01", dtype="datetime64[m]")
+    y = np.sin(np.arange(len(x)) / 1000.0)
+    y[12345] = 10.0  # spike
+    y[54321] = -10.0  # dip
+    downsampled_x, downsampled_y = min_max_downsample(x, y, 500)
+    assert len(downsampled_x) == len(downsampled_y) <= 2 * 500
+    assert np.all(downsampled_x[1:] > downsampled_x[:-1])
+    assert downsampled_y.max() == 10.0
+    assert downsampled_y.min() == -10.0
+    assert np.all(np.isin(downsampled_x, x))
+
+
+def test_consolidate_predictions():
+    time_stamps = np.array(
+        ["2020-04-01T00:00", "2020-04-01T01:00:10", "2020-04-01T05:00"],
+        dtype="datetime64[us]",
+    )
+    times, mean, lower, upper = consolidate_predictions(
+        time_stamps, [[1.0, 2.0, 3.0], [20.0, 30.0], [None, 5.0]], percentiles=(0, 100)
+    )
+    assert times.tolist() == [
+        datetime(2020, 4, 1, 0),
+        datetime(2020, 4, 1, 1),
+        datetime(2020, 4, 1, 2),
+        datetime(2020, 4, 1, 6),
+    ]
+    assert mean.tolist() == [1.0, 11.0, 16.5, 5.0]
+    assert lower.tolist() == [1.0, 2.0, 3.0, 5.0]
+    assert upper.tolist() == [1.0, 20.0, 30.0, 5.0]
+
+
+def test_consolidate_predictions_percentiles():
+    time_stamps = np.array(["2020-04-01"] * 5, dtype="datetime64[us]")
+    predictions = [[value] for value in [5.0, 1.0, 4.0, 2.0, 3.0]]
+    _, mean, lower, upper = consolidate_predictions(
+        time_stamps, predictions, percentiles=(10, 90)
+    )
+    values = np.array(predictions).ravel()
+    assert mean.tolist() == [3.0]
+    assert lower.tolist() == [np.percentile(values, 10)]
+    assert upper.tolist() == [np.percentile(values, 90)]
+
+
+def test_consolidate_predictions_empty():
+    times, mean, lower, upper = consolidate_predictions(
+        np.array([], dtype="datetime64[us]"), []
+    )
+    assert len(times) == len(mean) == len(lower) == len(upper) == 0
+
+
+def test_to_cursor_time():
+    time = np.datetime64("2020-04-01T13:05:07.250001")
+    assert to_cursor_time(time) == "2020-04-01T13:05:07.250001"
+    assert to_datetime(to_cursor_time(time)) == datetime(2020, 4, 1, 13, 5, 7, 250001)
+
+
+def test_to_json_times():
+    times = np.array(
+        ["2020-04-01T00:00:00.500", "2020-04-01T13:05:07"], dtype="datetime64[us]"
+    )
+    assert to_json_times(times) == ["2020-04-01T00:00:00", "2020-04-01T13:05:07"]
+    assert to_json_times(np.array([], dtype="datetime64[us]")) == []
+
+
+def test_to_json_values():
+    assert to_json_values(np.array([1.0, np.nan, 2.5])) == [1.0, None, 2.5]
+    assert to_json_values(np.array([1 / 3]), decimals=4) == [0.3333]
+    assert to_json_values(np.array([], dtype=float)) == []